@@ -1,6 +1,7 @@
 # app/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
+from functools import lru_cache
 
 class Settings(BaseSettings):
     # API Keys
@@ -27,6 +28,163 @@ class Settings(BaseSettings):
     environment: str = "development"
     portfolio_output_audit_enabled: bool = True
     portfolio_output_audit_csv_path: str = "/tmp/portfolio_ai_outputs.csv"
+    portfolio_output_audit_background: bool = True
+    portfolio_output_audit_queue_size: int = 1000
+    portfolio_output_audit_batch_size: int = 50
+    portfolio_output_audit_flush_interval: float = 1.0
+    # When the queue is full: "drop" (counted) or "block" (waits for room; on an event loop a
+    # hand-off thread waits instead, for at most queue_size rows, and further rows are dropped)
+    portfolio_output_audit_overflow_policy: str = "drop"
+    # Rotation is safe with several worker processes on one CSV where flock is available
+    # (Linux); on Windows it assumes a single writer process per CSV path
+    portfolio_output_audit_rotate_max_bytes: int = 50 * 1024 * 1024
+    portfolio_output_audit_rotate_interval: str = "day"
+    portfolio_output_audit_compression: str = "gzip"
+
+    # Multi-provider routing: JSON list of provider specs, e.g.
+    # [{"type": "azure", "endpoint": "https://...", "deployment": "gpt-4.1-mini"},
+    #  {"type": "openai", "model": "gpt-4.1-mini"}, {"type": "anthropic"}]
+    # Empty keeps the single azure_openai_deployment
+    llm_providers: str = ""
+    llm_router_cooldown_seconds: float = 30.0
+    # Retries inside one provider; failing over to the next is usually faster
+    llm_router_provider_max_retries: int = 0
+
+    # Azure OpenAI connection pool (shared per worker process)
+    openai_http2_enabled: bool = True
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry: float = 30.0
+    openai_timeout_seconds: float = 120.0
+    openai_connect_timeout_seconds: float = 5.0
+    # Retries per call; with the scheduler enabled they are made by the scheduler, not the SDK
+    openai_max_retries: int = 2
+
+    # Review generation: "single" writes every section in one completion, "pipelined"
+    # writes the brief description and then the other sections concurrently, "structured"
+    # asks for one JSON-schema completion (falling back to "single" if it cannot be used)
+    generation_mode: str = "single"
+
+    # Speculative generation: after capabilities are suggested, generate the review
+    # in the background so a generate request with the same capabilities is instant
+    speculative_generation_enabled: bool = False
+    speculative_generation_max_jobs: int = 2
+    speculative_generation_ttl_seconds: float = 120.0
+
+    # Request deadlines: per-route budgets in seconds (route=seconds, comma separated),
+    # which an X-Request-Timeout header can shorten. Routes not listed get the default (0 = none)
+    request_deadline_seconds: float = 0.0
+    # bulk/generate-reviews stays under the 230 s Azure front-end timeout; cases still waiting at
+    # the deadline are reported as failed so the response carries the finished ones
+    route_deadlines: str = "generate-review=120,improve-review=120,improve-section=60,select-capabilities=30,select-experience-groups=30,bulk/generate-reviews=210"
+    # Skip the separate title call when less than this is left of the budget
+    title_min_budget_seconds: float = 5.0
+
+    # Idempotency-Key on POST routes: responses are kept for the window so retries
+    # join or replay the first execution instead of calling Azure OpenAI again
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: float = 3600.0
+    idempotency_max_entries: int = 1000
+
+    # Async job API: JOB_STORE_URL is empty (in-process) or sqlite:///path/to/jobs.db.
+    # The in-process store is per worker: on Azure Functions with more than one instance,
+    # or after a recycle, GET /jobs/{id} returns 404 for jobs submitted elsewhere. Use a
+    # SQLite file on a shared mount (e.g. Azure Files) for the Functions deployment.
+    job_store_url: str = ""
+    job_workers: int = 4
+    job_queue_size: int = 100
+    job_result_ttl_seconds: int = 3600
+    job_callback_timeout_seconds: float = 10.0
+    # How long an instance's claim on a running job lasts without renewal; after that
+    # another instance sharing the store may pick the job up
+    job_lease_seconds: float = 120.0
+    # Comma-separated hosts that job callbacks may be sent to; empty refuses every callback_url
+    job_callback_allowed_hosts: str = ""
+
+    # Bulk JSONL generation (endpoint and scripts/bulk_generate.py)
+    bulk_concurrency: int = 4
+    bulk_max_concurrency: int = 16
+    # Cases per HTTP request: the whole batch must finish within the bulk/generate-reviews
+    # deadline. Larger batches go through scripts/bulk_generate.py or one job per case
+    bulk_max_cases: int = 16
+
+    # Case title: "inline" parses the Title line from the main generation,
+    # "concurrent" generates it from the raw notes while the review is written
+    title_strategy: str = "inline"
+
+    # Send only the selected capabilities' progression point descriptors
+    scoped_system_prompt_enabled: bool = True
+
+    # Local BM25 pre-ranker for capability selection. When enabled it shortlists the
+    # capabilities sent to the LLM; with answer_locally it also skips the LLM for clear
+    # cases. Off by default: keyword matching misses capabilities on ordinary notes.
+    # min_score/margin/shortlist_size come from the labelled cases in
+    # tests/test_capability_ranker.py (no wrong local answer, every expected capability shortlisted)
+    capability_ranker_enabled: bool = False
+    capability_ranker_answer_locally: bool = False
+    capability_ranker_min_score: float = 6.0
+    capability_ranker_margin: float = 1.3
+    capability_ranker_shortlist_size: int = 10
+
+    # Keyword and age rules for experience groups; the LLM only sees ambiguous logs.
+    # Off by default: keyword matching is a blunt instrument on free-text notes
+    experience_group_rules_enabled: bool = False
+    experience_group_rules_min_score: float = 3.0
+
+    # improve_review: "targeted" regenerates only the sections the request touches
+    # (falling back to a full rewrite when unclear), "full" always rewrites everything
+    improve_review_strategy: str = "targeted"
+
+    # How improvements reuse the original text: "prediction" (predicted outputs),
+    # "patch" (SEARCH/REPLACE blocks applied locally), "off", or "auto" by deployment
+    improve_edit_mode: str = "auto"
+
+    # LLM response cache (TTL 0 disables caching for that operation)
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 512
+    llm_cache_shared_url: str = ""
+    llm_cache_ttl_select_capabilities: int = 3600
+    llm_cache_ttl_select_experience_groups: int = 3600
+    llm_cache_ttl_generate_title: int = 3600
+    llm_cache_ttl_improve_section: int = 600
+    llm_cache_ttl_generate_review: int = 0
+    llm_cache_ttl_improve_review: int = 0
+
+    # Share one upstream call between concurrent identical requests
+    llm_singleflight_enabled: bool = True
+
+    # Client-side rate limiting against the deployment's quota (per worker)
+    llm_scheduler_enabled: bool = True
+    llm_tokens_per_minute: int = 250000
+    llm_requests_per_minute: int = 1500
+    llm_max_concurrency: int = 32
+
+    # Hedged requests for short calls: a duplicate is sent when the first has taken
+    # longer than the operation's recent latency percentile; the slower one is cancelled
+    llm_hedging_enabled: bool = False
+    llm_hedging_operations: str = "select_capabilities,select_experience_groups,generate_title"
+    llm_hedging_percentile: float = 95.0
+    # Used until llm_hedging_min_samples calls of the operation have been seen
+    llm_hedging_default_delay_seconds: float = 2.0
+    llm_hedging_min_samples: int = 20
+    # Spend caps: hedges as a share of recent calls, and concurrent hedges per worker
+    llm_hedging_max_fraction: float = 0.1
+    llm_hedging_max_in_flight: int = 4
+
+    # Per-deployment circuit breaker: opens on a high share of failed or slow calls
+    # over the recent window, fails fast for open_seconds, then lets probes through
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_failure_threshold: float = 0.5
+    circuit_breaker_slow_call_seconds: float = 60.0
+    circuit_breaker_slow_call_threshold: float = 0.8
+    circuit_breaker_min_calls: int = 10
+    circuit_breaker_open_seconds: float = 30.0
+    circuit_breaker_half_open_max_calls: int = 1
+
+    # Admission control for POST routes: fast 503 + Retry-After instead of queueing (0 disables a limit)
+    admission_max_in_flight: int = 64
+    admission_max_queue_depth: int = 100
+    admission_retry_after_seconds: float = 2.0
 
 #     SYSTEM_PROMPT: str = """
 # You are an expert RCGP (Royal College of General Practitioners) Portfolio Assistant. Your task is to transform raw clinical notes into a high-quality "Clinical Case Review" (CCR) for a GP Trainee's ePortfolio.
@@ -588,6 +746,92 @@ I am aware that I need to continue to improve my skills in seeing patients in re
         kwargs['environment'] = os.environ.get('ENVIRONMENT', 'development')
         kwargs['portfolio_output_audit_enabled'] = os.environ.get('PORTFOLIO_OUTPUT_AUDIT_ENABLED', 'true').lower() == 'true'
         kwargs['portfolio_output_audit_csv_path'] = os.environ.get('PORTFOLIO_OUTPUT_AUDIT_CSV_PATH', '/tmp/portfolio_ai_outputs.csv')
+        kwargs['portfolio_output_audit_background'] = os.environ.get('PORTFOLIO_OUTPUT_AUDIT_BACKGROUND', 'true').lower() == 'true'
+        kwargs['portfolio_output_audit_queue_size'] = int(os.environ.get('PORTFOLIO_OUTPUT_AUDIT_QUEUE_SIZE', '1000'))
+        kwargs['portfolio_output_audit_batch_size'] = int(os.environ.get('PORTFOLIO_OUTPUT_AUDIT_BATCH_SIZE', '50'))
+        kwargs['portfolio_output_audit_flush_interval'] = float(os.environ.get('PORTFOLIO_OUTPUT_AUDIT_FLUSH_INTERVAL', '1.0'))
+        kwargs['portfolio_output_audit_overflow_policy'] = os.environ.get('PORTFOLIO_OUTPUT_AUDIT_OVERFLOW_POLICY', 'drop').lower()
+        # Rotation: size in bytes (0 disables), interval "hour", "day" or "" and compression "gzip", "zstd" or "none"
+        kwargs['portfolio_output_audit_rotate_max_bytes'] = int(os.environ.get('PORTFOLIO_OUTPUT_AUDIT_ROTATE_MAX_BYTES', str(50 * 1024 * 1024)))
+        kwargs['portfolio_output_audit_rotate_interval'] = os.environ.get('PORTFOLIO_OUTPUT_AUDIT_ROTATE_INTERVAL', 'day').lower()
+        kwargs['portfolio_output_audit_compression'] = os.environ.get('PORTFOLIO_OUTPUT_AUDIT_COMPRESSION', 'gzip').lower()
+
+        # Connection pool settings for the shared Azure OpenAI client
+        kwargs['openai_http2_enabled'] = os.environ.get('OPENAI_HTTP2_ENABLED', 'true').lower() == 'true'
+        kwargs['openai_max_connections'] = int(os.environ.get('OPENAI_MAX_CONNECTIONS', '100'))
+        kwargs['openai_max_keepalive_connections'] = int(os.environ.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+        kwargs['openai_keepalive_expiry'] = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', '30'))
+        kwargs['openai_timeout_seconds'] = float(os.environ.get('OPENAI_TIMEOUT_SECONDS', '120'))
+        kwargs['openai_connect_timeout_seconds'] = float(os.environ.get('OPENAI_CONNECT_TIMEOUT_SECONDS', '5'))
+        kwargs['openai_max_retries'] = int(os.environ.get('OPENAI_MAX_RETRIES', '2'))
+        kwargs['generation_mode'] = os.environ.get('GENERATION_MODE', 'single').lower()
+        kwargs['speculative_generation_enabled'] = os.environ.get('SPECULATIVE_GENERATION_ENABLED', 'false').lower() == 'true'
+        kwargs['speculative_generation_max_jobs'] = int(os.environ.get('SPECULATIVE_GENERATION_MAX_JOBS', '2'))
+        kwargs['speculative_generation_ttl_seconds'] = float(os.environ.get('SPECULATIVE_GENERATION_TTL_SECONDS', '120'))
+        kwargs['request_deadline_seconds'] = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '0'))
+        kwargs['route_deadlines'] = os.environ.get('ROUTE_DEADLINES', 'generate-review=120,improve-review=120,improve-section=60,select-capabilities=30,select-experience-groups=30,bulk/generate-reviews=210')
+        kwargs['title_min_budget_seconds'] = float(os.environ.get('TITLE_MIN_BUDGET_SECONDS', '5'))
+        kwargs['idempotency_enabled'] = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+        kwargs['idempotency_ttl_seconds'] = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '3600'))
+        kwargs['idempotency_max_entries'] = int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', '1000'))
+        kwargs['job_store_url'] = os.environ.get('JOB_STORE_URL', '')
+        kwargs['job_workers'] = int(os.environ.get('JOB_WORKERS', '4'))
+        kwargs['job_queue_size'] = int(os.environ.get('JOB_QUEUE_SIZE', '100'))
+        kwargs['job_result_ttl_seconds'] = int(os.environ.get('JOB_RESULT_TTL_SECONDS', '3600'))
+        kwargs['job_callback_timeout_seconds'] = float(os.environ.get('JOB_CALLBACK_TIMEOUT_SECONDS', '10'))
+        kwargs['job_lease_seconds'] = float(os.environ.get('JOB_LEASE_SECONDS', '120'))
+        # Comma-separated hostnames callbacks may target; empty refuses every callback_url
+        kwargs['job_callback_allowed_hosts'] = os.environ.get('JOB_CALLBACK_ALLOWED_HOSTS', '')
+        kwargs['bulk_concurrency'] = int(os.environ.get('BULK_CONCURRENCY', '4'))
+        kwargs['bulk_max_concurrency'] = int(os.environ.get('BULK_MAX_CONCURRENCY', '16'))
+        kwargs['bulk_max_cases'] = int(os.environ.get('BULK_MAX_CASES', '16'))
+        kwargs['title_strategy'] = os.environ.get('TITLE_STRATEGY', 'inline').lower()
+        kwargs['scoped_system_prompt_enabled'] = os.environ.get('SCOPED_SYSTEM_PROMPT_ENABLED', 'true').lower() == 'true'
+        kwargs['capability_ranker_enabled'] = os.environ.get('CAPABILITY_RANKER_ENABLED', 'false').lower() == 'true'
+        kwargs['capability_ranker_answer_locally'] = os.environ.get('CAPABILITY_RANKER_ANSWER_LOCALLY', 'false').lower() == 'true'
+        kwargs['capability_ranker_min_score'] = float(os.environ.get('CAPABILITY_RANKER_MIN_SCORE', '6.0'))
+        kwargs['capability_ranker_margin'] = float(os.environ.get('CAPABILITY_RANKER_MARGIN', '1.3'))
+        kwargs['capability_ranker_shortlist_size'] = int(os.environ.get('CAPABILITY_RANKER_SHORTLIST_SIZE', '10'))
+        kwargs['experience_group_rules_enabled'] = os.environ.get('EXPERIENCE_GROUP_RULES_ENABLED', 'false').lower() == 'true'
+        kwargs['experience_group_rules_min_score'] = float(os.environ.get('EXPERIENCE_GROUP_RULES_MIN_SCORE', '3.0'))
+        kwargs['improve_review_strategy'] = os.environ.get('IMPROVE_REVIEW_STRATEGY', 'targeted').lower()
+        kwargs['improve_edit_mode'] = os.environ.get('IMPROVE_EDIT_MODE', 'auto').lower()
+
+        # LLM response cache; LLM_CACHE_SHARED_URL is sqlite:///path or redis://host:port/db
+        kwargs['llm_cache_enabled'] = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        kwargs['llm_cache_max_entries'] = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '512'))
+        kwargs['llm_cache_shared_url'] = os.environ.get('LLM_CACHE_SHARED_URL', '')
+        kwargs['llm_cache_ttl_select_capabilities'] = int(os.environ.get('LLM_CACHE_TTL_SELECT_CAPABILITIES', '3600'))
+        kwargs['llm_cache_ttl_select_experience_groups'] = int(os.environ.get('LLM_CACHE_TTL_SELECT_EXPERIENCE_GROUPS', '3600'))
+        kwargs['llm_cache_ttl_generate_title'] = int(os.environ.get('LLM_CACHE_TTL_GENERATE_TITLE', '3600'))
+        kwargs['llm_cache_ttl_improve_section'] = int(os.environ.get('LLM_CACHE_TTL_IMPROVE_SECTION', '600'))
+        kwargs['llm_cache_ttl_generate_review'] = int(os.environ.get('LLM_CACHE_TTL_GENERATE_REVIEW', '0'))
+        kwargs['llm_cache_ttl_improve_review'] = int(os.environ.get('LLM_CACHE_TTL_IMPROVE_REVIEW', '0'))
+        kwargs['llm_singleflight_enabled'] = os.environ.get('LLM_SINGLEFLIGHT_ENABLED', 'true').lower() == 'true'
+        kwargs['llm_scheduler_enabled'] = os.environ.get('LLM_SCHEDULER_ENABLED', 'true').lower() == 'true'
+        kwargs['llm_tokens_per_minute'] = int(os.environ.get('LLM_TOKENS_PER_MINUTE', '250000'))
+        kwargs['llm_requests_per_minute'] = int(os.environ.get('LLM_REQUESTS_PER_MINUTE', '1500'))
+        kwargs['llm_max_concurrency'] = int(os.environ.get('LLM_MAX_CONCURRENCY', '32'))
+        kwargs['llm_hedging_enabled'] = os.environ.get('LLM_HEDGING_ENABLED', 'false').lower() == 'true'
+        kwargs['llm_hedging_operations'] = os.environ.get('LLM_HEDGING_OPERATIONS', 'select_capabilities,select_experience_groups,generate_title')
+        kwargs['llm_hedging_percentile'] = float(os.environ.get('LLM_HEDGING_PERCENTILE', '95'))
+        kwargs['llm_hedging_default_delay_seconds'] = float(os.environ.get('LLM_HEDGING_DEFAULT_DELAY_SECONDS', '2'))
+        kwargs['llm_hedging_min_samples'] = int(os.environ.get('LLM_HEDGING_MIN_SAMPLES', '20'))
+        kwargs['llm_hedging_max_fraction'] = float(os.environ.get('LLM_HEDGING_MAX_FRACTION', '0.1'))
+        kwargs['llm_hedging_max_in_flight'] = int(os.environ.get('LLM_HEDGING_MAX_IN_FLIGHT', '4'))
+        kwargs['circuit_breaker_enabled'] = os.environ.get('CIRCUIT_BREAKER_ENABLED', 'true').lower() == 'true'
+        kwargs['circuit_breaker_failure_threshold'] = float(os.environ.get('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '0.5'))
+        kwargs['circuit_breaker_slow_call_seconds'] = float(os.environ.get('CIRCUIT_BREAKER_SLOW_CALL_SECONDS', '60'))
+        kwargs['circuit_breaker_slow_call_threshold'] = float(os.environ.get('CIRCUIT_BREAKER_SLOW_CALL_THRESHOLD', '0.8'))
+        kwargs['circuit_breaker_min_calls'] = int(os.environ.get('CIRCUIT_BREAKER_MIN_CALLS', '10'))
+        kwargs['circuit_breaker_open_seconds'] = float(os.environ.get('CIRCUIT_BREAKER_OPEN_SECONDS', '30'))
+        kwargs['circuit_breaker_half_open_max_calls'] = int(os.environ.get('CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS', '1'))
+        kwargs['admission_max_in_flight'] = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '64'))
+        kwargs['admission_max_queue_depth'] = int(os.environ.get('ADMISSION_MAX_QUEUE_DEPTH', '100'))
+        kwargs['admission_retry_after_seconds'] = float(os.environ.get('ADMISSION_RETRY_AFTER_SECONDS', '2'))
+        kwargs['llm_providers'] = os.environ.get('LLM_PROVIDERS', '')
+        kwargs['llm_router_cooldown_seconds'] = float(os.environ.get('LLM_ROUTER_COOLDOWN_SECONDS', '30'))
+        kwargs['llm_router_provider_max_retries'] = int(os.environ.get('LLM_ROUTER_PROVIDER_MAX_RETRIES', '0'))
         
         # Update initialization to include Azure settings
         kwargs['azure_openai_api_key'] = os.environ.get('AZURE_OPENAI_API_KEY', '')
@@ -604,6 +848,12 @@ I am aware that I need to continue to improve my skills in seeing patients in re
         extra='ignore'
     )
 
+
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings instance (validated once per worker)."""
+    return Settings()
+
 # Updated capability content matching the new RCGP framework
 capability_content = """
 Fitness to practise
@@ -0,0 +1,230 @@
+# app/context.py
+from __future__ import annotations
+
+import asyncio
+import atexit
+import importlib.util
+import logging
+import os
+import threading
+from typing import Optional
+
+import httpx
+from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+
+from .config import Settings, get_settings
+from .services.portfolio_service import PortfolioService, sdk_max_retries
+from .services.jobs import JobManager, create_job_store
+from .services.idempotency import IdempotencyStore
+from .services.llm_router import LLMRouter, ChatProvider, parse_provider_specs
+from .services.openai_service import AzureOpenAIProvider, OpenAIProvider
+from .services.anthropic_service import AnthropicProvider
+from .services.circuit_breaker import CircuitBreakers
+from .utils.admission import AdmissionController
+from .utils.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def build_http_client(settings: Settings) -> httpx.AsyncClient:
+    """Build the pooled HTTP client used for every Azure OpenAI call in this worker."""
+    # HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it.
+    http2 = settings.openai_http2_enabled and importlib.util.find_spec("h2") is not None
+    if settings.openai_http2_enabled and not http2:
+        logger.info("h2 is not installed, Azure OpenAI connection pool will use HTTP/1.1")
+
+    return DefaultAsyncHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.openai_timeout_seconds,
+            connect=settings.openai_connect_timeout_seconds,
+        ),
+    )
+
+
+PROVIDER_TYPES = {
+    "azure": AzureOpenAIProvider,
+    "openai": OpenAIProvider,
+    "anthropic": AnthropicProvider,
+}
+
+
+def create_provider(spec: dict, settings: Settings, http_client: Optional[httpx.AsyncClient] = None) -> ChatProvider:
+    try:
+        provider_class = PROVIDER_TYPES[spec["type"]]
+    except KeyError:
+        raise ValueError(f"Unknown LLM provider type '{spec['type']}', expected one of {sorted(PROVIDER_TYPES)}")
+    return provider_class.from_spec(
+        spec,
+        settings,
+        http_client=http_client,
+        max_retries=settings.llm_router_provider_max_retries,
+    )
+
+
+def build_llm_router(
+    settings: Settings,
+    http_client: Optional[httpx.AsyncClient] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    breakers: Optional[CircuitBreakers] = None,
+) -> Optional[LLMRouter]:
+    """Router over the LLM_PROVIDERS deployments, or None to keep the single Azure client."""
+    specs = parse_provider_specs(settings.llm_providers)
+    if not specs:
+        return None
+    return LLMRouter(
+        [create_provider(spec, settings, http_client) for spec in specs],
+        cooldown_seconds=settings.llm_router_cooldown_seconds,
+        metrics=metrics,
+        breakers=breakers,
+    )
+
+
+def build_admission_controller(settings: Settings, portfolio_service: PortfolioService) -> AdmissionController:
+    scheduler = portfolio_service.scheduler
+    breakers = portfolio_service.circuit_breakers
+    return AdmissionController(
+        max_in_flight=settings.admission_max_in_flight,
+        max_queue_depth=settings.admission_max_queue_depth,
+        retry_after_seconds=settings.admission_retry_after_seconds,
+        queue_depth=(lambda: scheduler.queue_depth) if scheduler is not None else None,
+        circuit_retry_after=breakers.retry_after if breakers is not None else None,
+        metrics=portfolio_service.metrics,
+    )
+
+
+def build_job_manager(settings: Settings, portfolio_service: PortfolioService) -> JobManager:
+    """Job kinds map onto the PortfolioService calls behind the synchronous routes."""
+    if not settings.job_store_url and os.environ.get("FUNCTIONS_WORKER_RUNTIME"):
+        logger.warning(
+            "JOB_STORE_URL is not set: jobs are kept in memory per Functions instance, so status polls "
+            "served by another instance or after a recycle return 404"
+        )
+    handlers = {
+        "generate_review": lambda payload: portfolio_service.generate_case_review(**payload),
+        "improve_review": lambda payload: portfolio_service.improve_case_review(**payload),
+    }
+    return JobManager(
+        create_job_store(settings.job_store_url),
+        handlers,
+        workers=settings.job_workers,
+        queue_size=settings.job_queue_size,
+        result_ttl=settings.job_result_ttl_seconds,
+        callback_timeout=settings.job_callback_timeout_seconds,
+        lease_seconds=settings.job_lease_seconds,
+        callback_allowed_hosts=[host.strip() for host in settings.job_callback_allowed_hosts.split(",")],
+        metrics=portfolio_service.metrics,
+    )
+
+
+class AppContext:
+    """Process-wide resources shared by the FastAPI app and the Functions handlers."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        http_client: httpx.AsyncClient,
+        openai_client: AsyncAzureOpenAI,
+        portfolio_service: PortfolioService,
+        job_manager: Optional[JobManager] = None,
+    ):
+        self.settings = settings
+        self.http_client = http_client
+        self.openai_client = openai_client
+        self.portfolio_service = portfolio_service
+        self.job_manager = job_manager or build_job_manager(settings, portfolio_service)
+        self.idempotency_store = None
+        if settings.idempotency_enabled:
+            self.idempotency_store = IdempotencyStore(
+                ttl_seconds=settings.idempotency_ttl_seconds,
+                max_entries=settings.idempotency_max_entries,
+                metrics=portfolio_service.metrics,
+            )
+        self.admission = build_admission_controller(settings, portfolio_service)
+        self.closed = False
+
+    @classmethod
+    def create(cls, settings: Optional[Settings] = None) -> "AppContext":
+        settings = settings or get_settings()
+        http_client = build_http_client(settings)
+        openai_client = AsyncAzureOpenAI(
+            azure_endpoint=settings.azure_openai_endpoint,
+            api_key=settings.azure_openai_api_key,
+            api_version=settings.azure_openai_api_version,
+            max_retries=sdk_max_retries(settings),
+            http_client=http_client,
+        )
+        metrics = MetricsRegistry()
+        breakers = CircuitBreakers.from_settings(settings, metrics)
+        portfolio_service = PortfolioService(
+            settings,
+            openai_client=openai_client,
+            metrics=metrics,
+            router=build_llm_router(settings, http_client, metrics, breakers),
+            circuit_breakers=breakers,
+        )
+        return cls(settings, http_client, openai_client, portfolio_service)
+
+    async def aclose(self) -> None:
+        """Drain the connection pool. Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        await self.job_manager.aclose()
+        await self.portfolio_service.aclose()
+        await self.openai_client.close()
+
+
+_context: Optional[AppContext] = None
+_context_lock = threading.Lock()
+
+
+def get_app_context() -> AppContext:
+    """Return the worker's shared context, creating it on first use."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = AppContext.create()
+    return _context
+
+
+def get_portfolio_service() -> PortfolioService:
+    return get_app_context().portfolio_service
+
+
+def get_job_manager() -> JobManager:
+    return get_app_context().job_manager
+
+
+def get_idempotency_store() -> Optional[IdempotencyStore]:
+    return get_app_context().idempotency_store
+
+
+def get_admission_controller() -> AdmissionController:
+    return get_app_context().admission
+
+
+async def close_app_context() -> None:
+    """Close and forget the shared context (FastAPI shutdown, tests)."""
+    global _context
+    with _context_lock:
+        context, _context = _context, None
+    if context is not None:
+        await context.aclose()
+
+
+@atexit.register
+def _close_app_context_at_exit() -> None:
+    # Azure Functions has no shutdown hook, so drain whatever is left when the worker exits.
+    if _context is None or _context.closed:
+        return
+    try:
+        asyncio.run(close_app_context())
+    except Exception as exc:
+        logger.debug("Failed to close app context at exit: %s", exc)
@@ -2,34 +2,54 @@
 
 
 # app/main.py
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from typing import List, Optional
 import logging
 from .models import (
     CaseReviewRequest,
     CaseReviewResponse,
+    CaseReviewJobRequest,
+    CaseIntakeRequest,
     ImprovementRequest,
+    ImprovementJobRequest,
+    JobStatusResponse,
     CapabilitiesResponse,
     ErrorResponse
 )
 from .services.portfolio_service import PortfolioService
-from .config import Settings
+from .services.jobs import JobManager, JobQueueFullError, SUCCEEDED, FAILED, job_status
+from .services.bulk import BulkRunner, parse_bulk_cases
+from .services.idempotency import IdempotencyMiddleware
+from .utils.deadline import DeadlineMiddleware, parse_route_deadlines
+from .utils.admission import AdmissionMiddleware
+from .config import get_settings
+from .context import get_admission_controller, get_app_context, get_idempotency_store, close_app_context
+from .utils.streaming import encode_events, format_ndjson, format_sse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One PortfolioService and Azure OpenAI connection pool per worker
+    app.state.context = get_app_context()
+    yield
+    await close_app_context()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="GP Portfolio API",
     description="API for generating and managing GP portfolio case reviews",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Load settings
-settings = Settings()
+settings = get_settings()
 
 # Configure CORS
 origins = [
@@ -39,6 +59,21 @@ origins = [
     "http://127.0.0.1:3001",
 ]
 
+# Retried POSTs with the same Idempotency-Key join or replay the first execution
+app.add_middleware(IdempotencyMiddleware, get_store=get_idempotency_store)
+
+# Per-request time budget; cancels in-flight LLM calls when the client disconnects
+app.add_middleware(
+    DeadlineMiddleware,
+    route_deadlines=parse_route_deadlines(settings.route_deadlines),
+    default_seconds=settings.request_deadline_seconds,
+    get_metrics=lambda: get_app_context().portfolio_service.metrics,
+)
+
+# Fast 503 + Retry-After for POSTs when overloaded or every LLM circuit is open;
+# GET routes such as /health and /api/capabilities are never held back
+app.add_middleware(AdmissionMiddleware, get_controller=get_admission_controller)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -58,7 +93,10 @@ async def health_check():
 
 # Dependency to get portfolio service
 def get_portfolio_service():
-    return PortfolioService(settings)
+    return get_app_context().portfolio_service
+
+def get_job_manager():
+    return get_app_context().job_manager
 
 @app.post("/api/generate-review", response_model=CaseReviewResponse)
 async def generate_review(
@@ -69,13 +107,75 @@ async def generate_review(
         logger.info(f"Generating review for case with {len(request.selected_capabilities)} capabilities")
         result = await portfolio_service.generate_case_review(
             case_description=request.case_description,
-            selected_capabilities=request.selected_capabilities
+            selected_capabilities=request.selected_capabilities,
+            generation_mode=request.generation_mode
         )
         return result
     except Exception as e:
         logger.error(f"Error generating review: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate-review/stream")
+async def generate_review_stream(
+    request: CaseReviewRequest,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    logger.info(f"Streaming review for case with {len(request.selected_capabilities)} capabilities")
+    events = portfolio_service.stream_case_review(
+        case_description=request.case_description,
+        selected_capabilities=request.selected_capabilities,
+        generation_mode=request.generation_mode
+    )
+    return StreamingResponse(
+        encode_events(events, format_sse),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/case-intake")
+async def case_intake(
+    request: CaseIntakeRequest,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    logger.info("Running case intake pipeline")
+    events = portfolio_service.run_case_intake(
+        case_description=request.case_description,
+        selected_capabilities=request.selected_capabilities,
+        generation_mode=request.generation_mode
+    )
+    return StreamingResponse(
+        encode_events(events, format_sse),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/bulk/generate-reviews")
+async def bulk_generate_reviews(
+    request: Request,
+    concurrency: Optional[int] = None,
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    """JSONL cases in, one NDJSON result per case (completion order) and a summary out."""
+    try:
+        cases = parse_bulk_cases((await request.body()).decode("utf-8").splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not cases:
+        raise HTTPException(status_code=400, detail="No cases in request body")
+    if len(cases) > settings.bulk_max_cases:
+        raise HTTPException(status_code=413, detail=f"At most {settings.bulk_max_cases} cases per request; use POST /api/jobs/generate-review per case for larger batches")
+
+    logger.info(f"Bulk generating {len(cases)} reviews")
+    runner = BulkRunner(
+        portfolio_service,
+        concurrency=min(concurrency or settings.bulk_concurrency, settings.bulk_max_concurrency)
+    )
+    return StreamingResponse(
+        encode_events(runner.run(cases), format_ndjson),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/improve-review", response_model=CaseReviewResponse)
 async def improve_review(
     request: ImprovementRequest,
@@ -86,13 +186,69 @@ async def improve_review(
         result = await portfolio_service.improve_case_review(
             original_case=request.original_case,
             improvement_prompt=request.improvement_prompt,
-            selected_capabilities=request.selected_capabilities
+            selected_capabilities=request.selected_capabilities,
+            case_title=request.case_title
         )
         return result
     except Exception as e:
         logger.error(f"Error improving review: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def submit_job(job_manager: JobManager, kind: str, request) -> JSONResponse:
+    try:
+        record = await job_manager.submit(
+            kind,
+            request.model_dump(exclude={"callback_url"}),
+            callback_url=request.callback_url
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    status = job_status(record)
+    return JSONResponse(status_code=202, content=status.model_dump(), headers={"Location": status.status_url})
+
+@app.post("/api/jobs/generate-review", response_model=JobStatusResponse, status_code=202)
+async def submit_generate_review_job(
+    request: CaseReviewJobRequest,
+    job_manager: JobManager = Depends(get_job_manager)
+):
+    logger.info(f"Queueing review generation for case with {len(request.selected_capabilities)} capabilities")
+    return await submit_job(job_manager, "generate_review", request)
+
+@app.post("/api/jobs/improve-review", response_model=JobStatusResponse, status_code=202)
+async def submit_improve_review_job(
+    request: ImprovementJobRequest,
+    job_manager: JobManager = Depends(get_job_manager)
+):
+    logger.info("Queueing review improvement")
+    return await submit_job(job_manager, "improve_review", request)
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    job_manager: JobManager = Depends(get_job_manager)
+):
+    record = await job_manager.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job_status(record)
+
+@app.get("/api/jobs/{job_id}/result", response_model=CaseReviewResponse)
+async def get_job_result(
+    job_id: str,
+    job_manager: JobManager = Depends(get_job_manager)
+):
+    record = await job_manager.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if record.status == FAILED:
+        raise HTTPException(status_code=500, detail=record.error)
+    if record.status != SUCCEEDED:
+        # Not finished yet: report progress instead of a result
+        return JSONResponse(status_code=202, content=job_status(record).model_dump())
+    return record.result
+
 @app.get("/api/capabilities", response_model=CapabilitiesResponse)
 async def get_capabilities(
     portfolio_service: PortfolioService = Depends(get_portfolio_service)
@@ -106,6 +262,12 @@ async def get_capabilities(
         logger.error(f"Error fetching capabilities: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/metrics")
+async def get_metrics(
+    portfolio_service: PortfolioService = Depends(get_portfolio_service)
+):
+    return portfolio_service.get_metrics()
+
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -2,6 +2,18 @@
 from typing import Callable
 import azure.functions as func
 import json
+from urllib.parse import urlparse
+from app.context import get_app_context
+from app.utils.deadline import DEADLINE_HEADER, deadline_exceeded, parse_route_deadlines, request_budget, request_deadline
+from app.utils.admission import rejection_body, retry_after_header
+from app.services.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    REPLAYED_HEADER,
+    IdempotencyConflictError,
+    StoredResponse,
+    request_fingerprint,
+)
 
 def cors_middleware(func_handler: Callable) -> Callable:
     async def wrapper(req: func.HttpRequest) -> func.HttpResponse:
@@ -12,7 +24,7 @@ def cors_middleware(func_handler: Callable) -> Callable:
                 headers={
                     "Access-Control-Allow-Origin": "*",
                     "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+                    "Access-Control-Allow-Headers": "Content-Type,Authorization,Idempotency-Key,X-Request-Timeout",
                     "Access-Control-Max-Age": "86400",
                 }
             )
@@ -24,12 +36,108 @@ def cors_middleware(func_handler: Callable) -> Callable:
         # Add CORS headers to response
         response.headers['Access-Control-Allow-Origin'] = "*"
         response.headers['Access-Control-Allow-Methods'] = "GET, POST, OPTIONS"
-        response.headers['Access-Control-Allow-Headers'] = "Content-Type,Authorization"
+        response.headers['Access-Control-Allow-Headers'] = "Content-Type,Authorization,Idempotency-Key,X-Request-Timeout"
         
         return response
     
     return wrapper
 
+def with_deadline(func_handler: Callable) -> Callable:
+    """Run the handler under the route's time budget (see app.utils.deadline).
+
+    The Functions host gives no disconnect signal, so only the deadline applies here.
+    """
+    async def wrapper(req: func.HttpRequest) -> func.HttpResponse:
+        settings = get_app_context().settings
+        budget = request_budget(
+            urlparse(req.url).path,
+            req.headers.get(DEADLINE_HEADER),
+            parse_route_deadlines(settings.route_deadlines),
+            settings.request_deadline_seconds
+        )
+        with request_deadline(budget):
+            response = await func_handler(req)
+            if response.status_code == 500 and deadline_exceeded():
+                response = func.HttpResponse(
+                    response.get_body(),
+                    status_code=504,
+                    headers=dict(response.headers),
+                    mimetype=response.mimetype
+                )
+        return response
+    
+    return wrapper
+
+def with_admission(func_handler: Callable) -> Callable:
+    """Answer with a fast 503 + Retry-After when overloaded or every LLM circuit is open (see AdmissionController)."""
+    async def wrapper(req: func.HttpRequest) -> func.HttpResponse:
+        controller = get_app_context().admission
+        rejection = controller.rejection()
+        if rejection is not None:
+            reason, retry_after = rejection
+            controller.reject(reason)
+            return func.HttpResponse(
+                rejection_body(reason),
+                status_code=503,
+                headers={"Retry-After": retry_after_header(retry_after)},
+                mimetype="application/json"
+            )
+
+        controller.in_flight += 1
+        try:
+            response = await func_handler(req)
+        finally:
+            controller.in_flight -= 1
+        retry_after = controller.degraded_retry_after(response.status_code)
+        if retry_after is not None:
+            headers = dict(response.headers)
+            headers["Retry-After"] = retry_after_header(retry_after)
+            response = func.HttpResponse(
+                response.get_body(),
+                status_code=503,
+                headers=headers,
+                mimetype=response.mimetype
+            )
+        return response
+    
+    return wrapper
+
+def idempotent(func_handler: Callable) -> Callable:
+    """Join or replay requests that repeat an Idempotency-Key (see IdempotencyStore)."""
+    async def wrapper(req: func.HttpRequest) -> func.HttpResponse:
+        key = req.headers.get(IDEMPOTENCY_HEADER)
+        store = get_app_context().idempotency_store if key is not None else None
+        if store is None:
+            return await func_handler(req)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return handle_response(error=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters", status_code=400)
+
+        async def execute() -> StoredResponse:
+            response = await func_handler(req)
+            return StoredResponse(
+                response.status_code,
+                list(response.headers.items()),
+                response.get_body(),
+                media_type=response.mimetype
+            )
+
+        try:
+            stored, replayed = await store.run(urlparse(req.url).path, key, request_fingerprint(req.get_body()), execute)
+        except IdempotencyConflictError as e:
+            return handle_response(error=str(e), status_code=422)
+
+        headers = dict(stored.headers)
+        if replayed:
+            headers[REPLAYED_HEADER] = "true"
+        return func.HttpResponse(
+            stored.body,
+            status_code=stored.status_code,
+            headers=headers,
+            mimetype=stored.media_type
+        )
+    
+    return wrapper
+
 def handle_response(data: dict = None, error: str = None, status_code: int = 200) -> func.HttpResponse:
     """Helper function to create consistent HTTP responses"""
     if error:
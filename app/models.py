@@ -1,10 +1,11 @@
 # app/models.py
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional
 
 class CaseReviewRequest(BaseModel):
     case_description: str = Field(..., min_length=10, description="The case description to review")
     selected_capabilities: List[str] = Field(..., min_items=1, max_items=3, description="List of selected capabilities")
+    generation_mode: Optional[Literal["single", "pipelined", "structured"]] = Field(None, description="single: one completion; pipelined: sections generated concurrently; structured: one JSON-schema completion. Defaults to the server setting")
 
 class CaseReviewSection(BaseModel):
     brief_description: str
@@ -15,10 +16,23 @@ class CaseReviewSection(BaseModel):
     class Config:
         from_attributes = True
 
+class StructuredCapability(BaseModel):
+    name: str
+    justification: str
+
+class StructuredCaseReview(BaseModel):
+    """Shape of a review generated with generation_mode="structured" (see app.utils.structured_review)."""
+    title: str
+    brief_description: str
+    capabilities: List[StructuredCapability]
+    reflection: str
+    learning_needs: str
+
 class CaseReviewResponse(BaseModel):
     case_title: str
     review_content: str
     sections: CaseReviewSection
+    generation_mode: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -27,6 +41,24 @@ class ImprovementRequest(BaseModel):
     original_case: str
     improvement_prompt: str
     selected_capabilities: List[str]
+    case_title: Optional[str] = Field(None, description="Current title, reused when the brief description is unchanged")
+
+class CaseReviewJobRequest(CaseReviewRequest):
+    callback_url: Optional[str] = Field(None, description="URL to POST the finished job to")
+
+class ImprovementJobRequest(ImprovementRequest):
+    callback_url: Optional[str] = Field(None, description="URL to POST the finished job to")
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    created_at: float
+    updated_at: float
+    expires_at: Optional[float] = Field(None, description="When a finished job's result is discarded (epoch seconds)")
+    error: Optional[str] = None
+    status_url: str
+    result_url: str
 
 class CapabilitiesResponse(BaseModel):
     capabilities: Dict[str, List[str]]
@@ -49,9 +81,24 @@ class CapabilitySelectionRequest(BaseModel):
 
 class CapabilitySelectionResponse(BaseModel):
     selected_capabilities: List[str] = Field(..., description="AI-selected capabilities (1-3)")
+    selection_path: Optional[str] = Field(None, description="How the selection was made: local, llm_shortlist or llm_full")
+    speculation_id: Optional[str] = Field(None, description="Set when a review for these capabilities is already being generated")
 
 class ExperienceGroupRequest(BaseModel):
     case_description: str = Field(..., min_length=10, description="The case description to analyze")
 
 class ExperienceGroupResponse(BaseModel):
-    experience_groups: List[str] = Field(..., description="AI-selected Clinical Experience Groups (1-2)")
\ No newline at end of file
+    experience_groups: List[str] = Field(..., description="AI-selected Clinical Experience Groups (1-2)")
+    selection_path: Optional[str] = Field(None, description="How the selection was made: local or llm")
+
+class CaseIntakeRequest(BaseModel):
+    case_description: str = Field(..., min_length=10, description="The case description to review")
+    selected_capabilities: Optional[List[str]] = Field(None, min_items=1, max_items=3, description="Skip capability selection and use these")
+    generation_mode: Optional[Literal["single", "pipelined", "structured"]] = Field(None, description="single: one completion; pipelined: sections generated concurrently; structured: one JSON-schema completion. Defaults to the server setting")
+
+class CaseIntakeResponse(BaseModel):
+    selected_capabilities: List[str]
+    capability_selection_path: Optional[str] = None
+    experience_groups: List[str]
+    experience_group_selection_path: Optional[str] = None
+    review: CaseReviewResponse
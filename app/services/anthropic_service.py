@@ -0,0 +1,148 @@
+# app/services/anthropic_service.py
+from __future__ import annotations
+
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from anthropic import AsyncAnthropic
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from ..config import Settings
+from .llm_router import ChatProvider, ProviderResponse
+
+FINISH_REASONS = {
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "max_tokens": "length",
+}
+
+
+def to_anthropic_request(request: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Translate an OpenAI chat request into Messages API arguments.
+
+    System messages move to the top-level system prompt, consecutive turns from the
+    same role are merged (the API requires alternation), and OpenAI-only options
+    such as prediction are dropped.
+    """
+    system = "\n\n".join(message["content"] for message in request["messages"] if message["role"] == "system")
+    turns: List[Dict[str, str]] = []
+    for message in request["messages"]:
+        if message["role"] == "system":
+            continue
+        role = "assistant" if message["role"] == "assistant" else "user"
+        if turns and turns[-1]["role"] == role:
+            turns[-1]["content"] += "\n\n" + message["content"]
+        else:
+            turns.append({"role": role, "content": message["content"]})
+
+    arguments: Dict[str, Any] = {
+        "model": model,
+        "max_tokens": request["max_tokens"],
+        "messages": turns,
+    }
+    if system:
+        arguments["system"] = system
+    if request.get("temperature") is not None:
+        # OpenAI allows 0-2, Anthropic 0-1
+        arguments["temperature"] = min(request["temperature"], 1.0)
+    if request.get("stop"):
+        stop = request["stop"]
+        arguments["stop_sequences"] = [stop] if isinstance(stop, str) else list(stop)
+    return arguments
+
+
+def to_chat_completion(message: Any) -> ChatCompletion:
+    usage = message.usage
+    # input_tokens excludes prompt-cache reads and writes; OpenAI counts them all as prompt tokens
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    prompt_tokens = usage.input_tokens + cache_read + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+    return ChatCompletion.model_validate({
+        "id": message.id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": message.model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": FINISH_REASONS.get(message.stop_reason, "stop"),
+            "message": {
+                "role": "assistant",
+                "content": "".join(block.text for block in message.content if block.type == "text"),
+            },
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": usage.output_tokens,
+            "total_tokens": prompt_tokens + usage.output_tokens,
+            "prompt_tokens_details": {"cached_tokens": cache_read},
+        },
+    })
+
+
+def _chunk(message_id: str, model: str, content: Optional[str] = None, finish_reason: Optional[str] = None) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate({
+        "id": message_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "delta": {"content": content} if content is not None else {},
+            "finish_reason": finish_reason,
+        }],
+    })
+
+
+async def to_chat_chunks(events: AsyncIterator[Any], model: str) -> AsyncIterator[ChatCompletionChunk]:
+    """Re-emit a Messages API event stream as OpenAI chat completion chunks."""
+    message_id = ""
+    try:
+        async for event in events:
+            if event.type == "message_start":
+                message_id = event.message.id
+            elif event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                yield _chunk(message_id, model, content=event.delta.text)
+            elif event.type == "message_delta" and event.delta.stop_reason:
+                yield _chunk(message_id, model, finish_reason=FINISH_REASONS.get(event.delta.stop_reason, "stop"))
+    finally:
+        close = getattr(events, "close", None)
+        if close is not None:
+            await close()
+
+
+class AnthropicProvider(ChatProvider):
+    """Anthropic's Messages API behind the OpenAI chat completion interface."""
+
+    kind = "anthropic"
+    # response_format has no Messages API equivalent and is dropped by to_anthropic_request
+    supports_response_format = False
+    quota_headers = ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-limit")
+
+    def __init__(self, name: str, client: AsyncAnthropic, model: str, weight: float = 1.0):
+        super().__init__(name, model, weight)
+        self.client = client
+
+    async def create(self, request: Dict[str, Any]) -> ProviderResponse:
+        arguments = to_anthropic_request(request, self.model)
+        if request.get("stream"):
+            raw = await self.client.messages.with_raw_response.create(**arguments, stream=True)
+            return ProviderResponse(to_chat_chunks(raw.parse(), self.model), raw.headers)
+        raw = await self.client.messages.with_raw_response.create(**arguments)
+        return ProviderResponse(to_chat_completion(raw.parse()), raw.headers)
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: Dict[str, Any],
+        settings: Settings,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_retries: int = 0,
+    ) -> "AnthropicProvider":
+        model = spec.get("model") or settings.anthropic_model
+        client = AsyncAnthropic(
+            api_key=spec.get("api_key") or settings.anthropic_api_key,
+            base_url=spec.get("base_url"),
+            max_retries=max_retries,
+            http_client=http_client,
+        )
+        return cls(spec.get("name") or f"anthropic/{model}", client, model, weight=float(spec.get("weight", 1.0)))
@@ -0,0 +1,176 @@
+# app/services/bulk.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from ..utils.deadline import DeadlineExceeded, deadline_exceeded
+from ..utils.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def parse_bulk_cases(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Read JSONL cases; each needs case_description and may set id, selected_capabilities, generation_mode."""
+    cases = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            case = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}")
+        if not isinstance(case, dict) or not str(case.get("case_description") or "").strip():
+            raise ValueError(f"Line {number} has no case_description")
+        case.setdefault("id", f"case-{number}")
+        case["id"] = str(case["id"])
+        cases.append(case)
+    return cases
+
+
+def read_completed_ids(lines: Iterable[str]) -> Set[str]:
+    """Ids already generated successfully in an earlier run's NDJSON output (the checkpoint)."""
+    completed = set()
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            # A run killed mid-write leaves a partial last line
+            continue
+        data = event.get("data") or {}
+        if event.get("event") == "result" and data.get("status") == "ok":
+            completed.add(data["id"])
+    return completed
+
+
+class BulkRunner:
+    """Runs capability selection, experience groups and generation for many cases.
+
+    At most `concurrency` cases are in flight; results are yielded in completion
+    order so they can be streamed and checkpointed as they arrive.
+    """
+
+    def __init__(
+        self,
+        portfolio_service,
+        concurrency: int = 4,
+        completed_ids: Optional[Set[str]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.portfolio_service = portfolio_service
+        self.concurrency = max(1, concurrency)
+        self.completed_ids = set(completed_ids or ())
+        self.on_result = on_result
+
+    async def run(self, cases: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        pending = [case for case in cases if case["id"] not in self.completed_ids]
+        skipped = len(cases) - len(pending)
+        started = time.monotonic()
+        latencies: List[float] = []
+        failed = 0
+
+        inbox: asyncio.Queue = asyncio.Queue()
+        for case in pending:
+            inbox.put_nowait(case)
+        outbox: asyncio.Queue = asyncio.Queue()
+        workers = [
+            asyncio.create_task(self._worker(inbox, outbox))
+            for _ in range(min(self.concurrency, len(pending)))
+        ]
+        remaining = len(workers)
+        try:
+            while remaining:
+                item = await outbox.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                if item["status"] == "ok":
+                    latencies.append(item["latency_seconds"])
+                else:
+                    failed += 1
+                if self.on_result is not None:
+                    self.on_result(item)
+                yield {"event": "result", "data": item}
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        elapsed = time.monotonic() - started
+        yield {
+            "event": "summary",
+            "data": {
+                "total": len(cases),
+                "succeeded": len(latencies),
+                "failed": failed,
+                "skipped": skipped,
+                "elapsed_seconds": round(elapsed, 3),
+                "cases_per_minute": round(len(latencies) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+                "latency_p50_seconds": round(percentile(latencies, 0.5), 3),
+                "latency_p95_seconds": round(percentile(latencies, 0.95), 3),
+                "latency_max_seconds": round(max(latencies, default=0.0), 3),
+            },
+        }
+
+    async def _worker(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        try:
+            while not inbox.empty():
+                case = inbox.get_nowait()
+                await outbox.put(await self._process(case))
+        finally:
+            await outbox.put(_DONE)
+
+    async def _process(self, case: Dict[str, Any]) -> Dict[str, Any]:
+        service = self.portfolio_service
+        started = time.monotonic()
+        stages: Dict[str, float] = {}
+        result: Dict[str, Any] = {"id": case["id"]}
+
+        async def timed(stage: str, call):
+            stage_started = time.monotonic()
+            try:
+                return await call
+            finally:
+                stages[stage] = round(time.monotonic() - stage_started, 3)
+
+        try:
+            if deadline_exceeded():
+                # Fail the rest fast so the finished results still make it into the response
+                raise DeadlineExceeded("Request deadline passed before the case started")
+            description = case["case_description"]
+            capabilities = case.get("selected_capabilities")
+            groups_call = timed("experience_groups", service.classify_experience_groups(description))
+            if capabilities:
+                groups = await groups_call
+                result["selection_path"] = "provided"
+            else:
+                selection, groups = await asyncio.gather(
+                    timed("capabilities", service.select_capabilities(description)),
+                    groups_call,
+                )
+                capabilities = selection.selected_capabilities
+                result["selection_path"] = selection.selection_path
+            result["selected_capabilities"] = capabilities
+            result["experience_groups"] = groups.experience_groups
+
+            review = await timed("generation", service.generate_case_review(
+                description,
+                capabilities,
+                generation_mode=case.get("generation_mode"),
+            ))
+            result["review"] = review.model_dump()
+            result["status"] = "ok"
+        except Exception as e:
+            logger.warning("Bulk case %s failed: %s", case["id"], e)
+            result["status"] = "error"
+            result["error"] = str(e)
+
+        result["latency_seconds"] = round(time.monotonic() - started, 3)
+        result["stage_seconds"] = stages
+        return result
@@ -0,0 +1,134 @@
+# app/services/capability_ranker.py
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.prompt_builder import DescriptorIndex
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or other our
+out over own same she should so some such than that the their them then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you your
+patient patients also within using use well who
+""".split())
+
+# Clinical phrasing that signals each capability in trainee notes, in addition to the RCGP text
+CAPABILITY_KEYWORDS: Dict[str, List[str]] = {
+    "Fitness to practise": ["tired", "burnout", "stress", "wellbeing", "sick", "fatigue", "error", "mistake", "complaint", "gmc", "limits"],
+    "An ethical approach": ["consent", "capacity", "confidentiality", "ethical", "ethics", "autonomy", "dilemma", "discrimination", "dignity", "respect"],
+    "Communicating and consulting": ["explained", "communication", "rapport", "ice", "concerns", "expectations", "interpreter", "telephone", "video", "listened", "reassured", "language", "hearing"],
+    "Data gathering and interpretation": ["history", "bloods", "results", "investigations", "ecg", "xray", "records", "observations", "obs", "test", "scan", "urine"],
+    "Clinical examination and procedural skills": ["examined", "examination", "auscultation", "palpation", "procedure", "otoscopy", "fundoscopy", "smear", "injection", "swab", "chaperone"],
+    "Decision-making and diagnosis": ["diagnosis", "differential", "differentials", "suspected", "ruled", "likely", "red", "flags", "uncertainty", "impression", "working"],
+    "Clinical management": ["prescribed", "started", "management", "treatment", "antibiotics", "safety", "netting", "netted", "follow", "dose", "medication", "plan", "referred"],
+    "Medical complexity": ["comorbidities", "multimorbidity", "polypharmacy", "complex", "chronic", "multiple", "frailty", "interactions", "uncertainty"],
+    "Team working": ["nurse", "colleague", "colleagues", "paramedics", "mdt", "handover", "team", "pharmacist", "supervisor", "discussed", "district", "social"],
+    "Performance, learning and teaching": ["teaching", "taught", "audit", "learning", "tutorial", "students", "feedback", "cpd", "guideline", "reading"],
+    "Organisation, management and leadership": ["rota", "organised", "system", "process", "leadership", "prioritised", "workload", "computer", "clinic", "practice", "significant", "event"],
+    "Holistic practice, health promotion and safeguarding": ["safeguarding", "social", "family", "carer", "smoking", "alcohol", "lifestyle", "psychosocial", "holistic", "domestic", "abuse", "wellbeing", "housing"],
+    "Community health and environmental sustainability": ["community", "population", "sustainability", "environmental", "carbon", "inhalers", "deprivation", "local", "services", "overprescribing", "green"],
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def stem(word: str) -> str:
+    """Very light suffix stripping so 'examined'/'examination' share a term."""
+    for suffix in ("ations", "ation", "ings", "ing", "ised", "ized", "ment", "ness", "ies", "ed", "es", "ly", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+class CapabilityRanking:
+    def __init__(self, scores: List[Tuple[str, float]], selected: List[str], confident: bool):
+        self.scores = scores
+        self.selected = selected
+        self.confident = confident
+
+    def top(self, k: int) -> List[str]:
+        return [name for name, _ in self.scores[:k]]
+
+
+class CapabilityRanker:
+    """BM25 over the capability index (names, descriptions, descriptors and clinical keywords).
+
+    With 13 short documents a ranking takes microseconds, so it runs before every
+    selection call.
+    """
+
+    def __init__(
+        self,
+        documents: Dict[str, str],
+        min_score: float = 6.0,
+        margin: float = 1.3,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.names = list(documents)
+        self.min_score = min_score
+        self.margin = margin
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(documents[name])) for name in self.names]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / max(1, len(self.lengths))
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        total = len(self.names)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    @classmethod
+    def from_sources(
+        cls,
+        capabilities: Dict[str, List[str]],
+        descriptor_index: Optional[DescriptorIndex] = None,
+        **kwargs,
+    ) -> "CapabilityRanker":
+        documents = {}
+        for name, descriptions in capabilities.items():
+            parts = [name] * 3 + descriptions + [" ".join(CAPABILITY_KEYWORDS.get(name, []))] * 2
+            if descriptor_index is not None and name in descriptor_index.descriptors:
+                parts.append(descriptor_index.descriptors[name])
+            documents[name] = "\n".join(parts)
+        return cls(documents, **kwargs)
+
+    def score(self, text: str) -> List[Tuple[str, float]]:
+        query_terms = set(tokenize(text))
+        scores = []
+        for index, name in enumerate(self.names):
+            counts = self.term_counts[index]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / self.average_length)
+            total = 0.0
+            for term in query_terms:
+                frequency = counts.get(term)
+                if frequency:
+                    total += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append((name, total))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+
+    def rank(self, text: str) -> CapabilityRanking:
+        """Rank every capability and decide whether the top 2-3 are clear enough to use directly."""
+        scores = self.score(text)
+        values = [score for _, score in scores]
+        count = 3 if len(values) > 3 and values[2] >= 0.8 * values[0] else 2
+        selected = [name for name, _ in scores[:count]]
+        next_score = values[count] if len(values) > count else 0.0
+        confident = (
+            values[0] >= self.min_score
+            and values[count - 1] > 0
+            and values[count - 1] >= self.margin * next_score
+        )
+        return CapabilityRanking(scores, selected, confident)
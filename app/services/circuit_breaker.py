@@ -0,0 +1,189 @@
+# app/services/circuit_breaker.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from ..config import Settings
+from ..utils.metrics import MetricsRegistry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """The deployment's circuit is open; calls fail fast until retry_after has passed."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"LLM deployment {name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_deployment_failure(error: Exception) -> bool:
+    """Errors that say the deployment is unhealthy; other 4xx are the request's fault."""
+    status = getattr(error, "status_code", None)
+    return status is None or status in (408, 429) or status >= 500
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one deployment.
+
+    The circuit opens when, over the last `window` calls (at least min_calls), the
+    share of failures reaches failure_threshold or the share of calls slower than
+    slow_call_seconds reaches slow_call_threshold. After open_seconds it lets
+    half_open_max_calls probes through: their success closes it again, a failure
+    or slow call reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        slow_call_seconds: float = 60.0,
+        slow_call_threshold: float = 0.8,
+        min_calls: int = 10,
+        window: int = 50,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_threshold = slow_call_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.metrics = metrics or MetricsRegistry()
+        # (failed, slow) per call
+        self.calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allows_request(self) -> bool:
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and self._probes < self.half_open_max_calls)
+
+    def _acquire(self) -> None:
+        if not self.allows_request():
+            self.metrics.increment("circuit_breaker_rejected", deployment=self.name)
+            raise CircuitOpenError(self.name, self.retry_after() or self.open_seconds)
+        if self._state == HALF_OPEN:
+            self._probes += 1
+
+    async def call(self, send: Callable[[], Awaitable[T]]) -> T:
+        self._acquire()
+        probe = self._state == HALF_OPEN
+        started = time.monotonic()
+        try:
+            result = await send()
+        except asyncio.CancelledError:
+            # Outcome unknown (client left, hedge lost): free the probe without judging the deployment
+            if probe:
+                self._probes -= 1
+            raise
+        except Exception as e:
+            self.record(not is_deployment_failure(e), time.monotonic() - started, probe)
+            raise
+        self.record(True, time.monotonic() - started, probe)
+        return result
+
+    def record(self, success: bool, latency: float, probe: bool = False) -> None:
+        slow = latency >= self.slow_call_seconds
+        if probe:
+            self._probes -= 1
+            if self._state != HALF_OPEN:
+                return
+            if not success or slow:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_max_calls:
+                self._transition(CLOSED)
+            return
+
+        self.calls.append((not success, slow))
+        if self._state != CLOSED or len(self.calls) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self.calls if failed)
+        slow_calls = sum(1 for _, was_slow in self.calls if was_slow)
+        if failures / len(self.calls) >= self.failure_threshold or slow_calls / len(self.calls) >= self.slow_call_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._probes = 0
+        self._probe_successes = 0
+        if state == CLOSED:
+            self.calls.clear()
+        self.metrics.increment("circuit_breaker_transitions", deployment=self.name, state=state)
+
+    def snapshot(self) -> Dict[str, Any]:
+        calls = len(self.calls)
+        return {
+            "state": self.state,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "error_rate": round(sum(1 for failed, _ in self.calls if failed) / calls, 3) if calls else 0.0,
+            "slow_rate": round(sum(1 for _, slow in self.calls if slow) / calls, 3) if calls else 0.0,
+        }
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per deployment (or router provider), created on first use."""
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None, **breaker_options: Any):
+        self.metrics = metrics or MetricsRegistry()
+        self.breaker_options = breaker_options
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Settings, metrics: Optional[MetricsRegistry] = None) -> Optional["CircuitBreakers"]:
+        if not settings.circuit_breaker_enabled:
+            return None
+        return cls(
+            metrics=metrics,
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            slow_call_seconds=settings.circuit_breaker_slow_call_seconds,
+            slow_call_threshold=settings.circuit_breaker_slow_call_threshold,
+            min_calls=settings.circuit_breaker_min_calls,
+            open_seconds=settings.circuit_breaker_open_seconds,
+            half_open_max_calls=settings.circuit_breaker_half_open_max_calls,
+        )
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(name, metrics=self.metrics, **self.breaker_options)
+        return breaker
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until a deployment may be tried again when every known circuit is open, else None."""
+        if not self.breakers or any(breaker.allows_request() for breaker in self.breakers.values()):
+            return None
+        return min(breaker.retry_after() for breaker in self.breakers.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
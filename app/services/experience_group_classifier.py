@@ -0,0 +1,191 @@
+# app/services/experience_group_classifier.py
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+CHILDREN_GROUP = "Infants, children and young people (under 19)"
+FALLBACK_GROUP = "Clinical problems not linked to a specific clinical experience group"
+
+# Valid experience groups - using shortened names from prompty
+EXPERIENCE_GROUPS = [
+    CHILDREN_GROUP,
+    "Gender, reproductive and sexual health",
+    "People with long-term conditions",
+    "Older adults",
+    "Mental health",
+    "Urgent and unscheduled care",
+    "People with health disadvantage and vulnerabilities",
+    "Population Health and health promotion",
+    FALLBACK_GROUP,
+]
+
+ADULT_AGE = 19
+OLDER_ADULT_AGE = 65
+
+# Strong terms (weight 3) decide a group on their own; weaker ones (1) only add up.
+# Taken from the group definitions and reasoning examples in the LLM prompt.
+GROUP_KEYWORDS: Dict[str, Dict[str, int]] = {
+    CHILDREN_GROUP: {
+        r"baby|babies|infant|neonat\w*|newborn|toddler|paediatric\w*|pediatric\w*": 3,
+        r"child|children|school ?(?:child|boy|girl)|teenager|adolescent|nursery": 3,
+        r"school|student|parents?|mum|dad|health visitor": 1,
+    },
+    "Gender, reproductive and sexual health": {
+        r"pregnan\w*|antenatal|postnatal|contracepti\w*|coil|iud|menopaus\w*|hrt|gynae\w*|smear|cervical": 3,
+        r"sti|chlamydia|gonorrh\w*|sexual health|erectile|prostat\w*|testic\w*|lgbt\w*|transgender|bbv|hiv|miscarriage": 3,
+        r"breast|period|periods|menstrua\w*|vaginal|thrush|ovar\w*|ca125|penis|penile|pelvic": 1,
+    },
+    "People with long-term conditions": {
+        r"diabet\w*|copd|asthma|multi-?morbidity|chronic kidney|ckd|heart failure|epilep\w*|rheumatoid|parkinson\w*|multiple sclerosis": 3,
+        r"cancer|malignan\w*|metasta\w*|chemo\w*|oncolog\w*|long[- ]term condition\w*": 3,
+        r"chronic|hypertension|disabilit\w*|stroke|annual review|hba1c|inhaler": 1,
+    },
+    "Older adults": {
+        r"frail\w*|dementia|care home|nursing home|end of life|palliative|bed-?bound|falls? clinic": 3,
+        r"elderly|older|falls?|cognitive|delirium|dnacpr|respect form": 1,
+    },
+    "Mental health": {
+        r"depress\w*|anxiety|suicid\w*|self[- ]harm|psychos\w*|bipolar|schizophren\w*|eating disorder|ocd|ptsd|panic": 3,
+        r"addict\w*|alcohol (?:excess|misuse|dependen\w*)|substance misuse|heroin|opioid dependen\w*|methadone|cocaine": 3,
+        r"low mood|stress|mental health|sertraline|fluoxetine|citalopram|crisis team|cmht|health anxiety": 1,
+    },
+    "Urgent and unscheduled care": {
+        r"999|a&e|a and e|emergency department|ooh|out of hours|blue light|ambulance|sepsis|septic|resus\w*": 3,
+        r"same[- ]day|duty doc\w*|urgent|acute(?:ly)?|triage|111|admit\w*|admission|on call": 1,
+    },
+    "People with health disadvantage and vulnerabilities": {
+        r"safeguarding|asylum|refugee|veteran\w*|learning disabilit\w*|homeless\w*|domestic (?:abuse|violence)|modern slavery": 3,
+        r"lacks? capacity|mental capacity|best interests?|deaf|blind|bsl|sign language|interpreter|traveller|prison\w*": 3,
+        r"vulnerab\w*|carer|language barrier|hearing loss|visual impairment|capacity|deprivation": 1,
+    },
+    "Population Health and health promotion": {
+        r"screening|immuni[sz]ation\w*|vaccin\w*|smoking cessation|health promotion|health check": 3,
+        r"lifestyle|prevention|weight loss|exercise|diet|self[- ]manage\w*|smoking|quit": 1,
+    },
+}
+
+# Durations ("for 10 years", "2 years ago", "a 5 year history") are not ages, so "years" needs "old"
+_NOT_A_DURATION = r"(?<!\bfor )(?<!\bover )(?<!\blast )(?<!\bpast )"
+_AGE_PATTERNS = [
+    # "65-year-old", "65 year old", "65 yrs old", "aged 65", "65yo", "65 y/o", "age: 65", "65M"/"65 F"
+    re.compile(rf"{_NOT_A_DURATION}\b(\d{{1,3}})\s*[- ]?\s*(?:years?|yrs?)[- ]?old\b", re.IGNORECASE),
+    re.compile(rf"{_NOT_A_DURATION}\b(\d{{1,3}})\s*(?:yo|y/o|y\.o\.?)(?!\w)", re.IGNORECASE),
+    re.compile(r"\b(?:aged?|age:)\s*(\d{1,3})\b", re.IGNORECASE),
+    re.compile(r"\b(\d{1,3})\s?(?:M|F)\b"),
+]
+_INFANT_AGE = re.compile(r"\b\d{1,2}\s*[- ]?\s*(?:months?|weeks?|days?)[- ]old\b", re.IGNORECASE)
+# Children of an adult patient (safeguarding, parents of young children) still count for the children group
+_CHILDREN_MENTIONED = re.compile(
+    r"\b(?:child|children|son|sons|daughters?|baby|babies|infant|toddler|kids?|school ?(?:child|boy|girl)|teenager)\b",
+    re.IGNORECASE,
+)
+
+# A term inside a negated clause ("no safeguarding concerns", "denies low mood") or a
+# safety-net clause ("call 999 if ...") is not evidence for its group
+_CLAUSE_BREAK = re.compile(r"[.;!?\n]|\bbut\b", re.IGNORECASE)
+_NEGATION = re.compile(
+    r"\b(?:no|not|nil|denie[sd]|denying|without|never|negative for|ruled out|free of|absence of)\b",
+    re.IGNORECASE,
+)
+_SAFETY_NET = re.compile(r"\b(?:if|unless|should|safety[- ]net\w*|advised to|return|worse\w*)\b", re.IGNORECASE)
+
+_COMPILED_KEYWORDS = {
+    group: [(re.compile(rf"(?<![\w&]){pattern}(?![\w&])", re.IGNORECASE), weight) for pattern, weight in terms.items()]
+    for group, terms in GROUP_KEYWORDS.items()
+}
+
+
+def _clause_bounds(text: str, position: int) -> Tuple[int, int]:
+    start = 0
+    for match in _CLAUSE_BREAK.finditer(text, 0, position):
+        start = match.end()
+    following = _CLAUSE_BREAK.search(text, position)
+    return start, following.start() if following else len(text)
+
+
+def is_discounted(text: str, start: int) -> bool:
+    """Whether the term at `start` is negated or only part of safety-netting advice."""
+    clause_start, clause_end = _clause_bounds(text, start)
+    return bool(_NEGATION.search(text, clause_start, start) or _SAFETY_NET.search(text, clause_start, clause_end))
+
+
+def extract_ages(text: str) -> List[int]:
+    """Every explicit age mentioned in the log, in order (infants in weeks/months count as 0)."""
+    mentions = []
+    for pattern in _AGE_PATTERNS:
+        for match in pattern.finditer(text):
+            age = int(match.group(1))
+            if age <= 120:
+                mentions.append((match.start(), age))
+    mentions.extend((match.start(), 0) for match in _INFANT_AGE.finditer(text))
+    return [age for _, age in sorted(mentions)]
+
+
+def patient_age(ages: List[int]) -> Optional[int]:
+    """The patient is introduced first; later ages are usually relatives."""
+    return ages[0] if ages else None
+
+
+def involves_children(text: str, ages: List[int]) -> bool:
+    """Whether a child other than the patient is part of the case."""
+    return any(age < ADULT_AGE for age in ages[1:]) or bool(_CHILDREN_MENTIONED.search(text))
+
+
+def apply_age_constraint(groups: List[str], age: Optional[int], children_involved: bool = False) -> List[str]:
+    """Enforce the absolute under-19 rule: drop the children group for a patient aged 19+,
+    unless the case is about the patient's children (safeguarding, parents of young children)."""
+    if age is not None and age >= ADULT_AGE and not children_involved and CHILDREN_GROUP in groups:
+        groups = [group for group in groups if group != CHILDREN_GROUP]
+    return groups or [FALLBACK_GROUP]
+
+
+class ExperienceGroupClassification:
+    def __init__(self, groups: List[str], scores: List[Tuple[str, float]], confident: bool, ages: List[int]):
+        self.groups = groups
+        self.scores = scores
+        self.confident = confident
+        self.ages = ages
+
+
+class ExperienceGroupClassifier:
+    """Keyword and age rules over the experience group definitions.
+
+    Confident when one or two groups reach min_score and no other group has more
+    than half of it; everything else is left to the LLM.
+    """
+
+    def __init__(self, min_score: float = 3.0):
+        self.min_score = min_score
+
+    def score(self, text: str, ages: Optional[List[int]] = None) -> Dict[str, float]:
+        ages = extract_ages(text) if ages is None else ages
+        age = patient_age(ages)
+        scores = {group: 0.0 for group in GROUP_KEYWORDS}
+        for group, patterns in _COMPILED_KEYWORDS.items():
+            for pattern, weight in patterns:
+                # Each term counts once however often it is repeated
+                if any(not is_discounted(text, match.start()) for match in pattern.finditer(text)):
+                    scores[group] += weight
+
+        if age is not None:
+            if age < ADULT_AGE:
+                scores[CHILDREN_GROUP] += self.min_score
+            elif not involves_children(text, ages):
+                scores[CHILDREN_GROUP] = 0.0
+            if age >= OLDER_ADULT_AGE:
+                scores["Older adults"] += 1
+        return scores
+
+    def classify(self, text: str) -> ExperienceGroupClassification:
+        ages = extract_ages(text)
+        ranked = sorted(self.score(text, ages).items(), key=lambda item: item[1], reverse=True)
+        strong = [group for group, score in ranked if score >= self.min_score]
+        others = [score for group, score in ranked if score < self.min_score]
+        confident = 1 <= len(strong) <= 2 and all(score <= self.min_score / 2 for score in others)
+        age, children_involved = patient_age(ages), involves_children(text, ages)
+        if children_involved and age is not None and age >= ADULT_AGE:
+            # An adult patient's children: whether they are the focus is for the LLM to judge
+            confident = False
+        groups = apply_age_constraint(strong[:2], age, children_involved)
+        return ExperienceGroupClassification(groups, ranked, confident, ages)
@@ -0,0 +1,132 @@
+# app/services/hedging.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional
+
+from ..utils.metrics import MetricsRegistry, percentile
+
+# attempt(hedge, sent) performs one upstream call; hedge=True for the duplicate.
+# It calls sent() once it has been admitted and the request is going out.
+Attempt = Callable[[bool, Callable[[], None]], Awaitable[Any]]
+
+
+def parse_operations(spec: str) -> set:
+    return {operation.strip() for operation in spec.split(",") if operation.strip()}
+
+
+class HedgePolicy:
+    """Sends a duplicate of a slow short call and keeps whichever answer arrives first.
+
+    The hedge fires once the sent request has been outstanding longer than the
+    operation's recent `percentile_fraction` latency (default_delay_seconds until
+    min_samples calls have been seen). Time spent waiting for admission counts
+    towards neither, since a duplicate would only queue behind the original. Spend is bounded by max_fraction (hedges per call over
+    the last `window` calls) and max_in_flight; the losing attempt is cancelled.
+    """
+
+    def __init__(
+        self,
+        operations: Iterable[str],
+        percentile_fraction: float = 0.95,
+        default_delay_seconds: float = 2.0,
+        min_delay_seconds: float = 0.05,
+        min_samples: int = 20,
+        max_fraction: float = 0.1,
+        max_in_flight: int = 4,
+        window: int = 200,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.operations = set(operations)
+        self.percentile_fraction = percentile_fraction
+        self.default_delay_seconds = default_delay_seconds
+        self.min_delay_seconds = min_delay_seconds
+        self.min_samples = min_samples
+        self.max_fraction = max_fraction
+        self.max_in_flight = max_in_flight
+        self.window = window
+        self.metrics = metrics or MetricsRegistry()
+        self.in_flight = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._hedged: Dict[str, Deque[bool]] = {}
+
+    def applies(self, operation: str) -> bool:
+        return operation in self.operations
+
+    def delay(self, operation: str) -> float:
+        latencies = self._latencies.get(operation)
+        if latencies is None or len(latencies) < self.min_samples:
+            return self.default_delay_seconds
+        return max(self.min_delay_seconds, percentile(list(latencies), self.percentile_fraction))
+
+    def _observe(self, operation: str, latency: float) -> None:
+        self._latencies.setdefault(operation, deque(maxlen=self.window)).append(latency)
+
+    def _allow(self, operation: str) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        hedged = self._hedged.get(operation) or ()
+        # One hedge is always allowed so a cold start with a stalled deployment is covered
+        return hedged.count(True) < max(1.0, self.max_fraction * len(hedged))
+
+    async def run(self, operation: str, attempt: Attempt, cost: float = 0) -> Any:
+        """Result of the first attempt to succeed; `cost` (max_tokens) is booked when a loser is cancelled."""
+        hedges = self._hedged.setdefault(operation, deque(maxlen=self.window))
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(attempt(False, sent.set))
+        primary.add_done_callback(lambda task: task.cancelled() or task.exception())
+        hedge: Optional[asyncio.Future] = None
+        try:
+            waiter = asyncio.ensure_future(sent.wait())
+            try:
+                await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            started = time.monotonic()
+            done, _ = await asyncio.wait({primary}, timeout=self.delay(operation))
+            if not done:
+                if self._allow(operation):
+                    self.in_flight += 1
+                    hedge = asyncio.ensure_future(attempt(True, lambda: None))
+                    hedge.add_done_callback(self._hedge_done)
+                    self.metrics.increment("llm_hedges", operation=operation, outcome="sent")
+                else:
+                    self.metrics.increment("llm_hedges", operation=operation, outcome="capped")
+            hedges.append(hedge is not None)
+            winner = await self._first_success(primary, hedge)
+        except BaseException:
+            for task in (primary, hedge):
+                if task is not None:
+                    task.cancel()
+            raise
+
+        # Latency since the request was sent; when the hedge won, the primary was at least this slow
+        self._observe(operation, time.monotonic() - started)
+        if hedge is not None:
+            loser = hedge if winner is primary else primary
+            if not loser.done():
+                loser.cancel()
+                self.metrics.increment("llm_hedge_cancelled_max_tokens", cost, operation=operation)
+            self.metrics.increment(
+                "llm_hedges", operation=operation, outcome="won" if winner is hedge else "lost"
+            )
+        return winner.result()
+
+    def _hedge_done(self, task: asyncio.Future) -> None:
+        self.in_flight -= 1
+        # A hedge that failed after losing is not worth a "never retrieved" warning
+        task.cancelled() or task.exception()
+
+    @staticmethod
+    async def _first_success(primary: asyncio.Future, hedge: Optional[asyncio.Future]) -> asyncio.Future:
+        pending = {primary} if hedge is None else {primary, hedge}
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+            if not pending:
+                # Both failed: report the primary's error
+                primary.result()
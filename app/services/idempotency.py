@@ -0,0 +1,217 @@
+# app/services/idempotency.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..utils.metrics import MetricsRegistry
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflictError(Exception):
+    """The key was already used for a request with a different body."""
+
+
+class StoredResponse:
+    def __init__(self, status_code: int, headers: List[Tuple[str, str]], body: bytes, media_type: Optional[str] = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.media_type = media_type
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.expires_at: Optional[float] = None
+
+
+def request_fingerprint(body: bytes) -> str:
+    """Hash of the request body; JSON is canonicalised so key order and spacing don't matter."""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyStore:
+    """Remembers responses by Idempotency-Key so retried POSTs don't pay for a second LLM call.
+
+    The first request with a key executes; a retry while it is running joins it,
+    and a retry afterwards replays the stored response until the window expires.
+    Server errors (5xx) and exceptions are not stored, so a retry after one runs again.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1000,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.metrics = metrics or MetricsRegistry()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[StoredResponse]],
+    ) -> Tuple[StoredResponse, bool]:
+        """Return (response, replayed); replayed is False only for the call that executed."""
+        store_key = f"{scope}\n{key}"
+        while True:
+            self._expire()
+            entry = self._entries.get(store_key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                self.metrics.increment("idempotency_requests", outcome="conflict")
+                raise IdempotencyConflictError(
+                    f"{IDEMPOTENCY_HEADER} {key!r} was already used with a different request body"
+                )
+            if entry.future.done():
+                self.metrics.increment("idempotency_requests", outcome="replayed")
+                return entry.future.result(), True
+            self.metrics.increment("idempotency_requests", outcome="joined")
+            try:
+                return await asyncio.shield(entry.future), True
+            except Exception:
+                # The original attempt failed and was forgotten; run it again ourselves
+                continue
+
+        entry = _Entry(fingerprint)
+        self._entries[store_key] = entry
+        self.metrics.increment("idempotency_requests", outcome="executed")
+        try:
+            response = await execute()
+        except BaseException as e:
+            self._forget(store_key, entry)
+            entry.future.set_exception(e if isinstance(e, Exception) else RuntimeError("Request was cancelled"))
+            # Joined requests retry instead; nobody else reads this exception
+            entry.future.exception()
+            raise
+
+        if response.status_code >= 500:
+            self._forget(store_key, entry)
+        else:
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self._evict()
+        entry.future.set_result(response)
+        return response, False
+
+    def _forget(self, store_key: str, entry: _Entry) -> None:
+        if self._entries.get(store_key) is entry:
+            del self._entries[store_key]
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for store_key, entry in list(self._entries.items()):
+            if entry.expires_at is not None and entry.expires_at <= now:
+                del self._entries[store_key]
+
+    def _evict(self) -> None:
+        # Oldest finished entries go first; in-flight ones are never evicted
+        finished = [store_key for store_key, entry in self._entries.items() if entry.expires_at is not None]
+        for store_key in finished[:max(0, len(self._entries) - self.max_entries)]:
+            del self._entries[store_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying an IdempotencyStore to POST requests that send the header.
+
+    The first request streams its response to its own client as usual while a copy
+    is recorded; joined and replayed requests get the recorded copy with
+    Idempotent-Replayed: true.
+    """
+
+    def __init__(self, app, get_store: Callable[[], Optional[IdempotencyStore]]):
+        self.app = app
+        self.get_store = get_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        key = headers.get(IDEMPOTENCY_HEADER.lower())
+        store = self.get_store() if key is not None else None
+        if store is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await self._send_error(send, 400, f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def execute() -> StoredResponse:
+            recorded: Dict[str, object] = {"status": 500, "headers": [], "body": []}
+
+            async def recording_send(message):
+                if message["type"] == "http.response.start":
+                    recorded["status"] = message["status"]
+                    recorded["headers"] = [
+                        (name.decode("latin-1"), value.decode("latin-1"))
+                        for name, value in message.get("headers", [])
+                    ]
+                elif message["type"] == "http.response.body":
+                    recorded["body"].append(message.get("body", b""))
+                await send(message)
+
+            await self.app(scope, replay_receive, recording_send)
+            return StoredResponse(recorded["status"], recorded["headers"], b"".join(recorded["body"]))
+
+        try:
+            response, replayed = await store.run(scope["path"], key, request_fingerprint(body), execute)
+        except IdempotencyConflictError as e:
+            return await self._send_error(send, 422, str(e))
+        if not replayed:
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in response.headers
+            ] + [(REPLAYED_HEADER.lower().encode("latin-1"), b"true")],
+        })
+        await send({"type": "http.response.body", "body": response.body})
+
+    @staticmethod
+    async def _send_error(send, status_code: int, message: str) -> None:
+        body = json.dumps({"error": True, "message": message}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,51 @@
+# app/services/improvement_planner.py
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+# A target is ("brief_description" | "reflection" | "learning_needs", None) or ("capability", name)
+Target = Tuple[str, Optional[str]]
+
+SECTION_PATTERNS = {
+    "brief_description": re.compile(r"\b(?:brief description|description|summary|history|presentation|narrative)\b", re.IGNORECASE),
+    "reflection": re.compile(r"\b(?:reflection|reflective|feelings?|emotions?|emotional|went well)\b", re.IGNORECASE),
+    "learning_needs": re.compile(r"\b(?:learning needs?|learning points?|learning objectives?|objectives?|goals?|smart)\b", re.IGNORECASE),
+}
+ANY_CAPABILITY = re.compile(r"\b(?:capabilit(?:y|ies)|justifications?)\b", re.IGNORECASE)
+
+# Requests that have to touch every section: explicit scope words and demographic
+# corrections, which must stay consistent throughout the review
+GLOBAL_REQUEST = re.compile(
+    r"\b(?:all|every|whole|entire|throughout|everywhere|overall|pronouns?|gender|male|female|man|woman"
+    r"|he|she|his|her|him|age|aged|years? old|name)\b",
+    re.IGNORECASE,
+)
+
+class ImprovementPlan:
+    def __init__(self, targets: List[Target], full_rewrite: bool):
+        self.targets = targets
+        self.full_rewrite = full_rewrite
+
+def plan_improvement(improvement_prompt: str, capability_names: List[str]) -> ImprovementPlan:
+    """Decide which sections an improvement request touches.
+
+    Anything the rules cannot pin to specific sections is planned as a full
+    rewrite, so a missed section can only cost tokens, never an edit.
+    """
+    if GLOBAL_REQUEST.search(improvement_prompt):
+        return ImprovementPlan([], True)
+
+    targets: List[Target] = []
+    for section, pattern in SECTION_PATTERNS.items():
+        if pattern.search(improvement_prompt):
+            targets.append((section, None))
+
+    lowered = improvement_prompt.lower()
+    named = [name for name in dict.fromkeys(capability_names) if name.lower() in lowered]
+    if named:
+        targets.extend(("capability", name) for name in named)
+    elif ANY_CAPABILITY.search(improvement_prompt):
+        targets.extend(("capability", name) for name in dict.fromkeys(capability_names))
+
+    return ImprovementPlan(targets, not targets)
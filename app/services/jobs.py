@@ -0,0 +1,474 @@
+# app/services/jobs.py
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from ..models import JobStatusResponse
+from ..utils.deadline import no_deadline
+from ..utils.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+HostResolver = Callable[[str, int], Awaitable[List[str]]]
+
+# Delays between callback attempts
+CALLBACK_RETRY_DELAYS = (1.0, 5.0, 30.0)
+
+
+class JobQueueFullError(Exception):
+    """Raised by submit() when the worker queue has no room for another job."""
+
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def is_public_address(address: str) -> bool:
+    """False for loopback, private (RFC1918), link-local (instance metadata) and other non-global addresses."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class JobRecord:
+    def __init__(
+        self,
+        job_id: str,
+        kind: str,
+        payload: Dict[str, Any],
+        status: str = QUEUED,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        callback_url: Optional[str] = None,
+        created_at: Optional[float] = None,
+        updated_at: Optional[float] = None,
+        expires_at: Optional[float] = None,
+    ):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.status = status
+        self.result = result
+        self.error = error
+        self.callback_url = callback_url
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+        self.expires_at = expires_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "payload": self.payload,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "callback_url": self.callback_url,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "expires_at": self.expires_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "JobRecord":
+        return cls(**data)
+
+
+def job_status(record: JobRecord) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=record.job_id,
+        kind=record.kind,
+        status=record.status,
+        created_at=record.created_at,
+        updated_at=record.updated_at,
+        expires_at=record.expires_at,
+        error=record.error,
+        status_url=f"/api/jobs/{record.job_id}",
+        result_url=f"/api/jobs/{record.job_id}/result",
+    )
+
+
+class InMemoryJobStore:
+    """Jobs kept in this worker process; lost on restart."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # job_id -> (owner, lease expiry)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def save(self, record: JobRecord) -> None:
+        with self._lock:
+            self._jobs[record.job_id] = record.to_dict()
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            data = self._jobs.get(job_id)
+        if data is None or (data["expires_at"] and data["expires_at"] <= time.time()):
+            return None
+        return JobRecord.from_dict(dict(data))
+
+    async def list_unfinished(self) -> List[JobRecord]:
+        with self._lock:
+            return [JobRecord.from_dict(dict(data)) for data in self._jobs.values() if data["status"] not in FINISHED_STATUSES]
+
+    async def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            data = self._jobs.get(job_id)
+            if data is None or data["status"] in FINISHED_STATUSES:
+                return False
+            holder, expires = self._leases.get(job_id, (owner, 0.0))
+            if holder != owner and expires > now:
+                return False
+            self._leases[job_id] = (owner, now + lease_seconds)
+            return True
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, data in self._jobs.items() if data["expires_at"] and data["expires_at"] <= now]
+            for job_id in expired:
+                del self._jobs[job_id]
+                self._leases.pop(job_id, None)
+        return len(expired)
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteJobStore:
+    """Jobs in a SQLite file, so finished results survive a worker restart.
+
+    The file may be shared by several instances (e.g. on Azure Files): a job only
+    runs on the instance whose claim() succeeded. The default rollback journal is
+    kept because WAL needs shared memory, which network filesystems do not provide.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "record TEXT NOT NULL, expires_at REAL, lease_owner TEXT, lease_expires REAL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("lease_owner", "TEXT"), ("lease_expires", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _save(self, record: JobRecord) -> None:
+        with self._connect() as conn:
+            # Upsert rather than REPLACE so the lease columns survive
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, record, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, record = excluded.record, "
+                "expires_at = excluded.expires_at",
+                (record.job_id, record.status, json.dumps(record.to_dict(), ensure_ascii=False), record.expires_at),
+            )
+
+    def _get(self, job_id: str) -> Optional[JobRecord]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+        return JobRecord.from_dict(json.loads(row[0])) if row else None
+
+    def _list_unfinished(self) -> List[JobRecord]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT record FROM jobs WHERE status NOT IN (?, ?)", FINISHED_STATUSES
+            ).fetchall()
+        return [JobRecord.from_dict(json.loads(row[0])) for row in rows]
+
+    def _claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_owner = ?, lease_expires = ? WHERE job_id = ? AND status IN (?, ?) "
+                "AND (lease_expires IS NULL OR lease_expires < ? OR lease_owner = ?)",
+                (owner, now + lease_seconds, job_id, QUEUED, RUNNING, now, owner),
+            )
+            return cursor.rowcount == 1
+
+    def _purge_expired(self) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            return cursor.rowcount
+
+    async def save(self, record: JobRecord) -> None:
+        await asyncio.to_thread(self._save, record)
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def list_unfinished(self) -> List[JobRecord]:
+        return await asyncio.to_thread(self._list_unfinished)
+
+    async def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Take (or renew) the job's lease; False while another instance holds an unexpired one."""
+        return await asyncio.to_thread(self._claim, job_id, owner, lease_seconds)
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(self._purge_expired)
+
+    async def close(self) -> None:
+        pass
+
+
+def create_job_store(url: str):
+    """Build the job store from a URL: empty or memory:// for in-process, sqlite:///path/to/jobs.db."""
+    url = (url or "").strip()
+    if not url or url == "memory://":
+        return InMemoryJobStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):] or "jobs.sqlite3")
+    raise ValueError(f"Unsupported job store URL: {url}")
+
+
+class JobManager:
+    """Runs long review generations in a worker pool so clients can poll or be called back.
+
+    Jobs are queued per worker process. With the SQLite store, jobs that were still
+    queued or running when the process stopped are picked up again on start.
+    """
+
+    def __init__(
+        self,
+        store,
+        handlers: Dict[str, JobHandler],
+        workers: int = 4,
+        queue_size: int = 100,
+        result_ttl: float = 3600,
+        callback_timeout: float = 10.0,
+        callback_allowed_hosts: Optional[List[str]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        resolver: Optional[HostResolver] = None,
+        lease_seconds: float = 120.0,
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.result_ttl = result_ttl
+        self.callback_timeout = callback_timeout
+        self.callback_allowed_hosts = [host.lower() for host in (callback_allowed_hosts or []) if host]
+        self.metrics = metrics or MetricsRegistry()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._background: set = set()
+        self._http_client = http_client
+        self._resolver = resolver or resolve_host
+        self._last_purge = 0.0
+        # Renewed while a job runs, so an instance that dies lets another pick the job up
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def validate_callback_url(self, callback_url: Optional[str]) -> None:
+        """Only allowlisted hosts that resolve to public addresses may be called back.
+
+        With no allowlist every callback is refused. The host is resolved again
+        before each delivery, so a DNS change cannot point it at an internal address.
+        """
+        if not callback_url:
+            return
+        parsed = urlparse(callback_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError("callback_url must be an absolute http(s) URL")
+        if not self.callback_allowed_hosts:
+            raise ValueError("callback_url is not accepted: no callback hosts are configured")
+        host = parsed.hostname.lower()
+        if host not in self.callback_allowed_hosts:
+            raise ValueError(f"callback_url host '{parsed.hostname}' is not allowed")
+        try:
+            addresses = await self._resolver(host, parsed.port or (443 if parsed.scheme == "https" else 80))
+        except (OSError, UnicodeError) as exc:
+            raise ValueError(f"callback_url host '{parsed.hostname}' could not be resolved: {exc}")
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise ValueError(f"callback_url host '{parsed.hostname}' resolves to a non-public address")
+
+    async def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> JobRecord:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        await self.validate_callback_url(callback_url)
+        await self._ensure_workers()
+        if self._queue.full():
+            self.metrics.increment("jobs_rejected", kind=kind)
+            raise JobQueueFullError("Job queue is full, try again shortly")
+
+        record = JobRecord(uuid.uuid4().hex, kind, payload, callback_url=callback_url)
+        await self.store.save(record)
+        self._queue.put_nowait(record.job_id)
+        self.metrics.increment("jobs_submitted", kind=kind)
+        await self._maybe_purge()
+        return record
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        # A status poll after a restart also restarts interrupted jobs
+        await self._ensure_workers()
+        await self._maybe_purge()
+        return await self.store.get(job_id)
+
+    async def _ensure_workers(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{index}") for index in range(self.workers)
+        ]
+        # Work left behind by a previous process (persistent stores only)
+        for record in await self.store.list_unfinished():
+            if not self._queue.full():
+                self._queue.put_nowait(record.job_id)
+
+    async def _worker(self) -> None:
+        # Workers are started from whichever request arrives first; don't inherit its deadline
+        with no_deadline():
+            while True:
+                job_id = await self._queue.get()
+                try:
+                    await self._run(job_id)
+                except Exception as exc:
+                    logger.error("Job %s crashed the worker loop: %s", job_id, exc)
+                finally:
+                    self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        record = await self.store.get(job_id)
+        if record is None or record.finished:
+            return
+        if not await self.store.claim(job_id, self.owner, self.lease_seconds):
+            # Running (or about to run) on another instance sharing the store
+            self.metrics.increment("jobs_skipped", kind=record.kind, reason="claimed")
+            return
+        heartbeat = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            await self._execute(record)
+        finally:
+            heartbeat.cancel()
+
+    async def _renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.store.claim(job_id, self.owner, self.lease_seconds)
+            except Exception as exc:
+                logger.warning("Failed to renew the lease on job %s: %s", job_id, exc)
+
+    async def _execute(self, record: JobRecord) -> None:
+        job_id = record.job_id
+        record.status = RUNNING
+        record.updated_at = time.time()
+        await self.store.save(record)
+
+        started = time.monotonic()
+        try:
+            result = await self.handlers[record.kind](record.payload)
+            record.result = result.model_dump() if hasattr(result, "model_dump") else result
+            record.status = SUCCEEDED
+        except asyncio.CancelledError:
+            # Shutdown: leave the job unfinished so a persistent store can resume it
+            raise
+        except Exception as exc:
+            logger.error("Job %s failed: %s", job_id, exc)
+            record.error = str(exc)
+            record.status = FAILED
+
+        record.updated_at = time.time()
+        record.expires_at = record.updated_at + self.result_ttl
+        await self.store.save(record)
+        self.metrics.increment("jobs_completed", kind=record.kind, status=record.status)
+        self.metrics.observe("job_seconds", time.monotonic() - started, kind=record.kind)
+
+        if record.callback_url:
+            task = asyncio.create_task(self._send_callback(record))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _send_callback(self, record: JobRecord) -> None:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=self.callback_timeout)
+        body = {
+            "job_id": record.job_id,
+            "kind": record.kind,
+            "status": record.status,
+            "result": record.result,
+            "error": record.error,
+        }
+        for attempt, delay in enumerate((0.0,) + CALLBACK_RETRY_DELAYS):
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                await self.validate_callback_url(record.callback_url)
+            except ValueError as exc:
+                logger.warning("Callback for job %s blocked: %s", record.job_id, exc)
+                self.metrics.increment("job_callbacks", outcome="blocked")
+                return
+            try:
+                # A redirect could lead anywhere, so it is reported as the response instead
+                response = await self._http_client.post(record.callback_url, json=body, follow_redirects=False)
+                if response.status_code < 500:
+                    self.metrics.increment("job_callbacks", outcome="delivered" if response.is_success else "rejected")
+                    return
+                logger.warning("Callback for job %s returned %s", record.job_id, response.status_code)
+            except httpx.HTTPError as exc:
+                logger.warning("Callback for job %s failed (attempt %s): %s", record.job_id, attempt + 1, exc)
+        self.metrics.increment("job_callbacks", outcome="failed")
+
+    async def _maybe_purge(self) -> None:
+        if time.monotonic() - self._last_purge < 60:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            await self.store.purge_expired()
+        except Exception as exc:
+            logger.warning("Failed to purge expired jobs: %s", exc)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._tasks),
+        }
+
+    async def aclose(self) -> None:
+        for task in self._tasks + list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._background, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        await self.store.close()
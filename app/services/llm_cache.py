@@ -0,0 +1,223 @@
+# app/services/llm_cache.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from ..utils.metrics import MetricsRegistry
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Optional: only needed for a redis:// shared tier
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    *,
+    model: str,
+    messages: List[Mapping[str, Any]],
+    temperature: float,
+    max_tokens: int,
+    **extra: Any,
+) -> str:
+    """Content address of a chat completion request."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        **extra,
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LRUCacheTier:
+    """Bounded in-process tier; evicts the least recently used entry when full."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Shared tier in a SQLite file, e.g. on an Azure Files mount shared by Function instances."""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisCacheBackend:
+    """Shared tier in any Redis-compatible store (Azure Cache for Redis, Garnet, Valkey)."""
+
+    def __init__(self, url: str, prefix: str = "caseforge:llm:"):
+        if redis_asyncio is None:
+            raise RuntimeError("The redis package is required for a redis:// LLM cache URL")
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_shared_backend(url: str):
+    """Build the shared tier from a URL: sqlite:///path/to/file.db or redis://host:port/db."""
+    url = (url or "").strip()
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteCacheBackend(url[len("sqlite:///"):] or "llm_cache.sqlite3")
+    if url.startswith(("redis://", "rediss://")):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported LLM cache URL: {url}")
+
+
+class LLMResponseCache:
+    """Two-tier response cache for chat completions with per-operation TTLs.
+
+    Operations without a positive TTL are never cached.
+    """
+
+    def __init__(
+        self,
+        ttls: Mapping[str, float],
+        max_entries: int = 512,
+        shared=None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.ttls = dict(ttls)
+        self.local = LRUCacheTier(max_entries)
+        self.shared = shared
+        self.metrics = metrics or MetricsRegistry()
+
+    def is_cacheable(self, operation: str) -> bool:
+        return self.ttls.get(operation, 0) > 0
+
+    async def get(self, operation: str, key: str) -> Optional[str]:
+        if not self.is_cacheable(operation):
+            return None
+
+        value = self.local.get(key)
+        if value is not None:
+            self.metrics.increment("llm_cache_hits", operation=operation, tier="local")
+            return value
+
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(key)
+            except Exception as exc:
+                logger.warning("Shared LLM cache read failed: %s", exc)
+                value = None
+            if value is not None:
+                self.local.set(key, value, self.ttls[operation])
+                self.metrics.increment("llm_cache_hits", operation=operation, tier="shared")
+                return value
+
+        self.metrics.increment("llm_cache_misses", operation=operation)
+        return None
+
+    async def set(self, operation: str, key: str, value: str) -> None:
+        if not self.is_cacheable(operation):
+            return
+        ttl = self.ttls[operation]
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, value, ttl)
+            except Exception as exc:
+                logger.warning("Shared LLM cache write failed: %s", exc)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit/miss counters per operation."""
+        stats: Dict[str, Dict[str, float]] = {}
+        for operation in self.ttls:
+            hits_local = self.metrics.get("llm_cache_hits", operation=operation, tier="local")
+            hits_shared = self.metrics.get("llm_cache_hits", operation=operation, tier="shared")
+            stats[operation] = {
+                "hits": hits_local + hits_shared,
+                "shared_hits": hits_shared,
+                "misses": self.metrics.get("llm_cache_misses", operation=operation),
+            }
+        return stats
+
+    async def close(self) -> None:
+        if self.shared is not None:
+            await self.shared.close()
@@ -0,0 +1,248 @@
+# app/services/llm_router.py
+from __future__ import annotations
+
+import json
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Mapping, Optional
+
+import anthropic
+import openai
+
+from ..utils.metrics import MetricsRegistry
+from .circuit_breaker import CircuitBreakers, CircuitOpenError
+from .rate_limiter import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that move a request on to the next provider
+THROTTLED = "throttled"
+UNAVAILABLE = "unavailable"
+
+_CONNECTION_ERRORS = (openai.APIConnectionError, anthropic.APIConnectionError)
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """THROTTLED or UNAVAILABLE when another provider may succeed, None for errors that would fail anywhere."""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return THROTTLED
+    if isinstance(error, _CONNECTION_ERRORS) or (status is not None and status >= 500):
+        return UNAVAILABLE
+    return None
+
+
+def parse_provider_specs(value: str) -> List[Dict[str, Any]]:
+    """LLM_PROVIDERS is a JSON list of provider specs; empty means the single Azure deployment."""
+    if not value.strip():
+        return []
+    specs = json.loads(value)
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) and spec.get("type") for spec in specs):
+        raise ValueError("LLM_PROVIDERS must be a JSON list of objects with a 'type'")
+    return specs
+
+
+class ProviderResponse:
+    def __init__(self, result: Any, headers: Optional[Mapping[str, str]] = None):
+        # A ChatCompletion, or an async iterator of chunks for stream=True
+        self.result = result
+        self.headers = headers or {}
+
+
+class ChatProvider:
+    """One deployment that serves OpenAI-format chat completion requests.
+
+    Implementations translate the request for their API and return results as
+    OpenAI ChatCompletion / chunk objects, so PortfolioService never needs to
+    know which provider answered.
+    """
+
+    kind = "base"
+    # Whether a json_schema response_format is enforced rather than ignored
+    supports_response_format = True
+    # Response headers carrying the remaining token quota and its limit
+    quota_headers = ("x-ratelimit-remaining-tokens", "x-ratelimit-limit-tokens")
+
+    def __init__(self, name: str, model: str, weight: float = 1.0):
+        self.name = name
+        self.model = model
+        self.weight = weight
+
+    async def create(self, request: Dict[str, Any]) -> ProviderResponse:
+        raise NotImplementedError
+
+    def quota(self, headers: Mapping[str, str]):
+        """(remaining, limit) tokens from a response, either of which may be None."""
+        remaining_header, limit_header = self.quota_headers
+        return _to_float(headers.get(remaining_header)), _to_float(headers.get(limit_header))
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ProviderStats:
+    """Rolling latency, error and quota picture of one provider."""
+
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self.quota_remaining: Optional[float] = None
+        self.quota_limit: Optional[float] = None
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def quota_fraction(self) -> float:
+        if self.quota_remaining is None or not self.quota_limit:
+            return 1.0
+        return max(0.0, min(1.0, self.quota_remaining / self.quota_limit))
+
+    def observe_quota(self, remaining: Optional[float], limit: Optional[float]) -> None:
+        if remaining is None:
+            return
+        self.quota_remaining = remaining
+        # Azure only sends the remaining count; the largest value seen approximates the limit
+        self.quota_limit = limit or max(self.quota_limit or 0.0, remaining)
+
+
+class LLMRouter:
+    """Spreads chat completions across providers and fails over when one is throttled or down.
+
+    Each request goes first to a provider drawn at random, weighted by
+    weight / (p95 latency x error penalty / remaining quota share); the rest are
+    tried in score order. A throttled or failing provider sits out for its
+    Retry-After (or cooldown_seconds) before it is tried again, and one whose
+    circuit breaker is open is skipped until the breaker lets a probe through.
+    """
+
+    def __init__(
+        self,
+        providers: List[ChatProvider],
+        cooldown_seconds: float = 30.0,
+        default_latency: float = 1.0,
+        error_penalty: float = 4.0,
+        metrics: Optional[MetricsRegistry] = None,
+        rng: Optional[random.Random] = None,
+        breakers: Optional[CircuitBreakers] = None,
+    ):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.cooldown_seconds = cooldown_seconds
+        self.default_latency = default_latency
+        self.error_penalty = error_penalty
+        self.metrics = metrics or MetricsRegistry()
+        self.rng = rng or random.Random()
+        self.breakers = breakers
+        self.stats: Dict[str, ProviderStats] = {provider.name: ProviderStats() for provider in providers}
+        self.in_flight: Dict[str, int] = {provider.name: 0 for provider in providers}
+
+    @property
+    def supports_response_format(self) -> bool:
+        return any(provider.supports_response_format for provider in self.providers)
+
+    def score(self, provider: ChatProvider) -> float:
+        """Lower is better."""
+        stats = self.stats[provider.name]
+        latency = stats.p95() or self.default_latency
+        return latency * (1 + self.error_penalty * stats.error_rate()) / max(stats.quota_fraction(), 0.05)
+
+    def order(self, prefer_idle: bool = False) -> List[ChatProvider]:
+        """Providers to try in turn; prefer_idle puts those with fewest requests in flight first (for hedges)."""
+        now = time.monotonic()
+        candidates = self.providers
+        if self.breakers is not None:
+            candidates = [provider for provider in self.providers if self.breakers.get(provider.name).allows_request()]
+            if not candidates:
+                raise CircuitOpenError("(all providers)", self.breakers.retry_after() or self.cooldown_seconds)
+        available = [provider for provider in candidates if self.stats[provider.name].cooldown_until <= now]
+        if not available:
+            # Everything is cooling down: try whichever comes back first rather than failing outright
+            return sorted(candidates, key=lambda provider: self.stats[provider.name].cooldown_until)
+
+        ranked = sorted(available, key=self.score)
+        weights = [provider.weight / self.score(provider) for provider in ranked]
+        first = self.rng.choices(ranked, weights=weights)[0]
+        ordered = [first] + [provider for provider in ranked if provider is not first]
+        if prefer_idle:
+            # A hedge should go anywhere but the deployment the stalled call is waiting on
+            ordered.sort(key=lambda provider: self.in_flight[provider.name])
+        return ordered
+
+    async def create(self, request: Dict[str, Any], prefer_idle: bool = False) -> ProviderResponse:
+        last_error: Optional[Exception] = None
+        providers = self.order(prefer_idle)
+        if "response_format" in request:
+            # A provider that ignores the schema would return a reply that fails validation
+            providers = [provider for provider in providers if provider.supports_response_format]
+            if not providers:
+                raise CircuitOpenError("(providers supporting response_format)", self.cooldown_seconds)
+        for attempt, provider in enumerate(providers):
+            if attempt:
+                self.metrics.increment("llm_router_failover", provider=provider.name)
+            stats = self.stats[provider.name]
+            started = time.monotonic()
+            self.in_flight[provider.name] += 1
+            try:
+                if self.breakers is not None:
+                    response = await self.breakers.get(provider.name).call(lambda: provider.create(request))
+                else:
+                    response = await provider.create(request)
+            except CircuitOpenError as e:
+                # Another request took the half-open probe after this order was drawn
+                last_error = e
+                continue
+            except Exception as e:
+                outcome = classify_error(e)
+                stats.outcomes.append(False)
+                self.metrics.increment("llm_router_requests", provider=provider.name, outcome=outcome or "error")
+                if outcome is None:
+                    raise
+                headers = getattr(getattr(e, "response", None), "headers", None) or {}
+                retry_after = parse_retry_after(headers) if outcome == THROTTLED else None
+                stats.cooldown_until = time.monotonic() + (retry_after or self.cooldown_seconds)
+                logger.warning(f"LLM provider {provider.name} {outcome}, trying the next one: {str(e)}")
+                last_error = e
+                continue
+            finally:
+                self.in_flight[provider.name] -= 1
+
+            latency = time.monotonic() - started
+            stats.latencies.append(latency)
+            stats.outcomes.append(True)
+            stats.observe_quota(*provider.quota(response.headers))
+            self.metrics.increment("llm_router_requests", provider=provider.name, outcome="success")
+            self.metrics.observe("llm_router_latency_seconds", latency, provider=provider.name)
+            return response
+        raise last_error
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            provider.name: {
+                "kind": provider.kind,
+                "model": provider.model,
+                "p95_seconds": self.stats[provider.name].p95(),
+                "error_rate": round(self.stats[provider.name].error_rate(), 3),
+                "quota_fraction": round(self.stats[provider.name].quota_fraction(), 3),
+                "cooling_down_seconds": round(max(0.0, self.stats[provider.name].cooldown_until - now), 1),
+                "score": round(self.score(provider), 3),
+                "circuit": self.breakers.get(provider.name).state if self.breakers is not None else None,
+            }
+            for provider in self.providers
+        }
@@ -0,0 +1,68 @@
+# app/services/openai_service.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+
+from ..config import Settings
+from .llm_router import ChatProvider, ProviderResponse
+
+
+class OpenAIProvider(ChatProvider):
+    """OpenAI's own API (or anything speaking it, such as a local stub server)."""
+
+    kind = "openai"
+
+    def __init__(self, name: str, client: AsyncOpenAI, model: str, weight: float = 1.0):
+        super().__init__(name, model, weight)
+        self.client = client
+
+    async def create(self, request: Dict[str, Any]) -> ProviderResponse:
+        # Raw response so the router can read the rate-limit headers
+        raw = await self.client.chat.completions.with_raw_response.create(**{**request, "model": self.model})
+        return ProviderResponse(raw.parse(), raw.headers)
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: Dict[str, Any],
+        settings: Settings,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_retries: int = 0,
+    ) -> "OpenAIProvider":
+        model = spec.get("model") or settings.azure_openai_deployment
+        client = AsyncOpenAI(
+            api_key=spec.get("api_key") or settings.openai_api_key,
+            base_url=spec.get("base_url"),
+            max_retries=max_retries,
+            http_client=http_client,
+        )
+        return cls(spec.get("name") or f"openai/{model}", client, model, weight=float(spec.get("weight", 1.0)))
+
+
+class AzureOpenAIProvider(OpenAIProvider):
+    """One Azure OpenAI deployment; several can be listed for different regions."""
+
+    kind = "azure"
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: Dict[str, Any],
+        settings: Settings,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_retries: int = 0,
+    ) -> "AzureOpenAIProvider":
+        endpoint = spec.get("endpoint") or settings.azure_openai_endpoint
+        deployment = spec.get("deployment") or settings.azure_openai_deployment
+        client = AsyncAzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=spec.get("api_key") or settings.azure_openai_api_key,
+            api_version=spec.get("api_version") or settings.azure_openai_api_version,
+            max_retries=max_retries,
+            http_client=http_client,
+        )
+        host = httpx.URL(endpoint).host
+        return cls(spec.get("name") or f"azure/{host}/{deployment}", client, deployment, weight=float(spec.get("weight", 1.0)))
@@ -1,13 +1,116 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import csv
+import gzip
+import io
 import json
+import logging
 import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any, Mapping, Optional
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for zstd-compressed segments
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation then assumes a single writer process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Length of the ISO timestamp prefix that identifies a rotation period
+ROTATION_PERIODS = {"hour": 13, "day": 10}
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+
+def manifest_path_for(csv_path: str) -> str:
+    stem, _ = os.path.splitext(os.path.abspath(csv_path))
+    return f"{stem}.manifest.jsonl"
+
+
+def lock_path_for(csv_path: str) -> str:
+    stem, _ = os.path.splitext(os.path.abspath(csv_path))
+    return f"{stem}.lock"
+
+
+def read_audit_manifest(
+    csv_path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Closed segments whose time range overlaps [start, end] (ISO UTC timestamps)."""
+    manifest_path = manifest_path_for(csv_path)
+    if not os.path.exists(manifest_path):
+        return []
+    segments = []
+    with open(manifest_path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            segment = json.loads(line)
+            if start and segment["last_timestamp_utc"] < start:
+                continue
+            if end and segment["first_timestamp_utc"] > end:
+                continue
+            segments.append(segment)
+    return segments
+
+
+def open_audit_segment(path: str):
+    """Open a closed (possibly compressed) segment or the active CSV for reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is required to read .zst audit segments")
+        return io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), newline="", encoding="utf-8"
+        )
+    return open(path, newline="", encoding="utf-8")
+
+
+def iter_audit_rows(
+    csv_path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Iterator[Dict[str, str]]:
+    """Audit rows in [start, end], reading only the segments that can contain them."""
+    directory = os.path.dirname(os.path.abspath(csv_path))
+    paths = [os.path.join(directory, segment["segment"]) for segment in read_audit_manifest(csv_path, start, end)]
+    if os.path.exists(csv_path):
+        paths.append(csv_path)
+    for path in paths:
+        with open_audit_segment(path) as handle:
+            for row in csv.DictReader(handle):
+                timestamp = row["timestamp_utc"]
+                if (start and timestamp < start) or (end and timestamp > end):
+                    continue
+                yield row
 
 
 class PortfolioOutputAuditLogger:
+    """Appends model outputs to a CSV, optionally rotating it into compressed segments.
+
+    Several worker processes may share one CSV. With rotation enabled, every batch is
+    written under an exclusive flock on a sibling .lock file, and the writer first
+    picks up rows other processes appended (or reopens the file they rotated away), so
+    rotation never moves a file out from under another writer. Where fcntl is missing
+    (Windows) there is no cross-process lock and rotation assumes a single writer.
+    """
+
     FIELDNAMES = [
         "timestamp_utc",
         "operation",
@@ -17,10 +120,57 @@ class PortfolioOutputAuditLogger:
         "output_json",
         "output_char_count",
     ]
+    OVERFLOW_POLICIES = ("drop", "block")
 
-    def __init__(self, csv_path: Optional[str], enabled: bool = True):
+    def __init__(
+        self,
+        csv_path: Optional[str],
+        enabled: bool = True,
+        background: bool = False,
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        overflow_policy: str = "drop",
+        rotate_max_bytes: int = 0,
+        rotate_interval: Optional[str] = None,
+        compression: str = "gzip",
+    ):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {self.OVERFLOW_POLICIES}, got '{overflow_policy}'")
+        if rotate_interval and rotate_interval not in ROTATION_PERIODS:
+            raise ValueError(f"rotate_interval must be one of {sorted(ROTATION_PERIODS)}, got '{rotate_interval}'")
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"compression must be one of {sorted(COMPRESSION_SUFFIXES)}, got '{compression}'")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
         self.csv_path = (csv_path or "").strip()
         self.enabled = enabled and bool(self.csv_path)
+        self.background = background
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.rotate_max_bytes = rotate_max_bytes
+        self.rotate_interval = rotate_interval or None
+        self.compression = compression
+        self.dropped = 0
+        self.handed_off = 0
+        # "block" on an event loop: up to queue_size rows that find the queue full wait on
+        # this thread instead of the loop; past that they are dropped and counted
+        self._handoff: Optional[ThreadPoolExecutor] = None
+        self._handoff_limit = max(1, queue_size)
+        self._handoff_pending = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._handle = None
+        self._lock_handle = None
+        self._file_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+        # Active segment bookkeeping for rotation and the manifest
+        self._segment_rows = 0
+        self._segment_bytes = 0
+        self._segment_first: Optional[str] = None
+        self._segment_last: Optional[str] = None
 
     def record(
         self,
@@ -34,12 +184,141 @@ class PortfolioOutputAuditLogger:
         if not self.enabled:
             return
 
-        csv_path = os.path.abspath(self.csv_path)
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-        should_write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        entry = (
+            datetime.now(timezone.utc).isoformat(),
+            operation,
+            model_deployment,
+            request_payload,
+            output_text,
+            output_payload,
+        )
+
+        if not self.background or self._closed:
+            with self._file_lock:
+                self._write_rows([self._build_row(entry)])
+                self._handle.flush()
+            return
 
-        row = {
-            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        # Background mode: JSON encoding and file I/O happen on the writer thread
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            if self.overflow_policy == "block" and self._block(entry):
+                return
+            self.dropped += 1
+            logger.warning("Portfolio audit queue is full, dropped %s row(s) so far", self.dropped)
+
+    def _block(self, entry: Tuple[Any, ...]) -> bool:
+        """Wait for queue space without stalling an event loop; False when the row must be dropped."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Worker thread or script: waiting here is the backpressure
+            self._queue.put(entry)
+            return True
+        with self._thread_lock:
+            if self._handoff_pending >= self._handoff_limit:
+                return False
+            if self._handoff is None:
+                self._handoff = ThreadPoolExecutor(max_workers=1, thread_name_prefix="portfolio-audit-handoff")
+            self._handoff_pending += 1
+            handoff = self._handoff
+        self.handed_off += 1
+        handoff.submit(self._put_handed_off, entry)
+        return True
+
+    def _put_handed_off(self, entry: Tuple[Any, ...]) -> None:
+        try:
+            self._queue.put(entry)
+        finally:
+            with self._thread_lock:
+                self._handoff_pending -= 1
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Block until every queued row has been written and flushed."""
+        if self._thread is not None:
+            self._queue.join()
+        with self._file_lock:
+            if self._handle is not None:
+                self._handle.flush()
+
+    def close(self) -> None:
+        """Drain the queue, stop the writer thread and close the file. Safe to call twice."""
+        with self._thread_lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            handoff = self._handoff
+        if handoff is not None:
+            # Rows waiting for queue space go in before the stop marker
+            handoff.shutdown(wait=True)
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        with self._file_lock:
+            self._close_handle()
+            if self._lock_handle is not None:
+                self._lock_handle.close()
+                self._lock_handle = None
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run, name="portfolio-audit-writer", daemon=True
+                )
+                self._thread.start()
+                # Flush whatever is still queued when the worker process exits
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        batch: List[Tuple[Any, ...]] = []
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+                self._queue.task_done()
+            elif item is not None:
+                batch.append(item)
+
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if batch and (stopping or due or len(batch) >= self.batch_size):
+                self._write_batch(batch)
+                batch = []
+                last_flush = time.monotonic()
+            elif due:
+                last_flush = time.monotonic()
+
+    def _write_batch(self, batch: List[Tuple[Any, ...]]) -> None:
+        try:
+            with self._file_lock:
+                self._write_rows([self._build_row(entry) for entry in batch])
+                self._handle.flush()
+        except Exception as exc:
+            logger.warning("Failed to write %s portfolio audit row(s): %s", len(batch), exc)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _build_row(self, entry: Tuple[Any, ...]) -> dict:
+        timestamp, operation, model_deployment, request_payload, output_text, output_payload = entry
+        return {
+            "timestamp_utc": timestamp,
             "operation": operation,
             "model_deployment": model_deployment,
             "request_json": json.dumps(request_payload, ensure_ascii=False, sort_keys=True),
@@ -48,8 +327,152 @@ class PortfolioOutputAuditLogger:
             "output_char_count": len(output_text),
         }
 
-        with open(csv_path, "a", newline="", encoding="utf-8") as handle:
-            writer = csv.DictWriter(handle, fieldnames=self.FIELDNAMES)
-            if should_write_header:
-                writer.writeheader()
+    def _open(self) -> None:
+        csv_path = os.path.abspath(self.csv_path)
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        if os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+            self._scan_active_segment(csv_path)
+        self._handle = open(csv_path, "a", newline="", encoding="utf-8")
+        if self._handle.tell() == 0:
+            self._write_text(self._render(None))
+
+    def _scan_active_segment(self, csv_path: str) -> None:
+        # Recover row count and time range after a restart or another process's rotation
+        self._reset_segment()
+        self._segment_bytes = os.path.getsize(csv_path)
+        with open(csv_path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                self._count_row(row["timestamp_utc"])
+
+    def _count_row(self, timestamp: str) -> None:
+        self._segment_rows += 1
+        self._segment_first = self._segment_first or timestamp
+        self._segment_last = timestamp
+
+    def _reset_segment(self) -> None:
+        self._segment_rows = 0
+        self._segment_bytes = 0
+        self._segment_first = None
+        self._segment_last = None
+
+    @contextmanager
+    def _shared_file(self):
+        """Hold the cross-process lock while writing a rotating CSV; a no-op otherwise."""
+        if fcntl is None or not (self.rotate_max_bytes or self.rotate_interval):
+            yield
+            return
+        if self._lock_handle is None:
+            csv_path = os.path.abspath(self.csv_path)
+            os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+            self._lock_handle = open(lock_path_for(csv_path), "a")
+        fcntl.flock(self._lock_handle, fcntl.LOCK_EX)
+        try:
+            self._catch_up()
+            yield
+            if self._handle is not None:
+                self._handle.flush()
+        finally:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+
+    def _catch_up(self) -> None:
+        """Account for rows other processes appended, or drop a handle to a file they rotated."""
+        if self._handle is None:
+            return
+        csv_path = os.path.abspath(self.csv_path)
+        try:
+            current = os.stat(csv_path)
+        except FileNotFoundError:
+            current = None
+        if current is None or not os.path.samestat(current, os.fstat(self._handle.fileno())):
+            self._close_handle()
+            self._reset_segment()
+            return
+        if current.st_size <= self._segment_bytes:
+            return
+        # Every writer appends whole rows under the lock, so our offset is a row boundary
+        with open(csv_path, "rb") as handle:
+            handle.seek(self._segment_bytes)
+            appended = handle.read().decode("utf-8")
+        for row in csv.DictReader(io.StringIO(appended, newline=""), fieldnames=self.FIELDNAMES):
+            self._count_row(row["timestamp_utc"])
+        self._segment_bytes = current.st_size
+
+    def _render(self, row: Optional[dict]) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.FIELDNAMES)
+        if row is None:
+            writer.writeheader()
+        else:
             writer.writerow(row)
+        return buffer.getvalue()
+
+    def _write_text(self, text: str) -> None:
+        self._handle.write(text)
+        self._segment_bytes += len(text.encode("utf-8"))
+
+    def _write_rows(self, rows: List[dict]) -> None:
+        # Callers hold _file_lock; the handle stays open between writes
+        with self._shared_file():
+            for row in rows:
+                if self._should_rotate(row["timestamp_utc"]):
+                    self._rotate()
+                if self._handle is None:
+                    self._open()
+                self._write_text(self._render(row))
+                self._count_row(row["timestamp_utc"])
+
+    def _should_rotate(self, timestamp: str) -> bool:
+        if self._segment_rows == 0:
+            return False
+        if self.rotate_max_bytes and self._segment_bytes >= self.rotate_max_bytes:
+            return True
+        if self.rotate_interval:
+            width = ROTATION_PERIODS[self.rotate_interval]
+            return timestamp[:width] != self._segment_first[:width]
+        return False
+
+    def _rotate(self) -> None:
+        """Close the active CSV, compress it into a segment and record it in the manifest."""
+        self._close_handle()
+        csv_path = os.path.abspath(self.csv_path)
+        stem, extension = os.path.splitext(csv_path)
+        stamp = self._segment_first.replace("-", "").replace(":", "").split(".")[0].split("+")[0]
+        segment_path = f"{stem}.{stamp}{extension}"
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        counter = 1
+        while os.path.exists(segment_path) or os.path.exists(segment_path + suffix):
+            segment_path = f"{stem}.{stamp}-{counter}{extension}"
+            counter += 1
+        os.replace(csv_path, segment_path)
+
+        uncompressed_bytes = os.path.getsize(segment_path)
+        if self.compression != "none":
+            compressed_path = segment_path + suffix
+            with open(segment_path, "rb") as source:
+                if self.compression == "gzip":
+                    with gzip.open(compressed_path, "wb") as target:
+                        shutil.copyfileobj(source, target)
+                else:
+                    with open(compressed_path, "wb") as target:
+                        zstandard.ZstdCompressor().copy_stream(source, target)
+            os.remove(segment_path)
+            segment_path = compressed_path
+
+        entry = {
+            "segment": os.path.basename(segment_path),
+            "first_timestamp_utc": self._segment_first,
+            "last_timestamp_utc": self._segment_last,
+            "row_count": self._segment_rows,
+            "compression": self.compression,
+            "bytes": os.path.getsize(segment_path),
+            "uncompressed_bytes": uncompressed_bytes,
+        }
+        with open(manifest_path_for(csv_path), "a", encoding="utf-8") as manifest:
+            manifest.write(json.dumps(entry, sort_keys=True) + "\n")
+
+        self._reset_segment()
+
+    def _close_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
@@ -1,31 +1,662 @@
 # app/services/portfolio_service.py
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 import openai
 from openai import AsyncOpenAI, AsyncAzureOpenAI
+from openai.types.chat import ChatCompletion
 import asyncio
 import logging
+import re
+import time
+from contextlib import asynccontextmanager
 from ..config import Settings, capability_content
-from ..utils.text_processing import extract_sections, generate_title
+from ..utils.text_processing import (
+    extract_sections,
+    IncrementalSectionParser,
+    build_title_messages,
+    clean_title,
+    extract_title,
+    local_title,
+    locate_sections,
+    splice_sections,
+    render_review_content,
+    SectionSpan,
+)
+from ..utils.metrics import MetricsRegistry
+from ..utils.singleflight import SingleFlight
+from ..utils.tokens import estimate_request_tokens
+from ..utils.prompt_builder import SystemPromptBuilder, parse_descriptor_index
 from ..utils.capabilities import parse_capabilities, format_capabilities
-from ..models import CaseReviewResponse, CaseReviewSection
+from ..utils.patching import PATCH_INSTRUCTIONS, PatchError, apply_patch
+from ..utils.deadline import DeadlineExceeded, deadline_exceeded, has_budget, remaining_seconds
+from ..utils.structured_review import (
+    STRUCTURED_OUTPUT_INSTRUCTIONS,
+    StructuredOutputError,
+    StructuredReviewStreamParser,
+    parse_structured_review,
+    review_response_format,
+)
+from ..models import (
+    CaseReviewResponse,
+    CaseReviewSection,
+    CaseIntakeResponse,
+    CapabilitySelectionResponse,
+    ExperienceGroupResponse,
+)
 from .portfolio_audit import PortfolioOutputAuditLogger
+from .title_strategies import get_title_strategy, resolve_improved_title
+from .llm_cache import LLMResponseCache, create_shared_backend, make_cache_key
+from .rate_limiter import RateLimitScheduler
+from .capability_ranker import CapabilityRanker
+from .improvement_planner import plan_improvement
+from .speculation import SpeculativeReviews
+from .llm_router import LLMRouter
+from .hedging import HedgePolicy, parse_operations
+from .circuit_breaker import CircuitBreakers, CircuitOpenError
+from .experience_group_classifier import (
+    EXPERIENCE_GROUPS,
+    FALLBACK_GROUP,
+    ExperienceGroupClassifier,
+    apply_age_constraint,
+    extract_ages,
+    involves_children,
+    patient_age,
+)
 
 logger = logging.getLogger(__name__)
 
+
+def sdk_max_retries(settings: Settings) -> int:
+    """Retries for the Azure OpenAI client. With the scheduler on they go back through
+    admission instead (see PortfolioService._retry_delay), so the SDK must not retry 429s itself."""
+    return 0 if settings.llm_scheduler_enabled else settings.openai_max_retries
+
+# Deployments whose models accept the `prediction` parameter (predicted outputs)
+PREDICTION_DEPLOYMENT_PREFIXES = ("gpt-4o", "gpt-4.1")
+
+SECTION_HEADINGS = {
+    "brief_description": "Brief description",
+    "reflection": "Reflection",
+    "learning_needs": "Learning needs identified from this event",
+}
+
+# Static instructions sit at the start of every request (system message, then any
+# few-shot turns) so repeated calls share a cacheable prefix; per-request content
+# always comes last.
+
+IMPROVE_REVIEW_SYSTEM_PROMPT = """You are an AI assistant helping to improve GP portfolio entries.
+Your task is to enhance specific aspects of case reviews while maintaining the overall structure and other content.
+
+Guidelines:
+1. Only modify content specifically related to the requested improvement
+2. Maintain the same level of professionalism and medical accuracy
+3. Keep the same structure and sections (always include the same sections and ensure they are all populated)
+4. Ensure improvements are specific and evidence-based
+5. Preserve any existing good content not related to the improvement request
+6. For demographic corrections, ensure all pronouns and references are updated consistently throughout
+
+IMPORTANT:
+1. Only modify sections specifically related to the requested improvement, other sections should be kept exactly the same
+2. Keep all other content exactly the same
+3. Maintain the same structure and section headings
+4. Ensure the improvements are specific and detailed
+5. Write in British English not American"""
+
+IMPROVE_REVIEW_SECTION_SYSTEM_PROMPT = """You are an AI assistant helping to improve GP portfolio entries.
+You are rewriting a single section of a case review; every other section stays exactly as it is.
+
+Guidelines:
+1. Only modify content specifically related to the requested improvement
+2. Maintain the same level of professionalism and medical accuracy
+3. Ensure improvements are specific and evidence-based
+4. Preserve any existing good content not related to the improvement request
+5. Write in British English not American
+6. No bullet points, headings or section labels
+
+Return only the improved content of the section, without its heading."""
+
+IMPROVE_SECTION_SYSTEM_PROMPT = """You are an AI assistant helping to improve specific sections of GP portfolio entries.
+Focus only on improving the requested section while maintaining professional medical language and specific, actionable content.
+
+Please provide an improved version of the section only; the improved section should be in the same format as the current content but only with the improvements requested.
+Maintain professional medical language and be specific.
+Only return the improved section, do not include any other text.
+Write in British English not American.
+Make sure the output sounds natural and doesn't directly refer to the improvement request."""
+
+IMPROVE_SECTION_GUIDANCE = {
+    "brief_description": "For brief descriptions: Focus on clarity, structure, and key clinical details.",
+    "capability": "For capabilities: Ensure clear links between actions and the specific capability.",
+    "reflection": "For reflections: Include both clinical and emotional aspects, what went well, and areas for improvement.",
+    "learning_needs": "For learning needs: Be specific about knowledge gaps and actionable learning objectives.",
+}
+
+SELECT_CAPABILITIES_SYSTEM_PROMPT = """You are an expert RCGP (Royal College of General Practitioners) assessor.
+Your task is to analyze a clinical case description and select the 2-3 most relevant capabilities
+from the RCGP curriculum that are clearly demonstrated in the case.
+
+Guidelines:
+1. Select only capabilities with clear evidence in the case description
+2. Choose 2-3 capabilities (not more, not less than 2)
+3. Prioritize capabilities that are most prominently demonstrated
+4. Return ONLY the capability names, one per line, exactly as they appear in the list of available capabilities
+5. Do not add explanations or numbering"""
+
+# Follows the case so the answer format is the last thing the model reads
+SELECT_CAPABILITIES_INSTRUCTION = """Based on the case description above, select the 2-3 most relevant capabilities that are clearly demonstrated.
+Return only the capability names, one per line, exactly as they appear in the list above."""
+
+EXPERIENCE_GROUPS_SYSTEM_PROMPT = """You are an expert Medical Educational Assistant for the 'fourteenfishermen' GP portfolio tool. Your task is to analyze a Clinical Case Log written by a General Practitioner trainee and categorize it into the correct *Clinical Experience Group(s)*.
+
+*CORE INSTRUCTIONS:*
+1.  *Analyze Context over Diagnosis:* Do not classify based solely on the medical condition. You must look at the context (patient age, social setting, vulnerability, urgency, and the specific focus of the trainee's reflection).
+2.  *Select 1-2 Groups:* Ideally, select *two* groups if the case touches on multiple aspects (e.g., a child with a mental health issue). If only one fits, select one.
+3.  *Strict Fallback:* Only use "Clinical problems not linked to a specific clinical experience group" if *absolutely none* of the specific groups apply. This should be infrequent.
+
+*DEFINITIONS OF CLINICAL EXPERIENCE GROUPS:*
+1.  *Infants, children and young people (under 19):* Patients <19 years (includes students, parents of young children).
+2.  *Gender, reproductive and sexual health:* Women’s/men’s health, LGBTQ+, gynaecology, breast, sexual health/BBV.
+3.  *People with long-term conditions:* Cancer, multi-morbidity, disability, chronic illness (diabetes, asthma, etc.).
+4.  *Older adults:* Frailty, end-of-life, complex care in >65s.
+5.  *Mental health:* Addiction, alcohol, substance misuse, anxiety, depression, health anxiety.
+6.  *Urgent and unscheduled care:* Acute/septic presentations, A&E, OOH hubs, same-day triage.
+7.  *People with health disadvantage and vulnerabilities:* Veterans, asylum seekers, learning disabilities, safeguarding, capacity issues, sensory impairment (deaf/blind).
+8.  *Population Health and health promotion:* Prevention, lifestyle advice, self-management, screening.
+9.  *Clinical problems not linked to a specific clinical experience group:* Fallback only.
+
+CRITICAL AGE CONSTRAINT: The age limit of "under 19" is absolute. Any patient aged 19 years or older is STRICTLY excluded from the "Infants, children and young people" group.
+
+*EXTENSIVE REASONING EXAMPLES (Use these to guide your logic):*
+
+*Scenario: Patient with Vertigo*
+•⁠  ⁠If context is: History of breast cancer raising suspicion of brain metastasis.
+    * -> *People with long term conditions including cancer, multi-morbidity and disability*
+•⁠  ⁠If context is: Acute onset, unwell, seen in urgent care setting.
+    * -> *Urgent and unscheduled care*
+•⁠  ⁠If context is: Elderly/frail patient with capacity difficulties explaining symptoms.
+    * -> *Older adults including frailty* AND *People with health disadvantage and vulnerabilities*
+•⁠  ⁠If context is: Empowering patient to self-manage symptoms/driving advice.
+    * -> *Population Health and health promotion*
+
+*Scenario: Patient with Diabetes*
+•⁠  ⁠If context is: Pregnant patient with recurrent thrush/complications.
+    * -> *People with long term conditions* AND *Gender, reproductive and sexual health*
+•⁠  ⁠If context is: Patient has a learning disability limiting medication compliance.
+    * -> *People with health disadvantage and vulnerabilities* AND *People with long term conditions*
+•⁠  ⁠If context is: Mental health prevents understanding of medication needs.
+    * -> *Mental health (including addiction...)* AND *People with long term conditions*
+•⁠  ⁠If context is: New diagnosis in a teenager.
+    * -> *Infants, children and young people* AND *People with long term conditions*
+
+*Scenario: Heroin Addict*
+•⁠  ⁠If context is: Septic admission seen in same-day access.
+    * -> *Urgent and unscheduled care* AND *Mental health (including addiction...)*
+•⁠  ⁠If context is: Safeguarding children of the patient.
+    * -> *Infants, children and young people* AND *People with health disadvantage and vulnerabilities*
+•⁠  ⁠If context is: Sexual implications/Blood-borne virus.
+    * -> *Mental health (including addiction...)* AND *Gender, reproductive and sexual health*
+
+*Scenario: Suspected Skin Cancer*
+•⁠  ⁠If context is: Melanoma on penis affecting men's health.
+    * -> *Gender, reproductive and sexual health* AND *People with long term conditions (cancer)*
+•⁠  ⁠If context is: Bedbound patient who previously had a stroke.
+    * -> *Older adults including frailty* AND *People with long term conditions*
+•⁠  ⁠If context is: Patient has significant health anxiety about the mole.
+    * -> *Mental health (including addiction...)*
+•⁠  ⁠If context is: Veteran/Naval officer with history of sun exposure abroad.
+    * -> *People with health disadvantage and vulnerabilities (veterans)*
+
+*Scenario: Rash (Lyme Disease Concern)*
+•⁠  ⁠If context is: Learning disability, attending with carer, capacity issues.
+    * -> *People with health disadvantage and vulnerabilities*
+•⁠  ⁠If context is: Health promotion on tick prevention.
+    * -> *Population Health and health promotion*
+
+*Scenario: Altered Bowel Habit / IBS*
+•⁠  ⁠If context is: Deaf patient relying on sign language/interpreter.
+    * -> *People with health disadvantage and vulnerabilities*
+•⁠  ⁠If context is: Young person (18yo) with family history.
+    * -> *Infants, children and young people*
+•⁠  ⁠If context is: Older woman, checking CA125 (ovarian cancer risk).
+    * -> *Gender, reproductive and sexual health* AND *Older adults including frailty*
+
+*Scenario: Persistent Cough*
+•⁠  ⁠If context is: Toddler at nursery with viral illnesses.
+    * -> *Infants, children and young people*
+•⁠  ⁠If context is: Veteran with previous asbestos exposure in Navy.
+    * -> *People with health disadvantage and vulnerabilities*
+•⁠  ⁠If context is: History of substance misuse leading to appointment.
+    * -> *Mental health (including addiction...)*"""
+
 class PortfolioService:
-    def __init__(self, settings: Settings, audit_logger: Optional[PortfolioOutputAuditLogger] = None):
+    def __init__(
+        self,
+        settings: Settings,
+        audit_logger: Optional[PortfolioOutputAuditLogger] = None,
+        openai_client: Optional[AsyncAzureOpenAI] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        response_cache: Optional[LLMResponseCache] = None,
+        router: Optional[LLMRouter] = None,
+        circuit_breakers: Optional[CircuitBreakers] = None,
+    ):
         self.settings = settings
-        self.openai_client = AsyncAzureOpenAI(
+        # Spreads calls over LLM_PROVIDERS when configured; otherwise openai_client is used directly
+        self.router = router
+        self.openai_client = openai_client or AsyncAzureOpenAI(
             azure_endpoint=settings.azure_openai_endpoint,
             api_key=settings.azure_openai_api_key,
-            api_version=settings.azure_openai_api_version
+            api_version=settings.azure_openai_api_version,
+            max_retries=sdk_max_retries(settings)
         )
         self.capabilities = parse_capabilities(capability_content)
+        self.prompt_builder = SystemPromptBuilder(settings.SYSTEM_PROMPT, enabled=settings.scoped_system_prompt_enabled)
+        self.capability_ranker = None
+        if settings.capability_ranker_enabled:
+            self.capability_ranker = CapabilityRanker.from_sources(
+                self.capabilities,
+                self.prompt_builder.index or parse_descriptor_index(settings.SYSTEM_PROMPT),
+                min_score=settings.capability_ranker_min_score,
+                margin=settings.capability_ranker_margin,
+            )
+        self.experience_group_classifier = None
+        if settings.experience_group_rules_enabled:
+            self.experience_group_classifier = ExperienceGroupClassifier(
+                min_score=settings.experience_group_rules_min_score
+            )
+        self.metrics = metrics or MetricsRegistry()
+        self.response_cache = response_cache or self._build_response_cache(settings)
+        # Share the router's breakers when there is one, so both report the same circuits
+        self.circuit_breakers = circuit_breakers or (router.breakers if router is not None else None)
+        if self.circuit_breakers is None:
+            self.circuit_breakers = CircuitBreakers.from_settings(settings, self.metrics)
+        self.singleflight = SingleFlight()
+        self.scheduler = None
+        if settings.llm_scheduler_enabled:
+            self.scheduler = RateLimitScheduler(
+                tokens_per_minute=settings.llm_tokens_per_minute,
+                requests_per_minute=settings.llm_requests_per_minute,
+                max_concurrency=settings.llm_max_concurrency,
+                metrics=self.metrics,
+            )
+        self.hedging = None
+        if settings.llm_hedging_enabled:
+            self.hedging = HedgePolicy(
+                parse_operations(settings.llm_hedging_operations),
+                percentile_fraction=settings.llm_hedging_percentile / 100,
+                default_delay_seconds=settings.llm_hedging_default_delay_seconds,
+                min_samples=settings.llm_hedging_min_samples,
+                max_fraction=settings.llm_hedging_max_fraction,
+                max_in_flight=settings.llm_hedging_max_in_flight,
+                metrics=self.metrics,
+            )
+        self.title_strategy = get_title_strategy(settings.title_strategy, self.generate_title)
+        self.speculative_reviews = None
+        if settings.speculative_generation_enabled:
+            self.speculative_reviews = SpeculativeReviews(
+                self._generate_case_review,
+                max_jobs=settings.speculative_generation_max_jobs,
+                ttl_seconds=settings.speculative_generation_ttl_seconds,
+                metrics=self.metrics,
+            )
+        # Cleared when the deployment rejects a prediction, so later edits go straight to patch mode
+        self.predictions_supported = True
+        # Cleared when the deployment rejects response_format, so later reviews use the text format
+        self.structured_output_supported = True
         self.audit_logger = audit_logger or PortfolioOutputAuditLogger(
             csv_path=settings.portfolio_output_audit_csv_path,
             enabled=settings.portfolio_output_audit_enabled,
+            background=settings.portfolio_output_audit_background,
+            queue_size=settings.portfolio_output_audit_queue_size,
+            batch_size=settings.portfolio_output_audit_batch_size,
+            flush_interval=settings.portfolio_output_audit_flush_interval,
+            overflow_policy=settings.portfolio_output_audit_overflow_policy,
+            rotate_max_bytes=settings.portfolio_output_audit_rotate_max_bytes,
+            rotate_interval=settings.portfolio_output_audit_rotate_interval,
+            compression=settings.portfolio_output_audit_compression,
         )
 
+    def _build_response_cache(self, settings: Settings) -> LLMResponseCache:
+        operations = [
+            "select_capabilities",
+            "select_experience_groups",
+            "generate_title",
+            "improve_section",
+            "generate_review",
+            "improve_review",
+        ]
+        ttls = {}
+        if settings.llm_cache_enabled:
+            ttls = {operation: getattr(settings, f"llm_cache_ttl_{operation}") for operation in operations}
+        return LLMResponseCache(
+            ttls=ttls,
+            max_entries=settings.llm_cache_max_entries,
+            shared=create_shared_backend(settings.llm_cache_shared_url) if settings.llm_cache_enabled else None,
+            metrics=self.metrics,
+        )
+
+    async def _create_completion(
+        self,
+        operation: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        **kwargs: Any,
+    ):
+        """Single entry point for chat completions so every call shares caching and accounting."""
+        request = {
+            "model": self.settings.azure_openai_deployment,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            **kwargs,
+        }
+        self.metrics.increment("llm_requests", operation=operation)
+        if deadline_exceeded():
+            self._record_cancelled(operation, request, "deadline")
+            raise DeadlineExceeded(f"No time left in the request budget for {operation}")
+        if kwargs.get("stream"):
+            return self._stream_upstream(operation, request)
+
+        remaining = remaining_seconds()
+        try:
+            if remaining is None:
+                return await self._complete(operation, request)
+            return await asyncio.wait_for(self._complete(operation, request), remaining)
+        except asyncio.TimeoutError:
+            self._record_cancelled(operation, request, "deadline")
+            raise DeadlineExceeded(f"Request budget ran out waiting for {operation}")
+        except asyncio.CancelledError:
+            # The client went away (or a sibling call failed); the upstream request is dropped with us
+            self._record_cancelled(operation, request, "cancelled")
+            raise
+
+    async def _complete(self, operation: str, request: Dict[str, Any]):
+        key = make_cache_key(**request)
+        cached = await self.response_cache.get(operation, key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+
+        if not self.settings.llm_singleflight_enabled:
+            return await self._call_upstream(operation, key, request)
+        if self.singleflight.is_in_flight(key):
+            self.metrics.increment("llm_coalesced", operation=operation)
+        return await self.singleflight.do(key, lambda: self._call_upstream(operation, key, request))
+
+    def _record_cancelled(self, operation: str, request: Dict[str, Any], reason: str) -> None:
+        # max_tokens is the most the abandoned completion could have billed
+        self.metrics.increment("llm_cancelled", operation=operation, reason=reason)
+        self.metrics.increment("llm_cancelled_max_tokens", request["max_tokens"], operation=operation, reason=reason)
+
+    async def _call_upstream(self, operation: str, key: str, request: Dict[str, Any]):
+        self.metrics.increment("llm_upstream_calls", operation=operation)
+        if self.hedging is not None and self.hedging.applies(operation):
+            completion = await self.hedging.run(
+                operation,
+                lambda hedge, sent: self._attempt_upstream(operation, request, hedge, sent),
+                cost=request["max_tokens"],
+            )
+        else:
+            completion = await self._attempt_upstream(operation, request)
+        if self.response_cache.is_cacheable(operation) and hasattr(completion, "model_dump_json"):
+            await self.response_cache.set(operation, key, completion.model_dump_json())
+        return completion
+
+    async def _attempt_upstream(
+        self,
+        operation: str,
+        request: Dict[str, Any],
+        hedge: bool = False,
+        sent: Optional[Callable[[], None]] = None,
+    ):
+        attempt = 0
+        while True:
+            try:
+                # A hedge is admitted like any other call, so it counts against the quota it spends
+                async with self._admit(operation, request) as ticket:
+                    if sent is not None:
+                        # Starts the hedging clock: queueing for admission is not upstream latency
+                        sent()
+                    started = time.monotonic()
+                    completion = await self._send(operation, request, ticket, hedge=hedge)
+                    self._record_prompt_cache_usage(operation, completion, time.monotonic() - started)
+                return completion
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            attempt = await self._wait_to_retry(operation, attempt, delay)
+
+    async def _stream_upstream(self, operation: str, request: Dict[str, Any]) -> AsyncIterator[Any]:
+        # The scheduler slot is held until the stream is exhausted or closed
+        self.metrics.increment("llm_upstream_calls", operation=operation)
+        attempt = 0
+        while True:
+            async with self._admit(operation, request) as ticket:
+                try:
+                    stream = await self._send(operation, request, ticket)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    async for chunk in stream:
+                        if deadline_exceeded():
+                            self._record_cancelled(operation, request, "deadline")
+                            raise DeadlineExceeded(f"Request budget ran out while streaming {operation}")
+                        yield chunk
+                    return
+            attempt = await self._wait_to_retry(operation, attempt, delay)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a direct call under the scheduler, or None to give up.
+
+        The SDK client does not retry then (sdk_max_retries), so a 429 reaches the
+        scheduler at once and the retry waits for admission like a new call. The
+        router fails over between providers instead.
+        """
+        if self.scheduler is None or self.router is not None or attempt >= self.settings.openai_max_retries:
+            return None
+        if isinstance(error, openai.RateLimitError):
+            # record_rate_limited has already paused the scheduler
+            return 0.0
+        if isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+            return min(8.0, 0.5 * 2 ** attempt)
+        return None
+
+    async def _wait_to_retry(self, operation: str, attempt: int, delay: float) -> int:
+        self.metrics.increment("llm_retries", operation=operation)
+        if delay:
+            await asyncio.sleep(delay)
+        return attempt + 1
+
+    @asynccontextmanager
+    async def _admit(self, operation: str, request: Dict[str, Any]):
+        """Wait for rate-limit quota (estimated prompt + max_tokens) before calling upstream."""
+        if self.scheduler is None:
+            yield None
+            return
+        cost = estimate_request_tokens(request["messages"], request["max_tokens"])
+        async with self.scheduler.slot(operation, cost) as ticket:
+            yield ticket
+
+    async def _send(self, operation: str, request: Dict[str, Any], ticket, hedge: bool = False):
+        if self.router is not None:
+            return await self._send_routed(request, ticket, prefer_idle=hedge)
+        if self.circuit_breakers is not None:
+            # Fails fast with CircuitOpenError while the deployment is unhealthy
+            breaker = self.circuit_breakers.get(self.settings.azure_openai_deployment)
+            return await breaker.call(lambda: self._send_direct(request, ticket))
+        return await self._send_direct(request, ticket)
+
+    async def _send_direct(self, request: Dict[str, Any], ticket):
+        if self.scheduler is None:
+            return await self.openai_client.chat.completions.create(**request)
+
+        # Raw response so the scheduler can adapt to Azure's rate-limit headers
+        try:
+            raw = await self.openai_client.chat.completions.with_raw_response.create(**request)
+        except openai.RateLimitError as e:
+            self.scheduler.record_rate_limited(e.response.headers)
+            raise
+        self.scheduler.record_success(raw.headers)
+        completion = raw.parse()
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            self.scheduler.settle(ticket, usage.total_tokens)
+        return completion
+
+    async def _send_routed(self, request: Dict[str, Any], ticket, prefer_idle: bool = False):
+        # Rate-limit headers are per deployment, so the router tracks them and the
+        # shared scheduler only sees the outcome
+        try:
+            response = await self.router.create(request, prefer_idle=prefer_idle)
+        except Exception as e:
+            if self.scheduler is not None and getattr(e, "status_code", None) == 429:
+                self.scheduler.record_rate_limited()
+            raise
+        completion = response.result
+        if self.scheduler is not None:
+            self.scheduler.record_success()
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                self.scheduler.settle(ticket, usage.total_tokens)
+        return completion
+
+    def _edit_mode(self) -> str:
+        mode = self.settings.improve_edit_mode
+        if mode == "auto":
+            deployment = self.settings.azure_openai_deployment.lower()
+            mode = "prediction" if deployment.startswith(PREDICTION_DEPLOYMENT_PREFIXES) else "patch"
+        if mode == "prediction" and not self.predictions_supported:
+            return "patch"
+        return mode
+
+    async def _edit_completion(
+        self,
+        operation: str,
+        messages: List[Dict[str, str]],
+        original: str,
+        max_tokens: int,
+        temperature: float,
+    ) -> str:
+        """Completion text for an edit of `original`, generated in time proportional to the change.
+
+        Uses predicted outputs when the deployment supports them, otherwise asks for
+        SEARCH/REPLACE blocks and applies them locally; a patch that does not apply
+        falls back to a plain completion.
+        """
+        mode = self._edit_mode()
+        if mode == "prediction":
+            try:
+                completion = await self._create_completion(
+                    operation,
+                    messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    prediction={"type": "content", "content": original},
+                )
+            except openai.BadRequestError as e:
+                if "prediction" not in str(e).lower():
+                    raise
+                logger.warning("Deployment rejected predicted outputs, switching to patch mode: %s", e)
+                self.predictions_supported = False
+                mode = "patch"
+            else:
+                self.metrics.increment("llm_edit_mode", operation=operation, mode="prediction")
+                self._record_prediction_usage(operation, completion)
+                return completion.choices[0].message.content
+
+        if mode == "patch":
+            completion = await self._create_completion(
+                operation,
+                messages + [{"role": "user", "content": PATCH_INSTRUCTIONS}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+            try:
+                edited = apply_patch(original, completion.choices[0].message.content)
+                self.metrics.increment("llm_edit_mode", operation=operation, mode="patch")
+                return edited
+            except PatchError as e:
+                logger.warning("Could not apply %s patch, regenerating in full: %s", operation, e)
+                self.metrics.increment("llm_edit_mode", operation=operation, mode="patch_failed")
+
+        completion = await self._create_completion(
+            operation,
+            messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        self.metrics.increment("llm_edit_mode", operation=operation, mode="full")
+        return completion.choices[0].message.content
+
+    def _record_prompt_cache_usage(self, operation: str, completion: Any, latency: float) -> None:
+        """Prompt tokens served from the provider's prefix cache, and latency split by cache hit."""
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        self.metrics.increment("llm_prompt_tokens", usage.prompt_tokens, operation=operation)
+        self.metrics.increment("llm_cached_prompt_tokens", cached, operation=operation)
+        if usage.prompt_tokens:
+            self.metrics.observe("llm_prompt_cache_hit_ratio", cached / usage.prompt_tokens, operation=operation)
+        self.metrics.observe(
+            "llm_upstream_seconds", latency, operation=operation, prompt_cache="hit" if cached else "miss"
+        )
+
+    def _record_prediction_usage(self, operation: str, completion: Any) -> None:
+        details = getattr(getattr(completion, "usage", None), "completion_tokens_details", None)
+        if details is None:
+            return
+        for outcome in ("accepted", "rejected"):
+            tokens = getattr(details, f"{outcome}_prediction_tokens", None)
+            if tokens:
+                self.metrics.increment("llm_prediction_tokens", tokens, operation=operation, outcome=outcome)
+
+    async def generate_title(self, case_description: str) -> str:
+        """Generate a brief title from the case description."""
+        if not has_budget(self.settings.title_min_budget_seconds):
+            # The title is optional; don't spend the rest of the budget on it
+            self.metrics.increment("optional_steps_skipped", step="generate_title")
+            return "Case Review"
+        try:
+            completion = await self._create_completion(
+                "generate_title",
+                build_title_messages(case_description),
+                max_tokens=50,
+                temperature=0.7
+            )
+            return clean_title(completion.choices[0].message.content)
+        except CircuitOpenError:
+            # Cached titles were already tried on the way; don't fail over a title
+            self.metrics.increment("llm_degraded", operation="generate_title")
+            return local_title(case_description)
+        except Exception as e:
+            logger.warning("Title generation failed, returning default: %s", e)
+            return "Case Review"
+
+    def get_metrics(self) -> Dict[str, Any]:
+        snapshot = self.metrics.snapshot()
+        snapshot["llm_cache"] = self.response_cache.stats()
+        if self.router is not None:
+            snapshot["llm_router"] = self.router.snapshot()
+        if self.circuit_breakers is not None:
+            snapshot["circuit_breakers"] = self.circuit_breakers.snapshot()
+        snapshot["audit"] = {
+            "queued": getattr(self.audit_logger, "queued", 0),
+            "dropped": getattr(self.audit_logger, "dropped", 0),
+        }
+        return snapshot
+
+    async def aclose(self) -> None:
+        if self.speculative_reviews is not None:
+            await self.speculative_reviews.aclose()
+        await self.response_cache.close()
+        # Guarantees queued audit rows reach disk before the worker stops
+        close_audit_logger = getattr(self.audit_logger, "close", None)
+        if close_audit_logger is not None:
+            await asyncio.to_thread(close_audit_logger)
+
     def _record_portfolio_output(
         self,
         *,
@@ -48,13 +679,77 @@ class PortfolioService:
         except Exception as exc:
             logger.warning("Failed to record portfolio AI output audit row: %s", exc)
 
+    def _build_case_review_messages(
+        self,
+        case_description: str,
+        selected_capabilities: List[str],
+        formatted_capabilities: str
+    ) -> List[Dict[str, str]]:
+        # Only the selected capabilities' progression point descriptors are sent
+        system_prompt = self.prompt_builder.build(selected_capabilities)
+        print(f"   System prompt: {system_prompt.token_count} tokens "
+              f"({system_prompt.tokens_saved} saved vs full descriptor set)")
+        self.metrics.observe("system_prompt_tokens", system_prompt.token_count)
+        self.metrics.increment("system_prompt_tokens_saved", system_prompt.tokens_saved)
+        return [
+            {
+                "role": "system",
+                "content": system_prompt.text
+            },
+            {
+                "role": "user",
+                "content": f"""Input Data:
+{case_description}
+
+Task:
+Please convert the notes above into a formal RCGP Clinical Case Review.
+
+Selected Capabilities:
+{formatted_capabilities}"""
+            }
+        ]
+
     async def generate_case_review(
         self,
         case_description: str,
-        selected_capabilities: List[str]
+        selected_capabilities: List[str],
+        generation_mode: Optional[str] = None
+    ) -> CaseReviewResponse:
+        generation_mode = generation_mode or self.settings.generation_mode
+        if self.speculative_reviews is not None:
+            response = await self.speculative_reviews.claim(case_description, selected_capabilities, generation_mode)
+            if response is not None:
+                print("✅ Serving speculatively generated review")
+                return response
+        return await self._generate_case_review(case_description, selected_capabilities, generation_mode)
+
+    def speculate_case_review(self, case_description: str, selected_capabilities: List[str]) -> Optional[str]:
+        """Start generating the review for suggested capabilities before the user asks for it.
+
+        Returns the speculation id, or None when speculation is disabled or at capacity.
+        """
+        if self.speculative_reviews is None:
+            return None
+        return self.speculative_reviews.start(case_description, selected_capabilities, self.settings.generation_mode)
+
+    async def _generate_case_review(
+        self,
+        case_description: str,
+        selected_capabilities: List[str],
+        generation_mode: str
     ) -> CaseReviewResponse:
         import time
         start_time = time.time()
+        if generation_mode == "pipelined":
+            response = await self._generate_case_review_pipelined(case_description, selected_capabilities)
+            self.metrics.observe("generate_review_seconds", time.time() - start_time, mode="pipelined")
+            return response
+        if generation_mode == "structured":
+            response = await self._generate_case_review_structured(case_description, selected_capabilities)
+            if response is not None:
+                self.metrics.observe("generate_review_seconds", time.time() - start_time, mode="structured")
+                return response
+            # Otherwise the plain-text format below
         try:
             print("🔵 Step 1: Formatting capabilities...")
             step_start = time.time()
@@ -63,23 +758,7 @@ class PortfolioService:
             
             print("🔵 Step 2: Building messages...")
             step_start = time.time()
-            messages = [
-                {
-                    "role": "system",
-                    "content": self.settings.SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": f"""Input Data:
-{case_description}
-
-Task:
-Please convert the notes above into a formal RCGP Clinical Case Review.
-
-Selected Capabilities:
-{formatted_capabilities}"""
-                }
-            ]
+            messages = self._build_case_review_messages(case_description, selected_capabilities, formatted_capabilities)
             print(f"   ⏱️  Step 2 took {time.time() - step_start:.2f}s")
             
             print(f"🔵 Step 3: Calling LLM...")
@@ -88,13 +767,19 @@ Selected Capabilities:
             print(f"   API Version: {self.settings.azure_openai_api_version}")
             print(f"   Max Tokens: {self.settings.max_tokens}")
             print(f"   Temperature: {self.settings.temperature}")
+            print(f"   Title Strategy: {self.title_strategy.name}")
             step_start = time.time()
-            completion = await self.openai_client.chat.completions.create(
-                model=self.settings.azure_openai_deployment,
-                messages=messages,
-                max_tokens=self.settings.max_tokens,
-                temperature=self.settings.temperature
-            )
+            pending_title = self.title_strategy.start(case_description)
+            try:
+                completion = await self._create_completion(
+                    "generate_review",
+                    messages,
+                    max_tokens=self.settings.max_tokens,
+                    temperature=self.settings.temperature
+                )
+            except BaseException:
+                pending_title.cancel()
+                raise
             llm_time = time.time() - step_start
             print(f"   ⏱️  Step 3 (LLM call) took {llm_time:.2f}s")
             
@@ -117,10 +802,10 @@ Selected Capabilities:
             print(f"🔵 Step 5b: Brief description length: {len(sections.get('brief_description', ''))} chars")
             print(f"   ⏱️  Step 5 took {time.time() - step_start:.2f}s")
             
-            print("🔵 Step 6: Generating title...")
+            print("🔵 Step 6: Resolving title...")
             step_start = time.time()
-            case_title = await generate_title(sections["brief_description"], self.openai_client, self.settings)
-            print(f"🔵 Step 6a: Title generated: '{case_title}'")
+            case_title = await pending_title.resolve(review_content, sections)
+            print(f"🔵 Step 6a: Title resolved: '{case_title}'")
             print(f"   ⏱️  Step 6 took {time.time() - step_start:.2f}s")
 
             print("🔵 Step 7: Creating response object...")
@@ -128,7 +813,8 @@ Selected Capabilities:
             response = CaseReviewResponse(
                 case_title=case_title,
                 review_content=review_content,
-                sections=CaseReviewSection(**sections)
+                sections=CaseReviewSection(**sections),
+                generation_mode="single"
             )
             self._record_portfolio_output(
                 operation="generate_review",
@@ -142,6 +828,7 @@ Selected Capabilities:
             print(f"   ⏱️  Step 7 took {time.time() - step_start:.2f}s")
             
             total_time = time.time() - start_time
+            self.metrics.observe("generate_review_seconds", total_time, mode="single")
             print("✅ Step 8: Response created successfully!")
             print(f"⏱️  TOTAL TIME: {total_time:.2f}s ({total_time/60:.2f} minutes)")
             
@@ -153,6 +840,455 @@ Selected Capabilities:
             print(f"❌ Traceback: {traceback.format_exc()}")
             raise Exception(f"Error generating case review: {str(e)}")
 
+    def _build_structured_review_messages(
+        self,
+        case_description: str,
+        selected_capabilities: List[str]
+    ) -> List[Dict[str, str]]:
+        # Same prefix as the text format; only the closing instruction differs
+        messages = self._build_case_review_messages(
+            case_description, selected_capabilities, format_capabilities(selected_capabilities)
+        )
+        messages[-1]["content"] += f"\n\n{STRUCTURED_OUTPUT_INSTRUCTIONS}"
+        return messages
+
+    def _structured_output_available(self) -> bool:
+        # Routed calls need a provider that enforces the schema; Anthropic would ignore it
+        return self.structured_output_supported and (self.router is None or self.router.supports_response_format)
+
+    def _structured_output_rejected(self, error: openai.BadRequestError) -> bool:
+        message = str(error).lower()
+        if "response_format" not in message and "json_schema" not in message:
+            return False
+        logger.warning("Deployment rejected structured outputs, using the text format: %s", error)
+        self.structured_output_supported = False
+        self.metrics.increment("structured_output", outcome="unsupported")
+        return True
+
+    async def _generate_case_review_structured(
+        self,
+        case_description: str,
+        selected_capabilities: List[str]
+    ) -> Optional[CaseReviewResponse]:
+        """Generate the review as JSON matching the review schema and render review_content locally.
+
+        Returns None when the deployment does not support structured outputs or the
+        completion does not validate, so the caller can use the text format instead.
+        """
+        if not self._structured_output_available():
+            return None
+        try:
+            print("🔵 Calling LLM for structured case review...")
+            try:
+                completion = await self._create_completion(
+                    "generate_review",
+                    self._build_structured_review_messages(case_description, selected_capabilities),
+                    max_tokens=self.settings.max_tokens,
+                    temperature=self.settings.temperature,
+                    response_format=review_response_format(selected_capabilities)
+                )
+            except openai.BadRequestError as e:
+                if self._structured_output_rejected(e):
+                    return None
+                raise
+            except CircuitOpenError as e:
+                # Every provider that enforces the schema is down; the text format can use the rest
+                logger.warning("Structured output unavailable, using the text format: %s", e)
+                self.metrics.increment("structured_output", outcome="unavailable")
+                return None
+
+            choice = completion.choices[0]
+            try:
+                if choice.finish_reason == "length":
+                    raise StructuredOutputError("Review was cut off at max_tokens")
+                case_title, sections = parse_structured_review(choice.message.content or "", selected_capabilities)
+            except StructuredOutputError as e:
+                logger.warning("Structured review unusable, generating in the text format: %s", e)
+                self.metrics.increment("structured_output", outcome="invalid")
+                return None
+            self.metrics.increment("structured_output", outcome="valid")
+
+            if not case_title:
+                case_title = await self.title_strategy.fallback(sections)
+            review_content = render_review_content(case_title, sections)
+            response = CaseReviewResponse(
+                case_title=case_title,
+                review_content=review_content,
+                sections=CaseReviewSection(**sections),
+                generation_mode="structured"
+            )
+            self._record_portfolio_output(
+                operation="generate_review",
+                request_payload={
+                    "case_description": case_description,
+                    "selected_capabilities": selected_capabilities,
+                    "generation_mode": "structured",
+                },
+                output_text=review_content,
+                output_payload=response,
+            )
+            return response
+
+        except Exception as e:
+            raise Exception(f"Error generating case review: {str(e)}")
+
+    async def _generate_case_review_pipelined(
+        self,
+        case_description: str,
+        selected_capabilities: List[str]
+    ) -> CaseReviewResponse:
+        """Write the brief description first, then every other section concurrently.
+
+        Wall-clock time is the brief description plus the slowest remaining section,
+        instead of the sum of all sections.
+        """
+        try:
+            pending_title = self.title_strategy.start(case_description)
+            try:
+                print("🔵 Pipeline stage 1: title and brief description...")
+                opening = await self._generate_review_part(
+                    case_description,
+                    selected_capabilities,
+                    "Write ONLY the Title and Brief description sections, using those exact headers.",
+                )
+                brief_description = self._part_body(opening, "brief_description")
+
+                print(f"🔵 Pipeline stage 2: {len(selected_capabilities)} capabilities, reflection and learning needs...")
+                context = f"""The brief description has already been written:
+{brief_description}
+
+"""
+                calls = [
+                    pending_title.resolve(opening, {"brief_description": brief_description}),
+                    self._generate_review_part(
+                        case_description,
+                        selected_capabilities,
+                        context + "Write ONLY the Reflection and Learning needs identified from this event sections, using those exact headers.",
+                    ),
+                ] + [
+                    self._generate_review_part(
+                        case_description,
+                        [capability],
+                        context + f"Write ONLY the section for \"Capability: {capability}\" with its Justification, using that exact header.",
+                    )
+                    for capability in selected_capabilities
+                ]
+                tasks = [asyncio.ensure_future(call) for call in calls]
+                try:
+                    case_title, closing, *capability_parts = await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    raise
+            except BaseException:
+                pending_title.cancel()
+                raise
+
+            review_content = render_review_content(case_title, {
+                "brief_description": brief_description,
+                "capabilities": {
+                    capability: self._part_body(part, "capability")
+                    for capability, part in zip(selected_capabilities, capability_parts)
+                },
+                "reflection": self._part_body(closing, "reflection"),
+                "learning_needs": self._part_body(closing, "learning_needs"),
+            })
+            sections = extract_sections(review_content, selected_capabilities)
+            response = CaseReviewResponse(
+                case_title=case_title,
+                review_content=review_content,
+                sections=CaseReviewSection(**sections),
+                generation_mode="pipelined"
+            )
+            self._record_portfolio_output(
+                operation="generate_review",
+                request_payload={
+                    "case_description": case_description,
+                    "selected_capabilities": selected_capabilities,
+                    "generation_mode": "pipelined",
+                },
+                output_text=review_content,
+                output_payload=response,
+            )
+            return response
+
+        except Exception as e:
+            raise Exception(f"Error generating case review: {str(e)}")
+
+    async def _generate_review_part(
+        self,
+        case_description: str,
+        capabilities: List[str],
+        instruction: str
+    ) -> str:
+        messages = self._build_case_review_messages(case_description, capabilities, format_capabilities(capabilities))
+        messages[-1]["content"] += f"\n\n{instruction}"
+        completion = await self._create_completion(
+            "generate_review",
+            messages,
+            max_tokens=self.settings.max_tokens,
+            temperature=self.settings.temperature
+        )
+        return completion.choices[0].message.content.replace('*', '').replace('#', '')
+
+    @staticmethod
+    def _part_body(text: str, section: str) -> str:
+        """Body of one section in a partial generation (the whole text if its header is missing)."""
+        for span in locate_sections(text):
+            if span.section == section:
+                return text[span.body_start:span.end]
+        return text.strip()
+
+    async def stream_case_review(
+        self,
+        case_description: str,
+        selected_capabilities: List[str],
+        generation_mode: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a case review as it is generated.
+
+        Yields "token" events for every content delta, "section" events as soon as
+        each section is complete, and a final "complete" event carrying the full
+        CaseReviewResponse. generation_mode "structured" streams a JSON-schema
+        completion; any other mode streams the text format.
+        """
+        generation_mode = generation_mode or self.settings.generation_mode
+        try:
+            if generation_mode == "structured" and self._structured_output_available():
+                async for event in self._stream_case_review_structured(case_description, selected_capabilities):
+                    yield event
+                return
+
+            formatted_capabilities = format_capabilities(selected_capabilities)
+            messages = self._build_case_review_messages(case_description, selected_capabilities, formatted_capabilities)
+
+            print(f"🔵 Streaming LLM call for case review...")
+            print(f"   Model/Deployment: {self.settings.azure_openai_deployment}")
+            pending_title = self.title_strategy.start(case_description)
+            stream = None
+            try:
+                stream = await self._create_completion(
+                    "generate_review",
+                    messages,
+                    max_tokens=self.settings.max_tokens,
+                    temperature=self.settings.temperature,
+                    stream=True
+                )
+
+                parser = IncrementalSectionParser()
+                content_parts = []
+                async for chunk in stream:
+                    # Azure sends content-filter chunks without choices
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    # Same clean-up as the non-streaming path; safe per chunk as both are single characters
+                    delta = delta.replace('*', '').replace('#', '')
+                    content_parts.append(delta)
+                    yield {"event": "token", "data": {"text": delta}}
+                    for section_event in parser.feed(delta):
+                        yield {"event": "section", "data": section_event}
+            except BaseException:
+                pending_title.cancel()
+                if stream is not None:
+                    # Release the upstream connection and scheduler slot right away
+                    await stream.aclose()
+                raise
+
+            for section_event in parser.finish():
+                yield {"event": "section", "data": section_event}
+
+            review_content = "".join(content_parts)
+            sections = parser.sections
+            case_title = await pending_title.resolve(review_content, sections)
+
+            response = CaseReviewResponse(
+                case_title=case_title,
+                review_content=review_content,
+                sections=CaseReviewSection(**sections)
+            )
+            self._record_portfolio_output(
+                operation="generate_review",
+                request_payload={
+                    "case_description": case_description,
+                    "selected_capabilities": selected_capabilities,
+                    "stream": True,
+                },
+                output_text=review_content,
+                output_payload=response,
+            )
+            yield {"event": "complete", "data": response.model_dump()}
+
+        except Exception as e:
+            raise Exception(f"Error streaming case review: {str(e)}")
+
+    async def _stream_case_review_structured(
+        self,
+        case_description: str,
+        selected_capabilities: List[str]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """stream_case_review for generation_mode="structured": JSON is decoded as it arrives
+        and re-emitted as the same token and section events as the text format."""
+        print(f"🔵 Streaming structured LLM call for case review...")
+        parser = StructuredReviewStreamParser(selected_capabilities)
+        stream = None
+        try:
+            stream = await self._create_completion(
+                "generate_review",
+                self._build_structured_review_messages(case_description, selected_capabilities),
+                max_tokens=self.settings.max_tokens,
+                temperature=self.settings.temperature,
+                stream=True,
+                response_format=review_response_format(selected_capabilities)
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                text, section_events = parser.feed(delta)
+                if text:
+                    yield {"event": "token", "data": {"text": text}}
+                for section_event in section_events:
+                    yield {"event": "section", "data": section_event}
+        except (openai.BadRequestError, CircuitOpenError) as e:
+            # Rejected before anything was streamed: start over in the text format
+            if parser.content:
+                raise
+            if isinstance(e, CircuitOpenError):
+                logger.warning("Structured output unavailable, using the text format: %s", e)
+                self.metrics.increment("structured_output", outcome="unavailable")
+            elif not self._structured_output_rejected(e):
+                raise
+            async for event in self.stream_case_review(case_description, selected_capabilities, "single"):
+                yield event
+            return
+        except BaseException:
+            if stream is not None:
+                await stream.aclose()
+            raise
+
+        try:
+            case_title, sections = parser.finish()
+            review_content = render_review_content(case_title, sections) if case_title else None
+            self.metrics.increment("structured_output", outcome="valid")
+        except StructuredOutputError as e:
+            # The tokens are already out, so keep what arrived rather than generating again
+            logger.warning("Streamed structured review unusable, parsing what arrived: %s", e)
+            self.metrics.increment("structured_output", outcome="invalid")
+            if parser.malformed:
+                # Not JSON at all: the model wrote the text format
+                review_content = parser.content.replace('*', '').replace('#', '')
+                sections = extract_sections(review_content, selected_capabilities)
+                case_title = extract_title(review_content)
+            else:
+                case_title, sections, review_content = None, parser.partial_sections(), None
+        if not case_title:
+            case_title = await self.title_strategy.fallback(sections)
+        review_content = review_content or render_review_content(case_title, sections)
+
+        response = CaseReviewResponse(
+            case_title=case_title,
+            review_content=review_content,
+            sections=CaseReviewSection(**sections),
+            generation_mode="structured"
+        )
+        self._record_portfolio_output(
+            operation="generate_review",
+            request_payload={
+                "case_description": case_description,
+                "selected_capabilities": selected_capabilities,
+                "stream": True,
+                "generation_mode": "structured",
+            },
+            output_text=review_content,
+            output_payload=response,
+        )
+        yield {"event": "complete", "data": response.model_dump()}
+
+    async def run_case_intake(
+        self,
+        case_description: str,
+        selected_capabilities: Optional[List[str]] = None,
+        generation_mode: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Select capabilities and experience groups, then generate the review, in one pass.
+
+        Both selections start at once and generation starts as soon as the
+        capabilities are known, so it overlaps the experience group lookup.
+        Yields "capabilities", "experience_groups" and "review" events in the order
+        they finish, then a "complete" event carrying the CaseIntakeResponse.
+        """
+        import time
+        start_time = time.time()
+        events: asyncio.Queue = asyncio.Queue()
+        results: Dict[str, Any] = {}
+
+        async def publish(name: str, result):
+            results[name] = result
+            elapsed = round(time.time() - start_time, 3)
+            self.metrics.observe("case_intake_stage_seconds", elapsed, stage=name)
+            await events.put({"event": name, "data": {**result.model_dump(), "elapsed_seconds": elapsed}})
+            return result
+
+        async def capabilities_then_review():
+            if selected_capabilities:
+                selection = CapabilitySelectionResponse(
+                    selected_capabilities=selected_capabilities,
+                    selection_path="provided",
+                )
+            else:
+                selection = await self.select_capabilities(case_description)
+            await publish("capabilities", selection)
+            await publish("review", await self.generate_case_review(
+                case_description,
+                selection.selected_capabilities,
+                generation_mode=generation_mode
+            ))
+
+        async def experience_groups():
+            await publish("experience_groups", await self.classify_experience_groups(case_description))
+
+        async def run(stages):
+            try:
+                await stages()
+            except Exception as e:
+                await events.put(e)
+
+        print("🔵 Case intake: selecting capabilities and experience groups concurrently...")
+        tasks = [
+            asyncio.ensure_future(run(capabilities_then_review)),
+            asyncio.ensure_future(run(experience_groups)),
+        ]
+        try:
+            for _ in range(3):
+                event = await events.get()
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        except Exception as e:
+            raise Exception(f"Error running case intake: {str(e)}")
+        finally:
+            # Stop the other stage when one fails or the client goes away
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        total_time = time.time() - start_time
+        self.metrics.observe("case_intake_seconds", total_time)
+        print(f"✅ Case intake finished in {total_time:.2f}s")
+        response = CaseIntakeResponse(
+            selected_capabilities=results["capabilities"].selected_capabilities,
+            capability_selection_path=results["capabilities"].selection_path,
+            experience_groups=results["experience_groups"].experience_groups,
+            experience_group_selection_path=results["experience_groups"].selection_path,
+            review=results["review"],
+        )
+        yield {"event": "complete", "data": response.model_dump()}
+
     # async def improve_case_review(
     #     self,
     #     original_case: str,
@@ -203,110 +1339,175 @@ Selected Capabilities:
     #     except Exception as e:
     #         raise Exception(f"Error improving case review: {str(e)}")
 
-    async def improve_case_review(
+    async def _improve_full_review(
         self,
         original_case: str,
         improvement_prompt: str,
         selected_capabilities: List[str]
-    ) -> CaseReviewResponse:
-        try:
-            formatted_capabilities = format_capabilities(selected_capabilities)
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are an AI assistant helping to improve GP portfolio entries.
-                    Your task is to enhance specific aspects of case reviews while maintaining the overall structure and other content.
-                    
-                    Guidelines:
-                    1. Only modify content specifically related to the requested improvement
-                    2. Maintain the same level of professionalism and medical accuracy
-                    3. Keep the same structure and sections
-                    4. Ensure improvements are specific and evidence-based
-                    5. Preserve any existing good content not related to the improvement request
-                    6. For demographic corrections, ensure all pronouns and references are updated consistently throughout"""
-                },
-                {
-                    "role": "user",
-                    "content": self.settings.IMPROVEMENT_EXAMPLE_1
-                },
-                {
-                    "role": "user",
-                    "content": self.settings.IMPROVEMENT_REQUEST_1
-                },
-                {
-                    "role": "assistant",
-                    "content": self.settings.IMPROVEMENT_RESPONSE_1
-                },
-                {
-                    "role": "user",
-                    "content": self.settings.IMPROVEMENT_EXAMPLE_2
-                },
-                {
-                    "role": "user",
-                    "content": self.settings.IMPROVEMENT_REQUEST_2
-                },
-                {
-                    "role": "assistant",
-                    "content": self.settings.IMPROVEMENT_RESPONSE_2
-                },
-                {
-                    "role": "user",
-                    "content": f"""
+    ) -> str:
+        """Regenerate the whole review with the few-shot improvement prompt."""
+        formatted_capabilities = format_capabilities(selected_capabilities)
 
-                    You are an AI assistant helping to improve GP portfolio entries.
-                    Your task is to enhance specific aspects of case reviews while maintaining the overall structure and other content.
-                    
-                    Guidelines:
-                    1. Only modify content specifically related to the requested improvement
-                    2. Maintain the same level of professionalism and medical accuracy
-                    3. Keep the same structure and sections (always include the same sections and ensure they are all populated)
-                    4. Ensure improvements are specific and evidence-based
-                    5. Preserve any existing good content not related to the improvement request
-                    6. For demographic corrections, ensure all pronouns and references are updated consistently throughout
-                    
-                    IMPORTANT: 
-                    1. Only modify sections specifically related to the requested improvement, other sections should be kept exactly the same
-                    2. Keep all other content exactly the same
-                    3. Maintain the same structure and section headings
-                    4. Ensure the improvements are specific and detailed
-                    5. Write in British English not American
-                    
-                    Current case review:
-                    {original_case}
-                    
-                    Requested improvement:
-                    {improvement_prompt}
-                    
-                    Selected capabilities to focus on:
-                    {formatted_capabilities}
-                    """
-                }
-            ]
+        messages = [
+            {
+                "role": "system",
+                "content": IMPROVE_REVIEW_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": self.settings.IMPROVEMENT_EXAMPLE_1
+            },
+            {
+                "role": "user",
+                "content": self.settings.IMPROVEMENT_REQUEST_1
+            },
+            {
+                "role": "assistant",
+                "content": self.settings.IMPROVEMENT_RESPONSE_1
+            },
+            {
+                "role": "user",
+                "content": self.settings.IMPROVEMENT_EXAMPLE_2
+            },
+            {
+                "role": "user",
+                "content": self.settings.IMPROVEMENT_REQUEST_2
+            },
+            {
+                "role": "assistant",
+                "content": self.settings.IMPROVEMENT_RESPONSE_2
+            },
+            {
+                "role": "user",
+                "content": f"""Current case review:
+{original_case}
 
-            print(f"🔵 Calling LLM for improvement...")
-            print(f"   Model/Deployment: {self.settings.azure_openai_deployment}")
-            print(f"   Max Tokens: {self.settings.max_tokens}")
-            print(f"   Temperature: {self.settings.temperature}")
-            response = await self.openai_client.chat.completions.create(
-                model=self.settings.azure_openai_deployment,
-                messages=messages,
-                max_tokens=self.settings.max_tokens,
-                temperature=self.settings.temperature
-            )
+Requested improvement:
+{improvement_prompt}
+
+Selected capabilities to focus on:
+{formatted_capabilities}"""
+            }
+        ]
 
-            improved_content = response.choices[0].message.content
-            improved_content = improved_content.replace('*', '').replace('#', '')
+        print(f"🔵 Calling LLM for improvement...")
+        print(f"   Model/Deployment: {self.settings.azure_openai_deployment}")
+        print(f"   Max Tokens: {self.settings.max_tokens}")
+        print(f"   Temperature: {self.settings.temperature}")
+        improved_content = await self._edit_completion(
+            "improve_review",
+            messages,
+            original=original_case,
+            max_tokens=self.settings.max_tokens,
+            temperature=self.settings.temperature
+        )
+        return improved_content.replace('*', '').replace('#', '')
+
+    async def _improve_targeted_sections(
+        self,
+        original_case: str,
+        improvement_prompt: str,
+        selected_capabilities: List[str]
+    ) -> Optional[str]:
+        """Regenerate only the sections the request touches and splice them into the original.
+
+        Returns None when the request cannot be narrowed down, or names a section the
+        original does not have, so the caller falls back to a full rewrite.
+        """
+        spans = locate_sections(original_case)
+        capability_names = [span.capability for span in spans if span.section == "capability"]
+        plan = plan_improvement(improvement_prompt, capability_names + list(selected_capabilities))
+        if plan.full_rewrite:
+            self.metrics.increment("improve_review_plan", mode="full")
+            return None
+
+        by_target = {(span.section, span.capability.lower() if span.capability else None): span for span in spans}
+        chosen = []
+        for section, capability in plan.targets:
+            span = by_target.get((section, capability.lower() if capability else None))
+            if span is None:
+                self.metrics.increment("improve_review_plan", mode="full")
+                return None
+            if span not in chosen:
+                chosen.append(span)
+
+        print(f"🔵 Improving {len(chosen)} section(s): {[span.capability or span.section for span in chosen]}")
+        bodies = await asyncio.gather(*(
+            self._improve_review_section(span, original_case, improvement_prompt)
+            for span in chosen
+        ))
+        self.metrics.increment("improve_review_plan", mode="targeted")
+        self.metrics.increment("improve_review_sections_regenerated", len(chosen))
+        return splice_sections(original_case, list(zip(chosen, bodies)))
+
+    async def _improve_review_section(self, span: SectionSpan, original_case: str, improvement_prompt: str) -> str:
+        heading = f"Capability: {span.capability}" if span.section == "capability" else SECTION_HEADINGS[span.section]
+        messages = [
+            {
+                "role": "system",
+                "content": IMPROVE_REVIEW_SECTION_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"""Current case review (for context only):
+{original_case}
+
+Section to improve: {heading}
+
+Current section content:
+{original_case[span.body_start:span.end]}
+
+Requested improvement:
+{improvement_prompt}"""
+            }
+        ]
+        body = await self._edit_completion(
+            "improve_review",
+            messages,
+            original=original_case[span.body_start:span.end],
+            max_tokens=self.settings.max_tokens,
+            temperature=self.settings.temperature
+        )
+        body = body.replace('*', '').replace('#', '').strip()
+        # Drop an echoed heading ("Reflection: ...")
+        if body.lower().startswith(heading.lower()):
+            body = body[len(heading):].lstrip(' :\n')
+        if span.section == "capability":
+            # Later paragraphs of a capability are not parsed, so keep the justification in one part
+            body = re.sub(r'\n\s*\n', '\n', body)
+        return body
+
+    async def improve_case_review(
+        self,
+        original_case: str,
+        improvement_prompt: str,
+        selected_capabilities: List[str],
+        case_title: Optional[str] = None
+    ) -> CaseReviewResponse:
+        try:
+            improved_content = None
+            if self.settings.improve_review_strategy == "targeted":
+                improved_content = await self._improve_targeted_sections(
+                    original_case, improvement_prompt, selected_capabilities
+                )
+            if improved_content is None:
+                improved_content = await self._improve_full_review(
+                    original_case, improvement_prompt, selected_capabilities
+                )
 
             sections = extract_sections(improved_content, selected_capabilities)
             
-            if "brief_description" in improvement_prompt.lower():
-                case_title = await generate_title(sections["brief_description"], self.openai_client, self.settings)
-            else:
-                case_title = await generate_title(original_case.split("\n")[0], self.openai_client, self.settings)
+            # Only pay for a new title when the brief description actually changed
+            improved_title = await resolve_improved_title(
+                generate_title=self.generate_title,
+                previous_title=case_title,
+                original_case=original_case,
+                original_sections=extract_sections(original_case, selected_capabilities),
+                improved_sections=sections,
+            )
 
             response_payload = CaseReviewResponse(
-                case_title=case_title,
+                case_title=improved_title,
                 review_content=improved_content,
                 sections=CaseReviewSection(**sections)
             )
@@ -316,6 +1517,7 @@ Selected Capabilities:
                     "original_case": original_case,
                     "improvement_prompt": improvement_prompt,
                     "selected_capabilities": selected_capabilities,
+                    "case_title": case_title,
                 },
                 output_text=improved_content,
                 output_payload=response_payload,
@@ -330,7 +1532,7 @@ Selected Capabilities:
     async def get_capabilities(self) -> Dict[str, List[str]]:
         """Return parsed capabilities dictionary."""
         try:
-            capabilities = parse_capabilities(capability_content)
+            capabilities = self.capabilities
             if not capabilities:
                 raise Exception("No capabilities were parsed")
             # Return directly without wrapping in another dict
@@ -346,46 +1548,27 @@ Selected Capabilities:
         capability_name: Optional[str] = None
     ) -> str:
         try:
-            # Build the system prompt based on section type
-            system_prompt = """You are an AI assistant helping to improve specific sections of GP portfolio entries.
-            Focus only on improving the requested section while maintaining professional medical language and specific, actionable content."""
-            
-            # Add section-specific guidance
-            if section_type == "brief_description":
-                system_prompt += "\nFor brief descriptions: Focus on clarity, structure, and key clinical details."
-            elif section_type == "capability":
-                system_prompt += "\nFor capabilities: Ensure clear links between actions and the specific capability."
-            elif section_type == "reflection":
-                system_prompt += "\nFor reflections: Include both clinical and emotional aspects, what went well, and areas for improvement."
-            elif section_type == "learning_needs":
-                system_prompt += "\nFor learning needs: Be specific about knowledge gaps and actionable learning objectives."
-            
-            user_content = f"""
-            Section type: {section_type}"""
+            # Section-specific guidance goes last in the system message so the
+            # shared instructions before it stay identical across section types
+            system_prompt = IMPROVE_SECTION_SYSTEM_PROMPT
+            if section_type in IMPROVE_SECTION_GUIDANCE:
+                system_prompt += "\n\n" + IMPROVE_SECTION_GUIDANCE[section_type]
 
+            user_content = f"Section type: {section_type}\n"
             if section_type == "capability" and capability_name:
                 capability_description = globals().get(capability_name.replace(" ", "_"), "")
-                user_content += f"""
-                Capability: {capability_name}
-                
-                Capability Description:
-                {capability_description}"""
+                user_content += f"""Capability: {capability_name}
+
+Capability Description:
+{capability_description}
+"""
 
             user_content += f"""
-            The user is asking for an improvement to the following section of a GP portfolio entry:
+Current section content:
+{section_content}
 
-            Current section content:
-            {section_content}
-            
-            Improvement request:
-            {improvement_prompt}
-            
-            Please provide an improved version of this section only, the improved section should be in the same format as the current content but only with the improvements requested.
-            Maintain professional medical language and be specific. 
-            Only return the improved section, do not include any other text.
-            Write in British English not American.
-            Make sure the output sounds natural and doesn't directly refer to the improvement request.
-            """
+Improvement request:
+{improvement_prompt}"""
 
             messages = [
                 {
@@ -401,14 +1584,13 @@ Selected Capabilities:
             print(f"🔵 Calling LLM for section improvement...")
             print(f"   Model/Deployment: {self.settings.azure_openai_deployment}")
             print(f"   Section Type: {section_type}")
-            completion = await self.openai_client.chat.completions.create(
-                model=self.settings.azure_openai_deployment,
-                messages=messages,
+            improved_content = await self._edit_completion(
+                "improve_section",
+                messages,
+                original=section_content,
                 max_tokens=self.settings.max_tokens,
                 temperature=self.settings.temperature
             )
-            
-            improved_content = completion.choices[0].message.content
             improved_content = improved_content.strip()
             self._record_portfolio_output(
                 operation="improve_section",
@@ -429,43 +1611,58 @@ Selected Capabilities:
         """
         Use LLM to intelligently select 2-3 most relevant capabilities for a case.
         """
-        try:
-            system_prompt = """You are an expert RCGP (Royal College of General Practitioners) assessor. 
-Your task is to analyze a clinical case description and select the 2-3 most relevant capabilities 
-from the RCGP curriculum that are clearly demonstrated in the case.
+        selection = await self.select_capabilities(case_description)
+        return selection.selected_capabilities
 
-Guidelines:
-1. Select only capabilities with clear evidence in the case description
-2. Choose 2-3 capabilities (not more, not less than 2)
-3. Prioritize capabilities that are most prominently demonstrated
-4. Return ONLY the capability names, one per line, exactly as listed
-5. Do not add explanations or numbering"""
+    async def select_capabilities(self, case_description: str) -> CapabilitySelectionResponse:
+        """
+        Select 2-3 capabilities with the LLM, choosing from the ranker's shortlist when
+        it is enabled (or answering locally when it is confident and allowed to).
+        """
+        try:
+            available_content = capability_content
+            selection_path = "llm_full"
+            if self.capability_ranker is not None:
+                ranking = self.capability_ranker.rank(case_description)
+                if ranking.confident and self.settings.capability_ranker_answer_locally:
+                    print(f"✅ Capabilities selected locally: {ranking.selected}")
+                    self.metrics.increment("capability_selection", path="local")
+                    self.metrics.increment("llm_calls_avoided", operation="select_capabilities")
+                    return CapabilitySelectionResponse(
+                        selected_capabilities=ranking.selected,
+                        selection_path="local",
+                    )
+                shortlist = ranking.top(self.settings.capability_ranker_shortlist_size)
+                available_content = "\n" + "".join(
+                    f"{name}\n" + "".join(f"- {point}\n" for point in self.capabilities[name]) + "\n"
+                    for name in shortlist
+                )
+                selection_path = "llm_shortlist"
 
+            # The capability list (the full catalogue unless the ranker shortlisted) comes
+            # before the case so calls with the full catalogue share their prefix
             user_prompt = f"""Available RCGP Capabilities:
 
-{capability_content}
+{available_content}
 
 ---
 
 Case Description:
 {case_description}
 
----
-
-Based on the case description above, select the 2-3 most relevant capabilities that are clearly demonstrated. 
-Return only the capability names, one per line, exactly as they appear in the list above."""
+{SELECT_CAPABILITIES_INSTRUCTION}"""
 
             messages = [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": SELECT_CAPABILITIES_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ]
 
             print(f"🔵 Calling LLM for capability selection...")
             print(f"   Model/Deployment: {self.settings.azure_openai_deployment}")
             print(f"   Max Tokens: 200, Temperature: 0.3")
-            completion = await self.openai_client.chat.completions.create(
-                model=self.settings.azure_openai_deployment,
-                messages=messages,
+            completion = await self._create_completion(
+                "select_capabilities",
+                messages,
                 max_tokens=200,
                 temperature=0.3  # Lower temperature for more consistent selection
             )
@@ -488,7 +1685,11 @@ Return only the capability names, one per line, exactly as they appear in the li
             # Limit to 2-3 capabilities
             selected_capabilities = selected_capabilities[:3]
             
-            return selected_capabilities
+            self.metrics.increment("capability_selection", path=selection_path)
+            return CapabilitySelectionResponse(
+                selected_capabilities=selected_capabilities,
+                selection_path=selection_path,
+            )
 
         except Exception as e:
             raise Exception(f"Error selecting capabilities: {str(e)}")
@@ -498,91 +1699,27 @@ Return only the capability names, one per line, exactly as they appear in the li
         Use LLM to select 1-2 Clinical Experience Groups based on the case context.
         Uses the exact prompt from exp_group.prompty.
         """
-        try:
-            system_prompt = """
-            You are an expert Medical Educational Assistant for the 'fourteenfishermen' GP portfolio tool. Your task is to analyze a Clinical Case Log written by a General Practitioner trainee and categorize it into the correct *Clinical Experience Group(s)*.
-
-*CORE INSTRUCTIONS:*
-1.  *Analyze Context over Diagnosis:* Do not classify based solely on the medical condition. You must look at the context (patient age, social setting, vulnerability, urgency, and the specific focus of the trainee's reflection).
-2.  *Select 1-2 Groups:* Ideally, select *two* groups if the case touches on multiple aspects (e.g., a child with a mental health issue). If only one fits, select one.
-3.  *Strict Fallback:* Only use "Clinical problems not linked to a specific clinical experience group" if *absolutely none* of the specific groups apply. This should be infrequent.
-
-*DEFINITIONS OF CLINICAL EXPERIENCE GROUPS:*
-1.  *Infants, children and young people (under 19):* Patients <19 years (includes students, parents of young children).
-2.  *Gender, reproductive and sexual health:* Women’s/men’s health, LGBTQ+, gynaecology, breast, sexual health/BBV.
-3.  *People with long-term conditions:* Cancer, multi-morbidity, disability, chronic illness (diabetes, asthma, etc.).
-4.  *Older adults:* Frailty, end-of-life, complex care in >65s.
-5.  *Mental health:* Addiction, alcohol, substance misuse, anxiety, depression, health anxiety.
-6.  *Urgent and unscheduled care:* Acute/septic presentations, A&E, OOH hubs, same-day triage.
-7.  *People with health disadvantage and vulnerabilities:* Veterans, asylum seekers, learning disabilities, safeguarding, capacity issues, sensory impairment (deaf/blind).
-8.  *Population Health and health promotion:* Prevention, lifestyle advice, self-management, screening.
-9.  *Clinical problems not linked to a specific clinical experience group:* Fallback only.
-
-CRITICAL AGE CONSTRAINT: The age limit of "under 19" is absolute. Any patient aged 19 years or older is STRICTLY excluded from the "Infants, children and young people" group.
-
-*EXTENSIVE REASONING EXAMPLES (Use these to guide your logic):*
-
-*Scenario: Patient with Vertigo*
-•⁠  ⁠If context is: History of breast cancer raising suspicion of brain metastasis.
-    * -> *People with long term conditions including cancer, multi-morbidity and disability*
-•⁠  ⁠If context is: Acute onset, unwell, seen in urgent care setting.
-    * -> *Urgent and unscheduled care*
-•⁠  ⁠If context is: Elderly/frail patient with capacity difficulties explaining symptoms.
-    * -> *Older adults including frailty* AND *People with health disadvantage and vulnerabilities*
-•⁠  ⁠If context is: Empowering patient to self-manage symptoms/driving advice.
-    * -> *Population Health and health promotion*
-
-*Scenario: Patient with Diabetes*
-•⁠  ⁠If context is: Pregnant patient with recurrent thrush/complications.
-    * -> *People with long term conditions* AND *Gender, reproductive and sexual health*
-•⁠  ⁠If context is: Patient has a learning disability limiting medication compliance.
-    * -> *People with health disadvantage and vulnerabilities* AND *People with long term conditions*
-•⁠  ⁠If context is: Mental health prevents understanding of medication needs.
-    * -> *Mental health (including addiction...)* AND *People with long term conditions*
-•⁠  ⁠If context is: New diagnosis in a teenager.
-    * -> *Infants, children and young people* AND *People with long term conditions*
-
-*Scenario: Heroin Addict*
-•⁠  ⁠If context is: Septic admission seen in same-day access.
-    * -> *Urgent and unscheduled care* AND *Mental health (including addiction...)*
-•⁠  ⁠If context is: Safeguarding children of the patient.
-    * -> *Infants, children and young people* AND *People with health disadvantage and vulnerabilities*
-•⁠  ⁠If context is: Sexual implications/Blood-borne virus.
-    * -> *Mental health (including addiction...)* AND *Gender, reproductive and sexual health*
+        selection = await self.classify_experience_groups(case_description)
+        return selection.experience_groups
 
-*Scenario: Suspected Skin Cancer*
-•⁠  ⁠If context is: Melanoma on penis affecting men's health.
-    * -> *Gender, reproductive and sexual health* AND *People with long term conditions (cancer)*
-•⁠  ⁠If context is: Bedbound patient who previously had a stroke.
-    * -> *Older adults including frailty* AND *People with long term conditions*
-•⁠  ⁠If context is: Patient has significant health anxiety about the mole.
-    * -> *Mental health (including addiction...)*
-•⁠  ⁠If context is: Veteran/Naval officer with history of sun exposure abroad.
-    * -> *People with health disadvantage and vulnerabilities (veterans)*
-
-*Scenario: Rash (Lyme Disease Concern)*
-•⁠  ⁠If context is: Learning disability, attending with carer, capacity issues.
-    * -> *People with health disadvantage and vulnerabilities*
-•⁠  ⁠If context is: Health promotion on tick prevention.
-    * -> *Population Health and health promotion*
-
-*Scenario: Altered Bowel Habit / IBS*
-•⁠  ⁠If context is: Deaf patient relying on sign language/interpreter.
-    * -> *People with health disadvantage and vulnerabilities*
-•⁠  ⁠If context is: Young person (18yo) with family history.
-    * -> *Infants, children and young people*
-•⁠  ⁠If context is: Older woman, checking CA125 (ovarian cancer risk).
-    * -> *Gender, reproductive and sexual health* AND *Older adults including frailty*
+    async def classify_experience_groups(self, case_description: str) -> ExperienceGroupResponse:
+        """
+        Select 1-2 Clinical Experience Groups, answering from the local rules when they
+        are confident and falling back to the LLM for ambiguous logs.
+        """
+        try:
+            if self.experience_group_classifier is not None:
+                classification = self.experience_group_classifier.classify(case_description)
+                if classification.confident:
+                    print(f"✅ Experience groups selected locally: {classification.groups}")
+                    self.metrics.increment("experience_group_selection", path="local")
+                    self.metrics.increment("llm_calls_avoided", operation="select_experience_groups")
+                    return ExperienceGroupResponse(
+                        experience_groups=classification.groups,
+                        selection_path="local",
+                    )
 
-*Scenario: Persistent Cough*
-•⁠  ⁠If context is: Toddler at nursery with viral illnesses.
-    * -> *Infants, children and young people*
-•⁠  ⁠If context is: Veteran with previous asbestos exposure in Navy.
-    * -> *People with health disadvantage and vulnerabilities*
-•⁠  ⁠If context is: History of substance misuse leading to appointment.
-    * -> *Mental health (including addiction...)*
-            
-            """
+            system_prompt = EXPERIENCE_GROUPS_SYSTEM_PROMPT
 
             print("🟣 Step 1: Building experience groups prompt...")
             user_prompt = f"""Input Log:
@@ -599,9 +1736,9 @@ Identify the 1 or 2 most appropriate Clinical Experience Groups based on the spe
             print(f"🟣 Step 2: Calling LLM for experience groups...")
             print(f"   Model/Deployment: {self.settings.azure_openai_deployment}")
             print(f"   Max Tokens: 200, Temperature: 0.1")
-            completion = await self.openai_client.chat.completions.create(
-                model=self.settings.azure_openai_deployment,
-                messages=messages,
+            completion = await self._create_completion(
+                "select_experience_groups",
+                messages,
                 max_tokens=200,
                 temperature=0.1  # Low temperature for consistent classification
             )
@@ -610,19 +1747,6 @@ Identify the 1 or 2 most appropriate Clinical Experience Groups based on the spe
             response_content = completion.choices[0].message.content.strip()
             print(f"🟣 Step 4: Raw experience group response: {response_content}")
             
-            # Valid experience groups - using shortened names from prompty
-            valid_groups = [
-                "Infants, children and young people (under 19)",
-                "Gender, reproductive and sexual health",
-                "People with long-term conditions",
-                "Older adults",
-                "Mental health",
-                "Urgent and unscheduled care",
-                "People with health disadvantage and vulnerabilities",
-                "Population Health and health promotion",
-                "Clinical problems not linked to a specific clinical experience group"
-            ]
-            
             # Parse the response to extract group names
             selected_groups = []
             for line in response_content.split('\n'):
@@ -632,21 +1756,28 @@ Identify the 1 or 2 most appropriate Clinical Experience Groups based on the spe
                 line = line.rstrip('*')
                 
                 # Check if this line matches any valid group
-                for valid_group in valid_groups:
+                for valid_group in EXPERIENCE_GROUPS:
                     # Strict matching: The line must CONTAIN the full valid group name
                     if valid_group.lower() in line.lower():
                         if valid_group not in selected_groups:
                             selected_groups.append(valid_group)
                         break
             
+            # The under-19 limit is absolute, whatever the model says
+            ages = extract_ages(case_description)
+            selected_groups = apply_age_constraint(
+                selected_groups, patient_age(ages), involves_children(case_description, ages)
+            )
+
             # Limit to 2 groups
             selected_groups = selected_groups[:2]
             
             # Fallback if no groups found
             if not selected_groups:
-                selected_groups = ["Clinical problems not linked to a specific clinical experience group"]
+                selected_groups = [FALLBACK_GROUP]
             
-            return selected_groups
+            self.metrics.increment("experience_group_selection", path="llm")
+            return ExperienceGroupResponse(experience_groups=selected_groups, selection_path="llm")
 
         except Exception as e:
             raise Exception(f"Error selecting experience groups: {str(e)}")
@@ -0,0 +1,221 @@
+# app/services/rate_limiter.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Mapping, Optional
+
+from ..utils.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: interactive edits ahead of bulk generation
+OPERATION_PRIORITIES = {
+    "improve_section": 0,
+    "generate_title": 1,
+    "select_capabilities": 1,
+    "select_experience_groups": 1,
+    "improve_review": 2,
+    "generate_review": 3,
+}
+DEFAULT_PRIORITY = 2
+
+# Grow the concurrency limit by one after this many successful calls
+ADDITIVE_INCREASE_EVERY = 10
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to back off from retry-after-ms / retry-after, if present."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to a per-minute quota."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def observe_remaining(self, remaining: float) -> None:
+        """Trust the server's view when it is lower than ours (other workers share the quota)."""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class Ticket:
+    def __init__(self, operation: str, priority: int, cost: int):
+        self.operation = operation
+        self.priority = priority
+        self.cost = cost
+        self.granted: Optional[asyncio.Future] = None
+        self.enqueued_at = time.monotonic()
+
+
+class RateLimitScheduler:
+    """Admits LLM requests through token and request buckets in operation-priority order.
+
+    The buckets start from the configured TPM/RPM quota and are corrected from
+    Azure's x-ratelimit-remaining-* headers. The concurrency limit follows AIMD:
+    halved on a 429, grown by one after a run of successful calls.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        requests_per_minute: int,
+        max_concurrency: int,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_limit = self.max_concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.metrics = metrics or MetricsRegistry()
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._successes = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, ticket in self._queue if not ticket.granted.done())
+
+    @asynccontextmanager
+    async def slot(self, operation: str, cost: int) -> AsyncIterator[Ticket]:
+        """Wait for quota and a concurrency slot, and hold them for the call."""
+        ticket = await self.acquire(operation, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def acquire(self, operation: str, cost: int) -> Ticket:
+        ticket = Ticket(operation, OPERATION_PRIORITIES.get(operation, DEFAULT_PRIORITY), cost)
+        ticket.granted = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (ticket.priority, next(self._sequence), ticket))
+        self._dispatch()
+        try:
+            await ticket.granted
+        except asyncio.CancelledError:
+            if ticket.granted.done() and not ticket.granted.cancelled():
+                # Granted just before the cancellation landed; hand the slot back
+                self.release(ticket)
+            self._dispatch()
+            raise
+        waited = time.monotonic() - ticket.enqueued_at
+        self.metrics.observe("llm_scheduler_wait_seconds", waited, operation=operation)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def settle(self, ticket: Ticket, actual_tokens: Optional[int]) -> None:
+        """Refund the unused part of the estimate once real usage is known."""
+        if actual_tokens is not None and actual_tokens < ticket.cost:
+            self.tokens.refund(ticket.cost - actual_tokens)
+
+    def record_success(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        if headers:
+            self.update_from_headers(headers)
+        self._successes += 1
+        if self._successes >= ADDITIVE_INCREASE_EVERY and self.concurrency_limit < self.max_concurrency:
+            self.concurrency_limit += 1
+            self._successes = 0
+            self._dispatch()
+
+    def record_rate_limited(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        self.metrics.increment("llm_rate_limited")
+        self.concurrency_limit = max(1, self.concurrency_limit // 2)
+        self._successes = 0
+        if headers:
+            self.update_from_headers(headers)
+        if self.paused_until <= time.monotonic():
+            # 429 without retry-after: back off briefly rather than hammering the endpoint
+            self.paused_until = time.monotonic() + 1.0
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_tokens is not None:
+            try:
+                self.tokens.observe_remaining(float(remaining_tokens))
+            except ValueError:
+                pass
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests is not None:
+            try:
+                self.requests.observe_remaining(float(remaining_requests))
+            except ValueError:
+                pass
+        retry_after = parse_retry_after(headers)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queue:
+            _, _, ticket = self._queue[0]
+            if ticket.granted.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= self.concurrency_limit:
+                return
+
+            wait = max(
+                self.paused_until - time.monotonic(),
+                self.tokens.time_until(ticket.cost),
+                self.requests.time_until(1),
+            )
+            if wait > 0:
+                # Strict priority: nothing overtakes the head of the queue
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._queue)
+            self.tokens.consume(ticket.cost)
+            self.requests.consume(1)
+            self.in_flight += 1
+            ticket.granted.set_result(True)
@@ -0,0 +1,137 @@
+# app/services/speculation.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..utils.deadline import no_deadline
+from ..utils.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+ReviewGenerator = Callable[[str, List[str], str], Awaitable[Any]]
+
+
+def speculation_key(case_description: str, capabilities: List[str], generation_mode: str) -> str:
+    # Capability order does not change what a review has to cover
+    payload = json.dumps([case_description.strip(), sorted(capabilities), generation_mode])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _case_key(case_description: str) -> str:
+    return hashlib.sha256(case_description.strip().encode("utf-8")).hexdigest()
+
+
+class _Speculation:
+    def __init__(self, speculation_id: str, key: str, case_key: str, task: asyncio.Future):
+        self.speculation_id = speculation_id
+        self.key = key
+        self.case_key = case_key
+        self.task = task
+        self.started_at = time.monotonic()
+
+
+class SpeculativeReviews:
+    """Reviews generated ahead of the request that will most likely ask for them.
+
+    start() runs the generator in the background with the suggested capabilities;
+    a later claim() with the same case, capabilities and mode takes over the
+    result instead of generating again. Work is wasted when the user changes the
+    capabilities (mismatch) or never asks for the review (expired); both are
+    counted in speculative_reviews_wasted.
+    """
+
+    def __init__(
+        self,
+        generate: ReviewGenerator,
+        max_jobs: int = 2,
+        ttl_seconds: float = 120.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.generate = generate
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.metrics = metrics or MetricsRegistry()
+        self._entries: Dict[str, _Speculation] = {}
+
+    @property
+    def running(self) -> int:
+        return sum(1 for entry in self._entries.values() if not entry.task.done())
+
+    def start(self, case_description: str, capabilities: List[str], generation_mode: str) -> Optional[str]:
+        """Begin generating in the background; returns the speculation id, or None when at capacity."""
+        self._expire()
+        key = speculation_key(case_description, capabilities, generation_mode)
+        existing = self._entries.get(key)
+        if existing is not None:
+            return existing.speculation_id
+        if self.running >= self.max_jobs:
+            self.metrics.increment("speculative_reviews", outcome="rejected")
+            return None
+
+        task = asyncio.ensure_future(self._generate(case_description, capabilities, generation_mode))
+        # Failures surface in claim(); this only keeps unclaimed ones out of the "never retrieved" log
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        entry = _Speculation(uuid.uuid4().hex, key, _case_key(case_description), task)
+        self._entries[key] = entry
+        self.metrics.increment("speculative_reviews", outcome="started")
+        return entry.speculation_id
+
+    async def _generate(self, case_description: str, capabilities: List[str], generation_mode: str) -> Any:
+        # Outlives the selection request that started it, so not bound by its deadline
+        with no_deadline():
+            return await self.generate(case_description, capabilities, generation_mode)
+
+    async def claim(self, case_description: str, capabilities: List[str], generation_mode: str) -> Optional[Any]:
+        """Result of a matching speculation (waiting for it if still running), or None."""
+        self._expire()
+        entry = self._entries.pop(speculation_key(case_description, capabilities, generation_mode), None)
+        if entry is None:
+            self._discard_case(_case_key(case_description))
+            return None
+
+        lead_seconds = time.monotonic() - entry.started_at
+        try:
+            result = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if entry.task.cancelled():
+                return None
+            raise
+        except Exception as e:
+            logger.warning(f"Speculative review failed, generating normally: {str(e)}")
+            self.metrics.increment("speculative_reviews", outcome="failed")
+            return None
+
+        self.metrics.increment("speculative_reviews", outcome="hit")
+        self.metrics.observe("speculative_review_lead_seconds", lead_seconds)
+        return result
+
+    def _discard_case(self, case_key: str) -> None:
+        # The same case was requested with other capabilities, so its speculation is never going to be used
+        for key, entry in list(self._entries.items()):
+            if entry.case_key == case_key:
+                self._discard(key, "mismatch")
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key, entry in list(self._entries.items()):
+            if entry.started_at < cutoff:
+                self._discard(key, "expired")
+
+    def _discard(self, key: str, reason: str) -> None:
+        entry = self._entries.pop(key)
+        entry.task.cancel()
+        self.metrics.increment("speculative_reviews", outcome=reason)
+        self.metrics.increment("speculative_reviews_wasted", reason=reason)
+
+    async def aclose(self) -> None:
+        tasks = [entry.task for entry in self._entries.values()]
+        self._entries.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
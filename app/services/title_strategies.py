@@ -0,0 +1,104 @@
+# app/services/title_strategies.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..utils.text_processing import extract_title
+
+TitleGenerator = Callable[[str], Awaitable[str]]
+
+logger = logging.getLogger(__name__)
+
+
+class PendingTitle:
+    """Title work started alongside one review generation."""
+
+    def __init__(self, strategy: "TitleStrategy", task: Optional[asyncio.Task] = None):
+        self.strategy = strategy
+        self.task = task
+
+    async def resolve(self, review_content: str, sections: Dict[str, Any]) -> str:
+        return await self.strategy.resolve(self, review_content, sections)
+
+    def cancel(self) -> None:
+        """Stop any background title call, e.g. when the main generation failed."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+class TitleStrategy:
+    name = "base"
+
+    def __init__(self, generate_title: TitleGenerator):
+        self.generate_title = generate_title
+
+    def start(self, case_description: str) -> PendingTitle:
+        return PendingTitle(self)
+
+    async def resolve(self, pending: PendingTitle, review_content: str, sections: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def fallback(self, sections: Dict[str, Any]) -> str:
+        # Previous behaviour: a separate call on the finished brief description
+        return await self.generate_title(sections.get("brief_description", ""))
+
+
+class InlineTitleStrategy(TitleStrategy):
+    """Use the "Title:" line the system prompt already asks the main generation for."""
+
+    name = "inline"
+
+    async def resolve(self, pending: PendingTitle, review_content: str, sections: Dict[str, Any]) -> str:
+        title = extract_title(review_content)
+        if title:
+            return title
+        logger.info("No inline title in generated review, falling back to a title call")
+        return await self.fallback(sections)
+
+
+class ConcurrentTitleStrategy(TitleStrategy):
+    """Generate the title from the raw case notes while the review is being written."""
+
+    name = "concurrent"
+
+    def start(self, case_description: str) -> PendingTitle:
+        task = asyncio.create_task(self.generate_title(case_description))
+        return PendingTitle(self, task)
+
+    async def resolve(self, pending: PendingTitle, review_content: str, sections: Dict[str, Any]) -> str:
+        if pending.task is None:
+            return await self.fallback(sections)
+        return await pending.task
+
+
+TITLE_STRATEGIES = {
+    InlineTitleStrategy.name: InlineTitleStrategy,
+    ConcurrentTitleStrategy.name: ConcurrentTitleStrategy,
+}
+
+
+def get_title_strategy(name: str, generate_title: TitleGenerator) -> TitleStrategy:
+    try:
+        strategy_class = TITLE_STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown title strategy '{name}', expected one of {sorted(TITLE_STRATEGIES)}")
+    return strategy_class(generate_title)
+
+
+async def resolve_improved_title(
+    *,
+    generate_title: TitleGenerator,
+    previous_title: Optional[str],
+    original_case: str,
+    original_sections: Dict[str, Any],
+    improved_sections: Dict[str, Any],
+) -> str:
+    """Keep the existing title unless the improvement changed the brief description."""
+    improved_brief = improved_sections.get("brief_description", "")
+    if improved_brief.strip() == original_sections.get("brief_description", "").strip():
+        title = previous_title or extract_title(original_case)
+        if title:
+            return title
+    return await generate_title(improved_brief)
@@ -0,0 +1,115 @@
+# app/utils/admission.py
+import json
+import math
+from typing import Callable, Optional, Tuple
+
+from .metrics import MetricsRegistry
+
+# Only POST routes call the model; health, capabilities, metrics and job polling are always served
+ADMITTED_METHODS = ("POST",)
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class AdmissionController:
+    """Turns work away with a fast 503 instead of letting it queue behind a degraded deployment.
+
+    A request is rejected when max_in_flight requests are already running or the
+    LLM scheduler queue holds max_queue_depth calls (0 disables either limit).
+    circuit_retry_after reports whether every deployment's circuit is open, so a
+    failure caused by an open circuit can be answered with 503 and Retry-After.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 0,
+        max_queue_depth: int = 0,
+        retry_after_seconds: float = 2.0,
+        queue_depth: Optional[Callable[[], int]] = None,
+        circuit_retry_after: Optional[Callable[[], Optional[float]]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.retry_after_seconds = retry_after_seconds
+        self.queue_depth = queue_depth or (lambda: 0)
+        self.circuit_retry_after = circuit_retry_after or (lambda: None)
+        self.metrics = metrics or MetricsRegistry()
+        self.in_flight = 0
+
+    def rejection(self) -> Optional[Tuple[str, float]]:
+        """(reason, retry_after) when a new request should be turned away, else None."""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight", self.retry_after_seconds
+        if self.max_queue_depth and self.queue_depth() >= self.max_queue_depth:
+            return "queue_depth", self.retry_after_seconds
+        return None
+
+    def reject(self, reason: str) -> None:
+        self.metrics.increment("requests_rejected", reason=reason)
+
+    def degraded_retry_after(self, status_code: int) -> Optional[float]:
+        """Retry-After for a 500 that an open circuit explains, else None."""
+        if status_code != 500:
+            return None
+        retry_after = self.circuit_retry_after()
+        if retry_after is not None:
+            self.reject("circuit_open")
+        return retry_after
+
+
+def rejection_body(reason: str) -> bytes:
+    return json.dumps({"error": f"Service is overloaded ({reason}), please retry shortly"}).encode("utf-8")
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to POST requests."""
+
+    def __init__(self, app, get_controller: Callable[[], Optional[AdmissionController]]):
+        self.app = app
+        self.get_controller = get_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ADMITTED_METHODS:
+            return await self.app(scope, receive, send)
+        controller = self.get_controller()
+        if controller is None:
+            return await self.app(scope, receive, send)
+
+        rejection = controller.rejection()
+        if rejection is not None:
+            reason, retry_after = rejection
+            controller.reject(reason)
+            return await self._respond_503(send, reason, retry_after)
+
+        async def admission_send(message):
+            if message["type"] == "http.response.start":
+                retry_after = controller.degraded_retry_after(message["status"])
+                if retry_after is not None:
+                    headers = list(message.get("headers", [])) + [
+                        (b"retry-after", retry_after_header(retry_after).encode("latin-1"))
+                    ]
+                    message = {**message, "status": 503, "headers": headers}
+            await send(message)
+
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, admission_send)
+        finally:
+            controller.in_flight -= 1
+
+    @staticmethod
+    async def _respond_503(send, reason: str, retry_after: float) -> None:
+        body = rejection_body(reason)
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", retry_after_header(retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
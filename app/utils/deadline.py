@@ -0,0 +1,166 @@
+# app/utils/deadline.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+from .metrics import MetricsRegistry
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Monotonic time by which the current request must finish; copied into every task it starts
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before an upstream call could finish."""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Give the enclosed work `seconds` to finish; nested budgets can only shorten it."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Run background work (job workers, speculation) free of the request that started it."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_seconds() -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def has_budget(seconds: float) -> bool:
+    remaining = remaining_seconds()
+    return remaining is None or remaining >= seconds
+
+
+def deadline_exceeded() -> bool:
+    remaining = remaining_seconds()
+    return remaining is not None and remaining <= 0
+
+
+def parse_route_deadlines(spec: str) -> Dict[str, float]:
+    """Parse "generate-review=120,improve-section=60" into {route: seconds}."""
+    deadlines = {}
+    for item in spec.split(","):
+        route, _, seconds = item.partition("=")
+        if route.strip() and seconds.strip():
+            deadlines[route.strip().strip("/")] = float(seconds)
+    return deadlines
+
+
+def request_budget(
+    path: str,
+    header_value: Optional[str],
+    route_deadlines: Dict[str, float],
+    default_seconds: float = 0.0,
+) -> Optional[float]:
+    """Seconds allowed for a request: the route's budget, shortened by the client's header."""
+    route = path.split("?", 1)[0].strip("/")
+    if route.startswith("api/"):
+        route = route[len("api/"):]
+    budget = route_deadlines.get(route, default_seconds) or None
+    try:
+        requested = float(header_value) if header_value else None
+    except ValueError:
+        requested = None
+    if requested is not None and requested > 0:
+        budget = requested if budget is None else min(budget, requested)
+    return budget
+
+
+class DeadlineMiddleware:
+    """ASGI middleware that sets the request deadline and cancels the request when the client leaves.
+
+    Once the body has been read, the middleware listens for http.disconnect and
+    cancels the handler, which cancels any upstream LLM call it is waiting on.
+    A 500 produced after the budget ran out is reported as 504.
+    """
+
+    def __init__(
+        self,
+        app,
+        route_deadlines: Dict[str, float],
+        default_seconds: float = 0.0,
+        get_metrics: Optional[Callable[[], MetricsRegistry]] = None,
+    ):
+        self.app = app
+        self.route_deadlines = route_deadlines
+        self.default_seconds = default_seconds
+        self.get_metrics = get_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        header = None
+        for name, value in scope["headers"]:
+            if name.decode("latin-1").lower() == DEADLINE_HEADER.lower():
+                header = value.decode("latin-1")
+        budget = request_budget(scope["path"], header, self.route_deadlines, self.default_seconds)
+
+        disconnected = asyncio.Event()
+        watcher: Optional[asyncio.Task] = None
+        body_read = False
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    handler.cancel()
+                    return
+
+        async def guarded_receive():
+            nonlocal body_read, watcher
+            if body_read:
+                # The watcher owns receive() now; hand the disconnect on when it comes
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body"):
+                body_read = True
+                watcher = asyncio.ensure_future(watch_disconnect())
+            return message
+
+        async def deadline_send(message):
+            if message["type"] == "http.response.start" and message["status"] == 500 and deadline_exceeded():
+                message = {**message, "status": 504}
+            await send(message)
+
+        async def run():
+            with request_deadline(budget):
+                await self.app(scope, guarded_receive, deadline_send)
+
+        handler = asyncio.ensure_future(run())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+            if self.get_metrics is not None:
+                self.get_metrics().increment("requests_cancelled", reason="disconnect")
+        finally:
+            if watcher is not None:
+                watcher.cancel()
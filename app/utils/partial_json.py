@@ -0,0 +1,170 @@
+# app/utils/partial_json.py
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SURROGATE = re.compile('[\ud800-\udfff]')
+_SCALAR_END = ',}] \t\r\n'
+
+Path = Tuple[Any, ...]
+
+
+def _join_surrogates(text: str) -> str:
+    # 😀 arrives as two code units; a lone high surrogate at a chunk boundary is held back
+    if not _SURROGATE.search(text):
+        return text
+    return text.encode('utf-16', 'surrogatepass').decode('utf-16', 'ignore')
+
+
+class _Frame:
+    __slots__ = ("container", "key", "expect")
+
+    def __init__(self, container):
+        self.container = container
+        self.key: Any = None
+        # dict: key / colon / value / comma; list: value / comma
+        self.expect = "key" if isinstance(container, dict) else "value"
+
+
+class PartialJSONDecoder:
+    """Incremental JSON decoder whose `value` can be read before the document is complete.
+
+    feed() consumes the next chunk and returns the paths of the strings, numbers
+    and containers it completed, e.g. ("capabilities", 0) when the first item of
+    the capabilities array closes. Open strings, objects and arrays show up in
+    `value` with whatever has arrived; a key whose value has not started, or a
+    half-written number or literal, is left out until it is complete.
+    """
+
+    def __init__(self):
+        self.value: Any = None
+        self.done = False
+        self._stack: List[_Frame] = []
+        self._string: Optional[List[str]] = None
+        self._string_is_key = False
+        self._escape: Optional[str] = None
+        self._scalar: Optional[str] = None
+
+    def feed(self, text: str) -> List[Path]:
+        completed: List[Path] = []
+        position, length = 0, len(text)
+        while position < length:
+            if self._string is not None:
+                position = self._consume_string(text, position, completed)
+                continue
+            char = text[position]
+            if self._scalar is not None:
+                if char in _SCALAR_END:
+                    self._finish_scalar(completed)
+                    continue
+                self._scalar += char
+                position += 1
+                continue
+
+            position += 1
+            if char.isspace():
+                continue
+            frame = self._stack[-1] if self._stack else None
+            if char in '{[':
+                container = {} if char == '{' else []
+                self._begin_value(container)
+                self._stack.append(_Frame(container))
+            elif char in '}]':
+                if frame is None or isinstance(frame.container, dict) != (char == '}'):
+                    raise ValueError(f"Unexpected {char!r} in JSON")
+                self._stack.pop()
+                completed.append(self._path())
+                self._after_value()
+            elif char == ',':
+                if frame is not None:
+                    frame.expect = "key" if isinstance(frame.container, dict) else "value"
+            elif char == ':':
+                if frame is not None:
+                    frame.expect = "value"
+            elif char == '"':
+                self._string = []
+                self._string_is_key = frame is not None and isinstance(frame.container, dict) and frame.expect == "key"
+                if not self._string_is_key:
+                    self._begin_value("")
+            else:
+                self._scalar = char
+
+        if self._string is not None and not self._string_is_key:
+            partial = ''.join(self._string)
+            self._string = [partial]
+            self._set_current(_join_surrogates(partial))
+        return completed
+
+    def finish(self) -> List[Path]:
+        """Close a number or literal that ended the document."""
+        completed: List[Path] = []
+        if self._scalar is not None:
+            self._finish_scalar(completed)
+        return completed
+
+    def _consume_string(self, text: str, position: int, completed: List[Path]) -> int:
+        if self._escape is not None:
+            self._escape += text[position]
+            position += 1
+            if self._escape[0] != 'u':
+                self._string.append(_ESCAPES.get(self._escape, self._escape))
+                self._escape = None
+            elif len(self._escape) == 5:
+                self._string.append(chr(int(self._escape[1:], 16)))
+                self._escape = None
+            return position
+
+        match = _STRING_SPECIAL.search(text, position)
+        if match is None:
+            self._string.append(text[position:])
+            return len(text)
+        self._string.append(text[position:match.start()])
+        if match.group() == '\\':
+            self._escape = ""
+            return match.end()
+
+        value = _join_surrogates(''.join(self._string))
+        self._string = None
+        if self._string_is_key:
+            self._stack[-1].key = value
+            self._stack[-1].expect = "colon"
+        else:
+            self._set_current(value)
+            completed.append(self._path())
+            self._after_value()
+        return match.end()
+
+    def _finish_scalar(self, completed: List[Path]) -> None:
+        scalar, self._scalar = self._scalar, None
+        self._begin_value(json.loads(scalar))
+        completed.append(self._path())
+        self._after_value()
+
+    def _path(self) -> Path:
+        return tuple(frame.key for frame in self._stack)
+
+    def _begin_value(self, value: Any) -> None:
+        if not self._stack:
+            self.value = value
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+            frame.key = len(frame.container) - 1
+
+    def _set_current(self, value: Any) -> None:
+        if not self._stack:
+            self.value = value
+        else:
+            frame = self._stack[-1]
+            frame.container[frame.key] = value
+
+    def _after_value(self) -> None:
+        if self._stack:
+            self._stack[-1].expect = "comma"
+        else:
+            self.done = True
@@ -0,0 +1,60 @@
+# app/utils/patching.py
+import re
+from typing import List, Tuple
+
+SEARCH_MARKER = "<<<<<<< SEARCH"
+DIVIDER_MARKER = "======="
+REPLACE_MARKER = ">>>>>>> REPLACE"
+NO_CHANGES = "NO CHANGES"
+
+PATCH_INSTRUCTIONS = f"""Do not rewrite the whole text. Reply ONLY with edit blocks against the current text, in this exact format:
+
+{SEARCH_MARKER}
+exact text copied from the current content
+{DIVIDER_MARKER}
+replacement text
+{REPLACE_MARKER}
+
+Rules:
+1. The SEARCH text must be copied exactly, character for character, and appear once in the current content
+2. Keep each SEARCH block as short as possible while still being unique (usually a sentence or two)
+3. Use as many blocks as needed; to delete text leave the replacement empty
+4. Do not add any other commentary
+5. If nothing needs to change, reply with {NO_CHANGES}"""
+
+_BLOCK = re.compile(
+    rf"^{re.escape(SEARCH_MARKER)}[ \t]*\n(.*?)\n?^{re.escape(DIVIDER_MARKER)}[ \t]*\n(.*?)\n?^{re.escape(REPLACE_MARKER)}[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+class PatchError(ValueError):
+    """The model's edit blocks could not be applied to the original text."""
+
+def parse_patch(patch_text: str) -> List[Tuple[str, str]]:
+    """Return the (search, replace) pairs in a SEARCH/REPLACE response."""
+    return [(match.group(1), match.group(2)) for match in _BLOCK.finditer(patch_text)]
+
+def apply_patch(original: str, patch_text: str) -> str:
+    """Apply SEARCH/REPLACE blocks to the original text in order.
+
+    Raises PatchError when a SEARCH text is missing from the original or the
+    response contains no blocks at all, so callers can fall back to a full rewrite.
+    """
+    blocks = parse_patch(patch_text)
+    if not blocks:
+        if patch_text.strip().upper().startswith(NO_CHANGES):
+            return original
+        raise PatchError("Response did not contain any SEARCH/REPLACE blocks")
+
+    result = original
+    for search, replace in blocks:
+        if not search:
+            raise PatchError("Empty SEARCH block")
+        if search not in result:
+            stripped = search.strip()
+            # Tolerate the model trimming surrounding whitespace
+            if not stripped or stripped not in result:
+                raise PatchError(f"SEARCH text not found: {search[:60]!r}")
+            search, replace = stripped, replace.strip()
+        result = result.replace(search, replace, 1)
+    return result
@@ -0,0 +1,103 @@
+# app/utils/prompt_builder.py
+import re
+from typing import Dict, List, Optional
+
+from .tokens import count_text_tokens
+
+DESCRIPTOR_HEADING = "Progression point descriptors – "
+GUIDELINES_HEADING = "**TONE & STYLE GUIDELINES:**"
+# The descriptors vary with the selection, so they go after the shared instructions
+DESCRIPTORS_POINTER = "The progression point descriptors for the selected capabilities are listed at the end of these instructions.\n\n"
+DESCRIPTORS_SECTION = "\n\n**REFERENCE MATERIAL – PROGRESSION POINT DESCRIPTORS:**\n\n"
+
+class DescriptorIndex:
+    """SYSTEM_PROMPT split into shared instructions and per-capability descriptor blocks."""
+
+    def __init__(self, preamble: str, descriptors: Dict[str, str], postamble: str):
+        self.preamble = preamble
+        self.descriptors = descriptors
+        self.postamble = postamble
+
+    def lookup(self, capability: str) -> Optional[str]:
+        """Return the canonical capability name, matching case-insensitively."""
+        wanted = capability.strip().lower()
+        for name in self.descriptors:
+            if name.lower() == wanted:
+                return name
+        return None
+
+class AssembledPrompt:
+    def __init__(self, text: str, capabilities: List[str], token_count: int, full_token_count: int):
+        self.text = text
+        self.capabilities = capabilities
+        self.token_count = token_count
+        self.full_token_count = full_token_count
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.full_token_count - self.token_count
+
+def parse_descriptor_index(system_prompt: str) -> Optional[DescriptorIndex]:
+    """Split the progression point descriptors out of the system prompt.
+
+    Returns None when the prompt does not have the expected layout, so callers
+    can keep sending it unchanged.
+    """
+    first = system_prompt.find(DESCRIPTOR_HEADING)
+    guidelines = system_prompt.find(GUIDELINES_HEADING)
+    if first == -1 or guidelines == -1 or guidelines < first:
+        return None
+
+    preamble = system_prompt[:first]
+    postamble = system_prompt[guidelines:]
+    descriptor_text = system_prompt[first:guidelines]
+
+    descriptors = {}
+    blocks = re.split(f"(?m)^(?={re.escape(DESCRIPTOR_HEADING)})", descriptor_text)
+    for block in blocks:
+        if not block.strip():
+            continue
+        heading, _, _ = block.partition("\n")
+        name = heading[len(DESCRIPTOR_HEADING):].strip()
+        descriptors[name] = block.rstrip() + "\n\n"
+
+    return DescriptorIndex(preamble, descriptors, postamble)
+
+class SystemPromptBuilder:
+    """Builds the case review system prompt with only the selected capabilities' descriptors.
+
+    The shared instructions and examples come first and are byte-identical for
+    every selection, so the provider's prompt cache can reuse them; the selected
+    descriptors follow at the end.
+    """
+
+    def __init__(self, system_prompt: str, enabled: bool = True):
+        self.system_prompt = system_prompt
+        self.index = parse_descriptor_index(system_prompt) if enabled else None
+        self.full_token_count = count_text_tokens(system_prompt)
+        self.static_prefix = system_prompt
+        if self.index is not None:
+            self.static_prefix = self.index.preamble + DESCRIPTORS_POINTER + self.index.postamble.rstrip() + DESCRIPTORS_SECTION
+
+    def build(self, selected_capabilities: List[str]) -> AssembledPrompt:
+        if self.index is None:
+            return self._full_prompt(selected_capabilities)
+
+        names = [self.index.lookup(capability) for capability in selected_capabilities]
+        if not names or None in names:
+            # Unknown capability name: keep every descriptor rather than drop evidence
+            names = list(self.index.descriptors)
+
+        # Canonical order keeps the prompt identical for the same selection
+        selected = [name for name in self.index.descriptors if name in names]
+        text = self.static_prefix + "".join(self.index.descriptors[name] for name in selected).rstrip() + "\n"
+        return AssembledPrompt(text, selected, count_text_tokens(text), self.full_token_count)
+
+    def _full_prompt(self, selected_capabilities: List[str]) -> AssembledPrompt:
+        # Unparseable layout: the configured prompt is sent as is, which is static anyway
+        return AssembledPrompt(
+            self.system_prompt,
+            list(selected_capabilities),
+            self.full_token_count,
+            self.full_token_count,
+        )
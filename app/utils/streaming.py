@@ -0,0 +1,26 @@
+# app/utils/streaming.py
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def format_ndjson(event: str, data: Any) -> str:
+    """Format one newline-delimited JSON event."""
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+async def encode_events(
+    events: AsyncIterator[Dict[str, Any]],
+    formatter: Callable[[str, Any], str]
+) -> AsyncIterator[str]:
+    """Encode service events for the wire, turning a failure into a final error event."""
+    try:
+        async for item in events:
+            yield formatter(item["event"], item["data"])
+    except Exception as e:
+        logger.error(f"Error while streaming: {str(e)}")
+        yield formatter("error", {"message": str(e)})
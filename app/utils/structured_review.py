@@ -0,0 +1,173 @@
+# app/utils/structured_review.py
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from ..models import StructuredCaseReview
+from .partial_json import PartialJSONDecoder
+
+STRUCTURED_OUTPUT_INSTRUCTIONS = """Output format:
+Return the review as a JSON object matching the provided schema instead of the plain-text layout. Put each section's text, without its header, in the matching field, and add one capabilities entry per selected capability with its justification. Keep to plain prose inside the fields."""
+
+
+class StructuredOutputError(Exception):
+    """The completion is not a usable structured review; the text path takes over."""
+
+
+def review_response_format(capabilities: List[str]) -> Dict[str, Any]:
+    """response_format for a strict JSON-schema review of the selected capabilities."""
+    def text(description: str) -> Dict[str, str]:
+        return {"type": "string", "description": description}
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "case_review",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                # Fields are generated in this order, which the stream renders as it goes
+                "properties": {
+                    "title": text("Brief (4-6 words) case title"),
+                    "brief_description": text("Brief description section"),
+                    "capabilities": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "enum": list(capabilities)},
+                                "justification": text("Justification for this capability"),
+                            },
+                            "required": ["name", "justification"],
+                            "additionalProperties": False,
+                        },
+                    },
+                    "reflection": text("Reflection section"),
+                    "learning_needs": text("Learning needs identified from this event"),
+                },
+                "required": ["title", "brief_description", "capabilities", "reflection", "learning_needs"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def _clean(text: str) -> str:
+    # Same clean-up as the text path
+    return text.replace('*', '').replace('#', '').strip()
+
+
+def parse_structured_review(content: str, capabilities: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """Validate a structured completion into (title, sections) shaped like extract_sections."""
+    try:
+        review = StructuredCaseReview.model_validate_json(content)
+    except ValidationError as e:
+        raise StructuredOutputError(f"Review does not match the schema ({e.error_count()} errors)")
+    return _to_sections(review, capabilities)
+
+
+def _to_sections(review: StructuredCaseReview, capabilities: List[str]) -> Tuple[str, Dict[str, Any]]:
+    justifications = {item.name.strip().lower(): _clean(item.justification) for item in review.capabilities}
+    sections = {
+        "brief_description": _clean(review.brief_description),
+        # Selection order, with the names exactly as the user picked them
+        "capabilities": {name: justifications.get(name.lower(), "") for name in capabilities},
+        "reflection": _clean(review.reflection),
+        "learning_needs": _clean(review.learning_needs),
+    }
+    empty = [name for name, text in sections["capabilities"].items() if not text]
+    empty += [name for name in ("brief_description", "reflection", "learning_needs") if not sections[name]]
+    if empty:
+        raise StructuredOutputError(f"Review is missing {', '.join(empty)}")
+    return _clean(review.title), sections
+
+
+class StructuredReviewStreamParser:
+    """Streams a structured review as the same token and section events as the text path.
+
+    feed() returns the new review text (the sections rendered so far, in the
+    layout of render_review_content) and "section complete" events in the
+    format of IncrementalSectionParser. The rendered text only ever grows while
+    fields arrive in schema order; if the model reorders them, token output
+    pauses and the final "complete" event still carries the whole review.
+    """
+
+    def __init__(self, capabilities: List[str]):
+        self.capabilities = capabilities
+        self.decoder = PartialJSONDecoder()
+        self.content_parts: List[str] = []
+        self.rendered = ""
+        self.malformed = False
+
+    @property
+    def content(self) -> str:
+        return "".join(self.content_parts)
+
+    def feed(self, delta: str) -> Tuple[str, List[Dict[str, str]]]:
+        self.content_parts.append(delta)
+        if self.malformed:
+            return "", []
+        try:
+            completed = self.decoder.feed(delta)
+        except ValueError:
+            # Not JSON after all; finish() reports it and the caller falls back
+            self.malformed = True
+            return "", []
+        events = [event for path in completed for event in self._section_events(path)]
+        text = self._render()
+        if not text.startswith(self.rendered):
+            return "", events
+        new_text, self.rendered = text[len(self.rendered):], text
+        return new_text, events
+
+    def finish(self) -> Tuple[str, Dict[str, Any]]:
+        """Validated (title, sections); raises StructuredOutputError when the review is unusable."""
+        return parse_structured_review(self.content, self.capabilities)
+
+    def partial_sections(self) -> Dict[str, Any]:
+        """Whatever arrived, for when the finished review does not validate."""
+        value = self.decoder.value if isinstance(self.decoder.value, dict) else {}
+        return {
+            "brief_description": _clean(str(value.get("brief_description", ""))),
+            "capabilities": {
+                str(item.get("name", "")): _clean(str(item.get("justification", "")))
+                for item in value.get("capabilities", []) if isinstance(item, dict) and item.get("name")
+            },
+            "reflection": _clean(str(value.get("reflection", ""))),
+            "learning_needs": _clean(str(value.get("learning_needs", ""))),
+        }
+
+    def _section_events(self, path: Tuple[Any, ...]) -> List[Dict[str, str]]:
+        value = self.decoder.value
+        if len(path) == 1 and path[0] in ("brief_description", "reflection", "learning_needs"):
+            return [{"section": path[0], "content": _clean(str(value[path[0]]))}]
+        if len(path) == 2 and path[0] == "capabilities":
+            item = value["capabilities"][path[1]]
+            if isinstance(item, dict) and item.get("name"):
+                return [{
+                    "section": "capability",
+                    "capability": item["name"],
+                    "content": _clean(str(item.get("justification", ""))),
+                }]
+        return []
+
+    def _render(self) -> str:
+        value = self.decoder.value
+        if not isinstance(value, dict):
+            return ""
+        parts = []
+        if "title" in value:
+            parts.append(f"Title: {value['title']}")
+        if "brief_description" in value:
+            parts.append(f"Brief description:\n{value['brief_description']}")
+        for item in value.get("capabilities", []):
+            if isinstance(item, dict) and "name" in item:
+                part = f"Capability: {item['name']}"
+                if "justification" in item:
+                    part += f"\nJustification: {item['justification']}"
+                parts.append(part)
+        if "reflection" in value:
+            parts.append(f"Reflection:\n{value['reflection']}")
+        if "learning_needs" in value:
+            parts.append(f"Learning needs identified from this event:\n{value['learning_needs']}")
+        return "\n\n".join(parts).replace('*', '').replace('#', '')
@@ -2,32 +2,65 @@
 import re
 from typing import Dict, List, Optional
 from openai import AzureOpenAI
-from openai import AsyncAzureOpenAI
-from ..config import Settings
 
-def extract_sections(review_content: str, selected_capabilities: List[str]) -> Dict[str, any]:
-    """Extract sections from review content."""
-    print(f"🟡 extract_sections: Starting extraction, content length: {len(review_content)} chars")
-    
-    sections = {
-        "brief_description": "",
-        "capabilities": {},
-        "reflection": "",
-        "learning_needs": ""
-    }
-    
-    # Split content into sections
-    content_parts = review_content.split('\n\n')
-    print(f"🟡 extract_sections: Split into {len(content_parts)} parts")
-    current_section = None
-    
-    for idx, part in enumerate(content_parts):
+class IncrementalSectionParser:
+    """Incremental version of extract_sections that consumes a token stream.
+
+    feed() and finish() return "section complete" events as soon as a section can
+    no longer change; the accumulated result in `sections` matches extract_sections
+    on the finished text.
+    """
+
+    def __init__(self):
+        self.sections = {
+            "brief_description": "",
+            "capabilities": {},
+            "reflection": "",
+            "learning_needs": ""
+        }
+        self.part_count = 0
+        self._current_section = None
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Add streamed text and return events for sections completed by it."""
+        self._buffer += text
+        events = []
+        while '\n\n' in self._buffer:
+            part, self._buffer = self._buffer.split('\n\n', 1)
+            events.extend(self._consume_part(part))
+        return events
+
+    def finish(self) -> List[Dict[str, str]]:
+        """Flush the trailing part and close the last open section."""
+        events = self._consume_part(self._buffer)
+        self._buffer = ""
+        events.extend(self._close_current_section())
+        self._current_section = None
+        return events
+
+    def _close_current_section(self) -> List[Dict[str, str]]:
+        # Capability events are emitted as soon as their part is read
+        if self._current_section in (None, "capabilities"):
+            return []
+        return [{
+            "section": self._current_section,
+            "content": self.sections[self._current_section]
+        }]
+
+    def _consume_part(self, part: str) -> List[Dict[str, str]]:
+        self.part_count += 1
         part = part.strip()
         if not part:
-            continue
-            
-        if part.lower().startswith('brief description:'):
-            current_section = "brief_description"
+            return []
+
+        sections = self.sections
+        lowered = part.lower()
+        is_header = lowered.startswith(('brief description:', 'capability:', 'reflection:', 'learning needs'))
+        events = self._close_current_section() if is_header else []
+
+        if lowered.startswith('brief description:'):
+            self._current_section = "brief_description"
             # Handle both "Brief Description:" and "Brief description:"
             content = part
             for prefix in ['Brief Description:', 'Brief description:', 'BRIEF DESCRIPTION:']:
@@ -35,9 +68,9 @@ def extract_sections(review_content: str, selected_capabilities: List[str]) -> D
                     content = content.replace(prefix, '', 1).strip()
                     break
             sections["brief_description"] = content
-        
-        elif part.lower().startswith('capability:'):
-            current_section = "capabilities"
+
+        elif lowered.startswith('capability:'):
+            self._current_section = "capabilities"
             # Extract capability name and justification
             cap_lines = part.split('\n')
             # Handle "Capability:" with different cases
@@ -46,7 +79,7 @@ def extract_sections(review_content: str, selected_capabilities: List[str]) -> D
                 if cap_name.startswith(prefix):
                     cap_name = cap_name.replace(prefix, '', 1).strip()
                     break
-            
+
             if len(cap_lines) > 1:
                 justification = '\n'.join(cap_lines[1:])
                 # Remove "Justification:" label if present
@@ -55,21 +88,26 @@ def extract_sections(review_content: str, selected_capabilities: List[str]) -> D
                         justification = justification.strip().replace(prefix, '', 1).strip()
                         break
                 sections["capabilities"][cap_name] = justification.strip()
-        
-        elif part.lower().startswith('reflection:'):
-            current_section = "reflection"
+                events.append({
+                    "section": "capability",
+                    "capability": cap_name,
+                    "content": sections["capabilities"][cap_name]
+                })
+
+        elif lowered.startswith('reflection:'):
+            self._current_section = "reflection"
             content = part
             for prefix in ['Reflection:', 'reflection:', 'REFLECTION:']:
                 if content.startswith(prefix):
                     content = content.replace(prefix, '', 1).strip()
                     break
             sections["reflection"] = content
-        
-        elif part.lower().startswith('learning needs'):
-            current_section = "learning_needs"
+
+        elif lowered.startswith('learning needs'):
+            self._current_section = "learning_needs"
             content = part
             # Handle various formats
-            for prefix in ['Learning needs identified from this event:', 'Learning Needs Identified:', 
+            for prefix in ['Learning needs identified from this event:', 'Learning Needs Identified:',
                           'Learning needs:', 'Learning Needs:', 'LEARNING NEEDS:']:
                 if prefix.lower() in content.lower():
                     # Find the prefix case-insensitively and remove it
@@ -78,13 +116,24 @@ def extract_sections(review_content: str, selected_capabilities: List[str]) -> D
                         content = content[idx + len(prefix):].strip()
                         break
             sections["learning_needs"] = content
-        
-        elif current_section:
-            # Append content to current section
-            if current_section == "capabilities":
-                continue  # Skip appending to capabilities
-            sections[current_section] = sections[current_section] + '\n' + part
-    
+
+        elif self._current_section and self._current_section != "capabilities":
+            # Append content to current section (capability continuations are skipped)
+            sections[self._current_section] = sections[self._current_section] + '\n' + part
+
+        return events
+
+
+def extract_sections(review_content: str, selected_capabilities: List[str]) -> Dict[str, any]:
+    """Extract sections from review content."""
+    print(f"🟡 extract_sections: Starting extraction, content length: {len(review_content)} chars")
+
+    parser = IncrementalSectionParser()
+    parser.feed(review_content)
+    parser.finish()
+    sections = parser.sections
+    print(f"🟡 extract_sections: Split into {parser.part_count} parts")
+
     print(f"🟡 extract_sections: Completed. Found {len(sections['capabilities'])} capabilities")
     print(f"🟡 extract_sections: Brief desc: {len(sections['brief_description'])} chars")
     print(f"🟡 extract_sections: Reflection: {len(sections['reflection'])} chars")
@@ -92,23 +141,94 @@ def extract_sections(review_content: str, selected_capabilities: List[str]) -> D
     
     return sections
 
-async def generate_title(case_description: str, client: AsyncAzureOpenAI, settings: Settings) -> str:
-    """Generate a brief title from the case description."""
-    try:
-        print(f"🟢 generate_title: Starting, description length: {len(case_description)} chars")
-        response = await client.chat.completions.create(
-            model=settings.azure_openai_deployment,
-            messages=[
-                {"role": "system", "content": "Generate a brief (4-6 words) medical case title."},
-                {"role": "user", "content": f"Create a title for: {case_description}"}
-            ],
-            max_tokens=50,
-            temperature=0.7
-        )
-        
-        title = response.choices[0].message.content.strip().replace('"', '')
-        print(f"🟢 generate_title: Completed, title: '{title}'")
-        return title
-    except Exception as e:
-        print(f"❌ generate_title: Error - {str(e)}, returning default")
-        return "Case Review"
\ No newline at end of file
+_SECTION_HEADER = re.compile(
+    r'(?P<title>title:)'
+    r'|(?P<brief_description>brief description:)'
+    r'|(?P<capability>capability:(?P<capability_name>[^\n]*)(?:\n[ \t]*justification:)?)'
+    r'|(?P<reflection>reflection:)'
+    r'|(?P<learning_needs>learning needs[^:\n]*:?)',
+    re.IGNORECASE
+)
+
+class SectionSpan:
+    """Where a section's body sits in the review text (header and separator excluded)."""
+
+    def __init__(self, section: str, capability: Optional[str], body_start: int, end: int):
+        self.section = section
+        self.capability = capability
+        self.body_start = body_start
+        self.end = end
+
+def locate_sections(review_content: str) -> List[SectionSpan]:
+    """Find section bodies using the same part boundaries as IncrementalSectionParser."""
+    headers = []
+    part_starts = [0] + [match.end() for match in re.finditer('\n\n', review_content)]
+    for start in part_starts:
+        position = start + len(review_content[start:]) - len(review_content[start:].lstrip())
+        match = _SECTION_HEADER.match(review_content, position)
+        if match:
+            headers.append((position, match))
+
+    spans = []
+    for index, (position, match) in enumerate(headers):
+        next_position = headers[index + 1][0] if index + 1 < len(headers) else len(review_content)
+        end = position + len(review_content[position:next_position].rstrip())
+        body_start = match.end()
+        while body_start < end and review_content[body_start].isspace():
+            body_start += 1
+        section = match.lastgroup if match.lastgroup != "capability_name" else "capability"
+        if section == "title":
+            continue
+        capability = match.group("capability_name").strip() if section == "capability" else None
+        spans.append(SectionSpan(section, capability, body_start, end))
+    return spans
+
+def splice_sections(review_content: str, replacements: List[tuple]) -> str:
+    """Replace (SectionSpan, new_body) pairs, leaving every other byte untouched."""
+    for span, body in sorted(replacements, key=lambda item: item[0].body_start, reverse=True):
+        review_content = review_content[:span.body_start] + body + review_content[span.end:]
+    return review_content
+
+def render_review_content(case_title: Optional[str], sections: Dict[str, any]) -> str:
+    """Lay sections out the way the generation prompt does; extract_sections reads it back."""
+    parts = [f"Title: {case_title}"] if case_title else []
+    parts.append(f"Brief description:\n{sections['brief_description']}")
+    for name, justification in sections["capabilities"].items():
+        # Capability continuation paragraphs are not parsed, so keep one paragraph
+        justification = re.sub(r'\n\s*\n', '\n', justification)
+        parts.append(f"Capability: {name}\nJustification: {justification}")
+    parts.append(f"Reflection:\n{sections['reflection']}")
+    parts.append(f"Learning needs identified from this event:\n{sections['learning_needs']}")
+    return "\n\n".join(parts)
+
+def extract_title(review_content: str) -> Optional[str]:
+    """Return the inline "Title:" line written by the main generation, if any."""
+    match = re.search(r'^[ \t]*title:[ \t]*(.*)$', review_content, re.IGNORECASE | re.MULTILINE)
+    if not match:
+        return None
+    title = match.group(1).strip()
+    if not title:
+        # Title on the following line ("Title:\nChest Pain Review")
+        following = review_content[match.end():].strip().split('\n', 1)[0].strip()
+        # Next thing is another section header, so the title was left empty
+        title = '' if following.endswith(':') else following
+    title = title.replace('"', '')
+    return title or None
+
+def build_title_messages(case_description: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "Generate a brief (4-6 words) medical case title."},
+        {"role": "user", "content": f"Create a title for: {case_description}"}
+    ]
+
+def clean_title(content: str) -> str:
+    return content.strip().replace('"', '')
+
+def local_title(case_description: str, max_words: int = 6) -> str:
+    """Title from the opening words of the case, for when the model cannot be reached."""
+    first_sentence = re.split(r'(?<=[.!?])\s|\n', case_description.strip(), maxsplit=1)[0]
+    words = first_sentence.strip(' .!?:;,"').split()[:max_words]
+    if not words:
+        return "Case Review"
+    title = " ".join(words).rstrip(' ,;:')
+    return title[0].upper() + title[1:]
@@ -0,0 +1,27 @@
+# app/utils/tokens.py
+from typing import Dict, List
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # Optional: fall back to the ~4 characters per token rule of thumb
+    _encoding = None
+
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def count_text_tokens(text: str) -> int:
+    """Count (or estimate, without tiktoken) the tokens in a piece of text."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens for a list of chat messages."""
+    return sum(count_text_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Worst-case quota cost of a request: prompt plus the full completion budget."""
+    return count_message_tokens(messages) + max_tokens
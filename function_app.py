@@ -1,10 +1,18 @@
 import azure.functions as func
 from functions.capabilities import main as capabilities_main
 from functions.generate_review import main as generate_review_main
+from functions.generate_review_stream import main as generate_review_stream_main
 from functions.improve_review import main as improve_review_main
 from functions.improve_section import main as improve_section_main
 from functions.select_capabilities import main as select_capabilities_main
 from functions.select_experience_groups import main as select_experience_groups_main
+from functions.metrics import main as metrics_main
+from functions.submit_generate_review_job import main as submit_generate_review_job_main
+from functions.submit_improve_review_job import main as submit_improve_review_job_main
+from functions.job_status import main as job_status_main
+from functions.job_result import main as job_result_main
+from functions.bulk_generate_reviews import main as bulk_generate_reviews_main
+from functions.case_intake import main as case_intake_main
 import logging
 app = func.FunctionApp()
 
@@ -18,6 +26,11 @@ async def capabilities(req: func.HttpRequest) -> func.HttpResponse:
 async def generate_review(req: func.HttpRequest) -> func.HttpResponse:
     return await generate_review_main(req)
 
+@app.function_name(name="generate-review-stream")
+@app.route(route="generate-review-stream", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+async def generate_review_stream(req: func.HttpRequest) -> func.HttpResponse:
+    return await generate_review_stream_main(req)
+
 @app.function_name(name="improve-review")
 @app.route(route="improve-review", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
 async def improve_review(req: func.HttpRequest) -> func.HttpResponse:
@@ -38,3 +51,37 @@ async def select_capabilities(req: func.HttpRequest) -> func.HttpResponse:
 async def select_experience_groups(req: func.HttpRequest) -> func.HttpResponse:
     return await select_experience_groups_main(req)
 
+@app.function_name(name="metrics")
+@app.route(route="metrics", auth_level=func.AuthLevel.ANONYMOUS, methods=["GET"])
+async def metrics(req: func.HttpRequest) -> func.HttpResponse:
+    return await metrics_main(req)
+
+@app.function_name(name="submit-generate-review-job")
+@app.route(route="jobs/generate-review", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+async def submit_generate_review_job(req: func.HttpRequest) -> func.HttpResponse:
+    return await submit_generate_review_job_main(req)
+
+@app.function_name(name="submit-improve-review-job")
+@app.route(route="jobs/improve-review", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+async def submit_improve_review_job(req: func.HttpRequest) -> func.HttpResponse:
+    return await submit_improve_review_job_main(req)
+
+@app.function_name(name="job-status")
+@app.route(route="jobs/{job_id}", auth_level=func.AuthLevel.ANONYMOUS, methods=["GET"])
+async def job_status(req: func.HttpRequest) -> func.HttpResponse:
+    return await job_status_main(req)
+
+@app.function_name(name="job-result")
+@app.route(route="jobs/{job_id}/result", auth_level=func.AuthLevel.ANONYMOUS, methods=["GET"])
+async def job_result(req: func.HttpRequest) -> func.HttpResponse:
+    return await job_result_main(req)
+
+@app.function_name(name="bulk-generate-reviews")
+@app.route(route="bulk/generate-reviews", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+async def bulk_generate_reviews(req: func.HttpRequest) -> func.HttpResponse:
+    return await bulk_generate_reviews_main(req)
+
+@app.function_name(name="case-intake")
+@app.route(route="case-intake", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+async def case_intake(req: func.HttpRequest) -> func.HttpResponse:
+    return await case_intake_main(req)
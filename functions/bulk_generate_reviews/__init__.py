@@ -0,0 +1,47 @@
+import azure.functions as func
+import logging
+from app.config import get_settings
+from app.context import get_portfolio_service
+from app.services.bulk import BulkRunner, parse_bulk_cases
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
+from app.utils.streaming import encode_events, format_ndjson
+
+@cors_middleware
+@with_admission
+@with_deadline
+@idempotent
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a bulk review request.')
+    
+    try:
+        portfolio_service = get_portfolio_service()
+        settings = get_settings()
+        
+        try:
+            cases = parse_bulk_cases(req.get_body().decode("utf-8").splitlines())
+        except (ValueError, UnicodeDecodeError) as e:
+            return handle_response(error=str(e), status_code=400)
+        if not cases:
+            return handle_response(error="No cases in request body", status_code=400)
+        if len(cases) > settings.bulk_max_cases:
+            return handle_response(error=f"At most {settings.bulk_max_cases} cases per request; use POST /api/jobs/generate-review per case for larger batches", status_code=413)
+        
+        try:
+            concurrency = int(req.params.get("concurrency") or settings.bulk_concurrency)
+        except ValueError:
+            return handle_response(error="concurrency must be an integer", status_code=400)
+        
+        runner = BulkRunner(portfolio_service, concurrency=min(concurrency, settings.bulk_max_concurrency))
+        # HttpResponse in this Functions runtime cannot be flushed incrementally,
+        # so the NDJSON results are sent as one body once every case has finished
+        body = "".join([line async for line in encode_events(runner.run(cases), format_ndjson)])
+        
+        return func.HttpResponse(
+            body,
+            mimetype="application/x-ndjson",
+            status_code=200
+        )
+        
+    except Exception as e:
+        logging.error(f"Error generating bulk reviews: {str(e)}")
+        return handle_response(error=str(e), status_code=500)
@@ -1,8 +1,7 @@
 import azure.functions as func
 import json
 import logging
-from app.config import Settings
-from app.services.portfolio_service import PortfolioService
+from app.context import get_portfolio_service
 from app.middleware import cors_middleware, handle_response
 
 @cors_middleware
@@ -10,9 +9,8 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request for capabilities.')
     
     try:
-        # Initialize settings and service
-        settings = Settings()
-        portfolio_service = PortfolioService(settings)
+        # Shared service and connection pool for this worker
+        portfolio_service = get_portfolio_service()
         
         # Get capabilities
         capabilities = await portfolio_service.get_capabilities()
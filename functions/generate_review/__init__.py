@@ -1,18 +1,19 @@
 import azure.functions as func
 import json
 import logging
-from app.config import Settings
-from app.services.portfolio_service import PortfolioService
+from app.context import get_portfolio_service
 from app.models import CaseReviewRequest
-from app.middleware import cors_middleware, handle_response
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
 
 @cors_middleware
+@with_admission
+@with_deadline
+@idempotent
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
     
     try:
-        settings = Settings()
-        portfolio_service = PortfolioService(settings)
+        portfolio_service = get_portfolio_service()
         
         try:
             req_body = req.get_json()
@@ -29,7 +30,8 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
         
         result = await portfolio_service.generate_case_review(
             case_description=request.case_description,
-            selected_capabilities=request.selected_capabilities
+            selected_capabilities=request.selected_capabilities,
+            generation_mode=request.generation_mode
         )
         
         return handle_response(data=result.dict())
@@ -0,0 +1,49 @@
+import azure.functions as func
+import json
+import logging
+from app.context import get_portfolio_service
+from app.models import CaseReviewRequest
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
+from app.utils.streaming import encode_events, format_ndjson
+
+@cors_middleware
+@with_admission
+@with_deadline
+@idempotent
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a streaming review request.')
+    
+    try:
+        portfolio_service = get_portfolio_service()
+        
+        try:
+            req_body = req.get_json()
+        except ValueError:
+            return handle_response(error="Invalid request body", status_code=400)
+        
+        try:
+            request = CaseReviewRequest(**req_body)
+        except Exception as e:
+            return handle_response(
+                error=f"Invalid request format: {str(e)}", 
+                status_code=400
+            )
+        
+        events = portfolio_service.stream_case_review(
+            case_description=request.case_description,
+            selected_capabilities=request.selected_capabilities,
+            generation_mode=request.generation_mode
+        )
+        # HttpResponse in this Functions runtime cannot be flushed incrementally,
+        # so the NDJSON event sequence is sent as one chunked body
+        body = "".join([line async for line in encode_events(events, format_ndjson)])
+        
+        return func.HttpResponse(
+            body,
+            mimetype="application/x-ndjson",
+            status_code=200
+        )
+        
+    except Exception as e:
+        logging.error(f"Error streaming review: {str(e)}")
+        return handle_response(error=str(e), status_code=500)
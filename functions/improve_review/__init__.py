@@ -1,19 +1,20 @@
 import azure.functions as func
 import json
 import logging
-from app.config import Settings
-from app.services.portfolio_service import PortfolioService
+from app.context import get_portfolio_service
 from app.models import ImprovementRequest
-from app.middleware import cors_middleware, handle_response
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
 
 @cors_middleware
+@with_admission
+@with_deadline
+@idempotent
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request for review improvement.')
     
     try:
-        # Initialize settings and service
-        settings = Settings()
-        portfolio_service = PortfolioService(settings)
+        # Shared service and connection pool for this worker
+        portfolio_service = get_portfolio_service()
         
         # Parse request body
         try:
@@ -34,7 +35,8 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
         result = await portfolio_service.improve_case_review(
             original_case=request.original_case,
             improvement_prompt=request.improvement_prompt,
-            selected_capabilities=request.selected_capabilities
+            selected_capabilities=request.selected_capabilities,
+            case_title=request.case_title
         )
         
         return handle_response(data=result.dict())
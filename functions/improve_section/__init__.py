@@ -1,19 +1,20 @@
 import azure.functions as func
 import json
 import logging
-from app.config import Settings
-from app.services.portfolio_service import PortfolioService
+from app.context import get_portfolio_service
 from app.models import SectionImprovementRequest
-from app.middleware import cors_middleware, handle_response
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
 
 @cors_middleware
+@with_admission
+@with_deadline
+@idempotent
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request for section improvement.')
     
     try:
-        # Initialize settings and service
-        settings = Settings()
-        portfolio_service = PortfolioService(settings)
+        # Shared service and connection pool for this worker
+        portfolio_service = get_portfolio_service()
         
         # Parse request body
         try:
@@ -0,0 +1,21 @@
+import azure.functions as func
+import logging
+from app.context import get_job_manager
+from app.services.jobs import job_status
+from app.middleware import cors_middleware, handle_response
+
+@cors_middleware
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request for job status.')
+    
+    try:
+        job_manager = get_job_manager()
+        record = await job_manager.get(req.route_params.get("job_id", ""))
+        if record is None:
+            return handle_response(error="Job not found or expired", status_code=404)
+        
+        return handle_response(data=job_status(record).model_dump())
+        
+    except Exception as e:
+        logging.error(f"Error fetching job status: {str(e)}")
+        return handle_response(error=str(e), status_code=500)
@@ -0,0 +1,16 @@
+import azure.functions as func
+import logging
+from app.context import get_portfolio_service
+from app.middleware import cors_middleware, handle_response
+
+@cors_middleware
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request for metrics.')
+    
+    try:
+        portfolio_service = get_portfolio_service()
+        return handle_response(data=portfolio_service.get_metrics())
+        
+    except Exception as e:
+        logging.error(f"Error fetching metrics: {str(e)}")
+        return handle_response(error=str(e), status_code=500)
@@ -1,18 +1,19 @@
 import azure.functions as func
 import json
 import logging
-from app.config import Settings
-from app.services.portfolio_service import PortfolioService
+from app.context import get_portfolio_service
 from app.models import CapabilitySelectionRequest
-from app.middleware import cors_middleware, handle_response
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
 
 @cors_middleware
+@with_admission
+@with_deadline
+@idempotent
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request for capability selection.')
     
     try:
-        settings = Settings()
-        portfolio_service = PortfolioService(settings)
+        portfolio_service = get_portfolio_service()
         
         try:
             req_body = req.get_json()
@@ -28,11 +29,16 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             )
         
         # Use AI to select capabilities
-        selected_capabilities = await portfolio_service.select_capabilities_for_case(
+        selection = await portfolio_service.select_capabilities(
             case_description=request.case_description
         )
+        # Most users accept the suggestions, so start writing the review while they decide
+        selection.speculation_id = portfolio_service.speculate_case_review(
+            request.case_description,
+            selection.selected_capabilities
+        )
         
-        return handle_response(data={"selected_capabilities": selected_capabilities})
+        return handle_response(data=selection.model_dump())
         
     except Exception as e:
         logging.error(f"Error selecting capabilities: {str(e)}")
@@ -1,18 +1,19 @@
 import azure.functions as func
 import json
 import logging
-from app.config import Settings
-from app.services.portfolio_service import PortfolioService
+from app.context import get_portfolio_service
 from app.models import ExperienceGroupRequest
-from app.middleware import cors_middleware, handle_response
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
 
 @cors_middleware
+@with_admission
+@with_deadline
+@idempotent
 async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request for experience group selection.')
     
     try:
-        settings = Settings()
-        portfolio_service = PortfolioService(settings)
+        portfolio_service = get_portfolio_service()
         
         try:
             req_body = req.get_json()
@@ -28,11 +29,11 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
             )
         
         # Use AI to select experience groups
-        experience_groups = await portfolio_service.select_experience_groups(
+        selection = await portfolio_service.classify_experience_groups(
             case_description=request.case_description
         )
         
-        return handle_response(data={"experience_groups": experience_groups})
+        return handle_response(data=selection.model_dump())
         
     except Exception as e:
         logging.error(f"Error selecting experience groups: {str(e)}")
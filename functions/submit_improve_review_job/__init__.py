@@ -0,0 +1,47 @@
+import azure.functions as func
+import json
+import logging
+from app.context import get_job_manager
+from app.models import ImprovementJobRequest
+from app.services.jobs import JobQueueFullError, job_status
+from app.middleware import cors_middleware, handle_response, idempotent, with_admission, with_deadline
+
+@cors_middleware
+@with_admission
+@with_deadline
+@idempotent
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request to queue review improvement.')
+    
+    try:
+        job_manager = get_job_manager()
+        
+        try:
+            req_body = req.get_json()
+        except ValueError:
+            return handle_response(error="Invalid request body", status_code=400)
+        
+        try:
+            request = ImprovementJobRequest(**req_body)
+        except Exception as e:
+            return handle_response(
+                error=f"Invalid request format: {str(e)}", 
+                status_code=400
+            )
+        
+        try:
+            record = await job_manager.submit(
+                "improve_review",
+                request.model_dump(exclude={"callback_url"}),
+                callback_url=request.callback_url
+            )
+        except ValueError as e:
+            return handle_response(error=str(e), status_code=400)
+        except JobQueueFullError as e:
+            return handle_response(error=str(e), status_code=503)
+        
+        return handle_response(data=job_status(record).model_dump(), status_code=202)
+        
+    except Exception as e:
+        logging.error(f"Error queueing review improvement: {str(e)}")
+        return handle_response(error=str(e), status_code=500)
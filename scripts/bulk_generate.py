@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Generate case reviews for every case in a JSONL file.
+
+Each input line is {"id": ..., "case_description": ..., "selected_capabilities": [...]}
+(id and selected_capabilities are optional). Results are appended to the output file
+as NDJSON as soon as each case finishes, so the output doubles as the checkpoint:
+re-running with the same output file skips the cases that already succeeded.
+
+    python scripts/bulk_generate.py cases.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Settings
+from app.services.bulk import BulkRunner, parse_bulk_cases, read_completed_ids
+from app.services.portfolio_service import PortfolioService
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk case review generation over JSONL input")
+    parser.add_argument("input", type=Path, help="JSONL file with one case per line")
+    parser.add_argument("--output", type=Path, help="NDJSON results file (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, help="Cases in flight at once (default: BULK_CONCURRENCY)")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping completed cases")
+    return parser.parse_args()
+
+async def run(args) -> int:
+    settings = Settings()
+    output = args.output or args.input.with_suffix(".results.jsonl")
+    cases = parse_bulk_cases(args.input.read_text(encoding="utf-8").splitlines())
+
+    completed = set()
+    if output.exists() and not args.no_resume:
+        completed = read_completed_ids(output.read_text(encoding="utf-8").splitlines())
+    elif output.exists():
+        output.unlink()
+
+    print(f"📄 {len(cases)} cases, {len(completed)} already completed, writing to {output}")
+    service = PortfolioService(settings)
+
+    with output.open("a", encoding="utf-8") as out:
+        def checkpoint(result):
+            out.write(json.dumps({"event": "result", "data": result}) + "\n")
+            out.flush()
+            marker = "✅" if result["status"] == "ok" else "❌"
+            print(f"{marker} {result['id']} ({result['latency_seconds']:.1f}s)")
+
+        runner = BulkRunner(
+            service,
+            concurrency=args.concurrency or settings.bulk_concurrency,
+            completed_ids=completed,
+            on_result=checkpoint,
+        )
+        summary = {}
+        try:
+            async for event in runner.run(cases):
+                if event["event"] == "summary":
+                    summary = event["data"]
+        finally:
+            await service.aclose()
+
+    print("\n" + "=" * 80)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary.get("failed") else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from app.config import Settings
+from app.services.portfolio_service import PortfolioService
+
+
+def make_completion(content, prompt_tokens=10, completion_tokens=5):
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4.1-mini",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    })
+
+
+def make_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStream:
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        # Content-filter chunk without choices, as Azure sends first
+        yield SimpleNamespace(choices=[])
+        for piece in self.pieces:
+            yield make_chunk(piece)
+
+
+class FakeOpenAIClient:
+    """Records chat.completions.create calls and answers from a responder callable."""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.calls = []
+        self.headers = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=self._create,
+            with_raw_response=SimpleNamespace(create=self._create_raw),
+        ))
+
+    async def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.responder(kwargs)
+        if kwargs.get("stream"):
+            return FakeStream(content if isinstance(content, list) else [content])
+        return make_completion(content)
+
+    async def _create_raw(self, **kwargs):
+        # Look the handler up on the namespace so tests can patch create()
+        parsed = await self.chat.completions.create(**kwargs)
+        return SimpleNamespace(headers=dict(self.headers), parse=lambda: parsed)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    def factory(responder, **overrides):
+        settings = Settings()
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        settings.portfolio_output_audit_csv_path = str(tmp_path / "audit.csv")
+        client = FakeOpenAIClient(responder)
+        return PortfolioService(settings, openai_client=client), client
+
+    return factory
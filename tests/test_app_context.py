@@ -0,0 +1,27 @@
+import asyncio
+
+from app import context as app_context
+from app.config import get_settings
+
+
+def test_settings_are_validated_once_per_process():
+    assert get_settings() is get_settings()
+
+
+def test_app_context_shares_service_and_client_until_closed():
+    first = app_context.get_app_context()
+    try:
+        assert app_context.get_app_context() is first
+        assert app_context.get_portfolio_service() is first.portfolio_service
+        assert first.portfolio_service.openai_client is first.openai_client
+    finally:
+        asyncio.run(app_context.close_app_context())
+
+    assert first.closed
+    assert first.http_client.is_closed
+
+    second = app_context.get_app_context()
+    try:
+        assert second is not first
+    finally:
+        asyncio.run(app_context.close_app_context())
@@ -0,0 +1,133 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.bulk import BulkRunner, parse_bulk_cases, read_completed_ids
+from app.utils.deadline import request_deadline
+from app.utils.metrics import percentile
+
+
+class FakePortfolioService:
+    """Stands in for PortfolioService with a fixed delay per stage and peak concurrency tracking."""
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.in_flight = 0
+        self.peak = 0
+        self.generated = []
+
+    async def _stage(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+    async def select_capabilities(self, case):
+        await self._stage()
+        return SimpleNamespace(selected_capabilities=["Team working"], selection_path="local")
+
+    async def classify_experience_groups(self, case):
+        await self._stage()
+        return SimpleNamespace(experience_groups=["Urgent and unscheduled care"])
+
+    async def generate_case_review(self, case, capabilities, generation_mode=None):
+        await self._stage()
+        if case in self.fail_ids:
+            raise Exception("Error generating case review: boom")
+        self.generated.append(case)
+        return SimpleNamespace(model_dump=lambda: {"case_title": f"Title for {case}", "capabilities": capabilities})
+
+
+def run_all(runner, cases):
+    async def collect():
+        return [event async for event in runner.run(cases)]
+    return asyncio.run(collect())
+
+
+def test_parse_bulk_cases_assigns_ids_and_rejects_bad_lines():
+    cases = parse_bulk_cases(['{"case_description": "one"}', "", '{"id": 7, "case_description": "two"}'])
+
+    assert [case["id"] for case in cases] == ["case-1", "7"]
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_bulk_cases(['{"case_description": "one"}', "{not json"])
+    with pytest.raises(ValueError, match="case_description"):
+        parse_bulk_cases(['{"id": "x"}'])
+
+
+def test_read_completed_ids_ignores_failures_and_partial_lines():
+    lines = [
+        json.dumps({"event": "result", "data": {"id": "a", "status": "ok"}}),
+        json.dumps({"event": "result", "data": {"id": "b", "status": "error"}}),
+        '{"event": "result", "data": {"id": "c", "sta',
+    ]
+
+    assert read_completed_ids(lines) == {"a"}
+
+
+def test_percentile_uses_nearest_rank():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.95) == 4.0
+
+
+def test_runner_bounds_concurrency_and_reports_summary():
+    service = FakePortfolioService(fail_ids={"case 3"})
+    cases = parse_bulk_cases([json.dumps({"id": str(n), "case_description": f"case {n}"}) for n in range(6)])
+    seen = []
+
+    events = run_all(BulkRunner(service, concurrency=2, on_result=seen.append), cases)
+
+    results = [event["data"] for event in events if event["event"] == "result"]
+    summary = events[-1]["data"]
+    # Two cases in flight, each running its two selection stages concurrently
+    assert service.peak == 4
+    assert sorted(result["id"] for result in results) == [str(n) for n in range(6)]
+    assert seen == results
+    failed = next(result for result in results if result["id"] == "3")
+    assert failed["status"] == "error" and "boom" in failed["error"]
+    ok = next(result for result in results if result["id"] == "0")
+    assert ok["selection_path"] == "local"
+    assert set(ok["stage_seconds"]) == {"capabilities", "experience_groups", "generation"}
+    assert summary["total"] == 6 and summary["succeeded"] == 5 and summary["failed"] == 1
+    assert summary["latency_p95_seconds"] >= summary["latency_p50_seconds"] > 0
+
+
+def test_runner_skips_completed_cases_and_uses_provided_capabilities():
+    service = FakePortfolioService()
+    cases = parse_bulk_cases([
+        json.dumps({"id": "done", "case_description": "already generated"}),
+        json.dumps({"id": "new", "case_description": "fresh case", "selected_capabilities": ["Ethics"]}),
+    ])
+
+    events = run_all(BulkRunner(service, completed_ids={"done"}), cases)
+
+    assert service.generated == ["fresh case"]
+    assert events[0]["data"]["selection_path"] == "provided"
+    assert events[0]["data"]["review"]["capabilities"] == ["Ethics"]
+    assert events[-1]["data"]["skipped"] == 1
+
+
+def test_runner_with_nothing_pending_only_emits_summary():
+    events = run_all(BulkRunner(FakePortfolioService(), completed_ids={"a"}), [{"id": "a", "case_description": "x"}])
+
+    assert [event["event"] for event in events] == ["summary"]
+    assert events[0]["data"]["cases_per_minute"] == 0.0
+
+
+def test_cases_not_started_by_the_deadline_fail_without_calling_the_service():
+    service = FakePortfolioService()
+    cases = parse_bulk_cases([json.dumps({"id": str(n), "case_description": f"case {n}"}) for n in range(6)])
+
+    async def collect():
+        # The first two cases (two 0.01 s stages each) are in flight when the budget runs out
+        with request_deadline(0.015):
+            return [event async for event in BulkRunner(service, concurrency=2).run(cases)]
+
+    events = asyncio.run(collect())
+
+    summary = events[-1]["data"]
+    assert summary["succeeded"] == 2 and summary["failed"] == 4
+    assert service.generated == ["case 0", "case 1"]
+    assert all("deadline" in event["data"]["error"] for event in events[:-1] if event["data"]["status"] == "error")
@@ -0,0 +1,173 @@
+import asyncio
+
+from app.config import Settings, capability_content
+from app.services.capability_ranker import CAPABILITY_KEYWORDS, CapabilityRanker, tokenize
+from app.services.portfolio_service import SELECT_CAPABILITIES_INSTRUCTION
+from app.utils.capabilities import parse_capabilities
+from app.utils.prompt_builder import parse_descriptor_index
+
+SAFEGUARDING_CASE = (
+    "Safeguarding concern: child attended with mother, bruises noted, discussed with "
+    "safeguarding lead and health visitor, referral to social services."
+)
+AMBIGUOUS_CASE = (
+    "Telephone consult. Facial cellulitis. Started as ear infection 3 days ago, now spread to "
+    "cheek and periorbital. Patient on flucloxacillin but not improving. Switched to "
+    "co-amoxiclav. Safety netted re: eye pain/vision."
+)
+CHEST_PAIN_CASE = (
+    "58 year old man with central crushing chest pain radiating to left arm for 40 minutes. ECG showed "
+    "ST elevation in the inferior leads. Gave aspirin 300mg, called 999 and stayed with him until "
+    "paramedics arrived."
+)
+
+# Labelled notes the thresholds were set from: (case, capabilities a GP trainer expects among the 2-3 selected)
+LABELLED_CASES = [
+    (CHEST_PAIN_CASE, ["Clinical management", "Data gathering and interpretation"]),
+    (
+        "I prescribed methotrexate 10mg daily instead of weekly. The pharmacist rang to query it. No harm "
+        "came to the patient, I apologised and we completed a significant event analysis at the practice "
+        "meeting. I reflected on my own workload that day.",
+        ["Fitness to practise", "Organisation, management and leadership"],
+    ),
+    (SAFEGUARDING_CASE, ["Holistic practice, health promotion and safeguarding"]),
+    (AMBIGUOUS_CASE, ["Clinical management", "Decision-making and diagnosis"]),
+    (
+        "82 year old woman on 14 regular medications with CKD, heart failure and recurrent falls. Reviewed "
+        "her medication list, stopped amitriptyline and reduced her diuretic. Discussed with her daughter.",
+        ["Medical complexity", "Clinical management"],
+    ),
+    (
+        "Jehovah's Witness patient with severe anaemia refused a blood transfusion. Assessed capacity, "
+        "respected her autonomy and explored alternatives such as iron infusion.",
+        ["An ethical approach"],
+    ),
+    (
+        "Deaf patient using BSL interpreter presented with abdominal pain. Took time to establish rapport, "
+        "checked understanding and explored her ideas, concerns and expectations.",
+        ["Communicating and consulting"],
+    ),
+    (
+        "Young man with headache. Examined fundi, cranial nerves and checked for neck stiffness. Neurological "
+        "examination normal. Considered migraine vs tension type headache and red flags for raised "
+        "intracranial pressure.",
+        ["Clinical examination and procedural skills", "Decision-making and diagnosis"],
+    ),
+    (
+        "Ran an audit of asthma patients using more than 12 SABA inhalers a year and switched eligible "
+        "patients to dry powder inhalers to reduce the practice carbon footprint.",
+        ["Community health and environmental sustainability", "Performance, learning and teaching"],
+    ),
+    (
+        "Taught the medical students about inhaler technique in a tutorial and asked for their feedback afterwards.",
+        ["Performance, learning and teaching"],
+    ),
+    (
+        "Elderly man with COPD exacerbation. Coordinated with the district nurse and community respiratory "
+        "team to keep him at home and handed over to the out of hours service.",
+        ["Team working"],
+    ),
+    (
+        "Woman with tiredness. Bloods showed TSH 12 and low free T4. Interpreted results, diagnosed "
+        "hypothyroidism and started levothyroxine 50mcg with a repeat TFT in 6 weeks.",
+        ["Data gathering and interpretation", "Clinical management"],
+    ),
+]
+
+
+def build_ranker():
+    return CapabilityRanker.from_sources(
+        parse_capabilities(capability_content),
+        parse_descriptor_index(Settings.model_fields["SYSTEM_PROMPT"].default),
+    )
+
+
+def test_ranker_scores_every_capability_and_puts_the_obvious_one_first():
+    ranking = build_ranker().rank(SAFEGUARDING_CASE)
+
+    assert len(ranking.scores) == 13
+    assert ranking.selected[0] == "Holistic practice, health promotion and safeguarding"
+    assert ranking.confident
+    assert 2 <= len(ranking.selected) <= 3
+
+
+def test_every_keyword_survives_tokenization():
+    for keywords in CAPABILITY_KEYWORDS.values():
+        for keyword in keywords:
+            assert tokenize(keyword), keyword
+
+
+def test_ranker_is_not_confident_without_evidence():
+    ranking = build_ranker().rank("Lorem ipsum dolor sit amet")
+
+    assert not ranking.confident
+
+
+def test_calibrated_thresholds_make_no_wrong_local_answers_on_labelled_cases():
+    ranker = build_ranker()
+    shortlist_size = Settings.model_fields["capability_ranker_shortlist_size"].default
+
+    confident = 0
+    for case, expected in LABELLED_CASES:
+        ranking = ranker.rank(case)
+        assert set(expected) <= set(ranking.top(shortlist_size)), case
+        if ranking.confident:
+            confident += 1
+            assert set(expected) <= set(ranking.selected), case
+    assert confident > 0
+
+
+def test_ranker_only_suggests_by_default(make_service):
+    service, client = make_service(
+        lambda kwargs: "Clinical management\nData gathering and interpretation",
+        capability_ranker_enabled=True,
+    )
+
+    selection = asyncio.run(service.select_capabilities(SAFEGUARDING_CASE))
+
+    assert Settings.model_fields["capability_ranker_enabled"].default is False
+    assert selection.selection_path == "llm_shortlist"
+    assert len(client.calls) == 1
+
+
+def test_confident_case_is_answered_without_an_llm_call(make_service):
+    service, client = make_service(
+        lambda kwargs: "Team working",
+        capability_ranker_enabled=True,
+        capability_ranker_answer_locally=True,
+    )
+
+    selection = asyncio.run(service.select_capabilities(SAFEGUARDING_CASE))
+
+    assert selection.selection_path == "local"
+    assert "Holistic practice, health promotion and safeguarding" in selection.selected_capabilities
+    assert client.calls == []
+    assert service.metrics.get("capability_selection", path="local") == 1
+
+
+def test_ambiguous_case_sends_only_the_shortlist(make_service):
+    service, client = make_service(
+        lambda kwargs: "Clinical management\nCommunicating and consulting",
+        capability_ranker_enabled=True,
+        capability_ranker_shortlist_size=4,
+    )
+
+    selection = asyncio.run(service.select_capabilities(AMBIGUOUS_CASE))
+
+    assert selection.selection_path == "llm_shortlist"
+    assert selection.selected_capabilities == ["Clinical management", "Communicating and consulting"]
+    prompt = client.calls[0]["messages"][1]["content"]
+    listed = [name for name in service.capabilities if f"\n{name}\n- " in prompt]
+    assert len(listed) == 4
+    assert len(prompt) < len(capability_content)
+
+
+def test_ranker_is_disabled_by_default(make_service):
+    service, client = make_service(lambda kwargs: "Team working\nClinical management")
+
+    selection = asyncio.run(service.select_capabilities(CHEST_PAIN_CASE))
+
+    assert selection.selection_path == "llm_full"
+    prompt = client.calls[0]["messages"][1]["content"]
+    assert capability_content in prompt
+    assert prompt.endswith(f"{CHEST_PAIN_CASE}\n\n{SELECT_CAPABILITIES_INSTRUCTION}")
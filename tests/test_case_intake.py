@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.models import CapabilitySelectionResponse, CaseReviewResponse, CaseReviewSection, ExperienceGroupResponse
+
+
+def review(capabilities):
+    return CaseReviewResponse(
+        case_title="Chest Pain",
+        review_content="Brief description:\nA case.",
+        sections=CaseReviewSection(brief_description="A case.", capabilities={}, reflection="", learning_needs=""),
+    )
+
+
+def stub_stages(service, groups_delay=0.05, fail=None):
+    calls = []
+
+    async def select_capabilities(case):
+        calls.append("capabilities")
+        await asyncio.sleep(0.01)
+        if fail == "capabilities":
+            raise Exception("Error selecting capabilities: boom")
+        return CapabilitySelectionResponse(selected_capabilities=["Team working"], selection_path="local")
+
+    async def classify_experience_groups(case):
+        calls.append("experience_groups")
+        await asyncio.sleep(groups_delay)
+        return ExperienceGroupResponse(experience_groups=["Urgent and unscheduled care"], selection_path="llm")
+
+    async def generate_case_review(case, capabilities, generation_mode=None):
+        calls.append(("review", tuple(capabilities), generation_mode))
+        await asyncio.sleep(0.01)
+        return review(capabilities)
+
+    service.select_capabilities = select_capabilities
+    service.classify_experience_groups = classify_experience_groups
+    service.generate_case_review = generate_case_review
+    return calls
+
+
+def collect(events):
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+
+def test_generation_overlaps_experience_group_selection(make_service):
+    service, _ = make_service(lambda kwargs: "")
+    calls = stub_stages(service, groups_delay=0.05)
+
+    events = collect(service.run_case_intake("A long enough case description"))
+
+    # The review finishes before the slower experience group lookup
+    assert [event["event"] for event in events] == ["capabilities", "review", "experience_groups", "complete"]
+    assert calls[:2] == ["capabilities", "experience_groups"]
+    complete = events[-1]["data"]
+    assert complete["selected_capabilities"] == ["Team working"]
+    assert complete["capability_selection_path"] == "local"
+    assert complete["experience_groups"] == ["Urgent and unscheduled care"]
+    assert complete["review"]["case_title"] == "Chest Pain"
+    assert events[2]["data"]["elapsed_seconds"] >= 0.05
+
+
+def test_provided_capabilities_skip_selection(make_service):
+    service, _ = make_service(lambda kwargs: "")
+    calls = stub_stages(service, groups_delay=0)
+
+    events = collect(service.run_case_intake(
+        "A long enough case description", ["Ethics"], generation_mode="pipelined"
+    ))
+
+    assert "capabilities" not in calls
+    assert ("review", ("Ethics",), "pipelined") in calls
+    assert events[-1]["data"]["capability_selection_path"] == "provided"
+
+
+def test_failed_stage_stops_the_pipeline(make_service):
+    service, _ = make_service(lambda kwargs: "")
+    calls = stub_stages(service, groups_delay=0, fail="capabilities")
+
+    with pytest.raises(Exception, match="Error running case intake: Error selecting capabilities: boom"):
+        collect(service.run_case_intake("A long enough case description"))
+
+    assert not any(isinstance(call, tuple) for call in calls)
@@ -0,0 +1,190 @@
+import asyncio
+from types import SimpleNamespace
+
+import azure.functions as func
+import httpx
+import openai
+import pytest
+from fastapi import FastAPI, HTTPException
+
+import app.middleware as middleware
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpenError
+from app.services.llm_router import ChatProvider, LLMRouter, ProviderResponse
+from app.utils.admission import AdmissionController, AdmissionMiddleware
+
+
+def status_error(status_code):
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://example.com"))
+    return openai.APIStatusError("upstream error", response=response, body=None)
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail_with(status_code):
+    raise status_error(status_code)
+
+
+def trip(breaker, calls=2, status_code=500):
+    async def run():
+        for _ in range(calls):
+            with pytest.raises(openai.APIStatusError):
+                await breaker.call(lambda: fail_with(status_code))
+
+    asyncio.run(run())
+
+
+def test_breaker_opens_on_failures_and_fails_fast():
+    breaker = CircuitBreaker("azure", min_calls=2, open_seconds=30)
+
+    trip(breaker)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        asyncio.run(breaker.call(succeed))
+    assert 0 < error.value.retry_after <= 30
+    assert breaker.metrics.get("circuit_breaker_rejected", deployment="azure") == 1
+
+
+def test_bad_requests_do_not_count_against_the_deployment():
+    breaker = CircuitBreaker("azure", min_calls=2)
+
+    trip(breaker, status_code=400)
+
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = CircuitBreaker("azure", min_calls=2, slow_call_seconds=0, slow_call_threshold=1.0)
+
+    asyncio.run(breaker.call(succeed))
+    asyncio.run(breaker.call(succeed))
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker("azure", min_calls=2, open_seconds=0.01)
+    trip(breaker)
+    asyncio.run(asyncio.sleep(0.02))
+
+    assert breaker.state == HALF_OPEN
+    trip(breaker, calls=1)
+    assert breaker.state == OPEN
+
+    asyncio.run(asyncio.sleep(0.02))
+    assert asyncio.run(breaker.call(succeed)) == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_router_skips_providers_with_an_open_circuit():
+    class Provider(ChatProvider):
+        def __init__(self, name):
+            super().__init__(name, "m")
+            self.calls = 0
+
+        async def create(self, request):
+            self.calls += 1
+            return ProviderResponse("answer from " + self.name)
+
+    east, west = Provider("east"), Provider("west")
+    breakers = CircuitBreakers(min_calls=1)
+    breakers.get("east")._open()
+    router = LLMRouter([east, west], breakers=breakers)
+
+    response = asyncio.run(router.create({"messages": []}))
+
+    assert response.result == "answer from west"
+    assert east.calls == 0
+    breakers.get("west")._open()
+    with pytest.raises(CircuitOpenError):
+        router.order()
+
+
+def test_open_circuit_serves_a_local_title_and_fails_other_calls_fast(make_service):
+    service, client = make_service(lambda kwargs: "Chest Pain Review", circuit_breaker_min_calls=1)
+    service.circuit_breakers.get(service.settings.azure_openai_deployment)._open()
+
+    title = asyncio.run(service.generate_title("Elderly woman with a fall at home. Lives alone."))
+
+    assert title == "Elderly woman with a fall at"
+    assert client.calls == []
+    assert service.metrics.get("llm_degraded", operation="generate_title") == 1
+    with pytest.raises(Exception, match="circuit open"):
+        asyncio.run(service.improve_section("reflection", "Text", "Expand"))
+
+
+def make_app(controller):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, get_controller=lambda: controller)
+    release = asyncio.Event()
+
+    @app.post("/api/generate-review")
+    async def generate(payload: dict):
+        if payload.get("wait"):
+            await release.wait()
+        if payload.get("fail"):
+            raise HTTPException(status_code=500, detail="circuit open")
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app, release
+
+
+def test_admission_rejects_posts_beyond_the_in_flight_limit():
+    controller = AdmissionController(max_in_flight=1, retry_after_seconds=3)
+    app, release = make_app(controller)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/api/generate-review", json={"wait": True}))
+            while controller.in_flight == 0:
+                await asyncio.sleep(0.001)
+            rejected = await client.post("/api/generate-review", json={})
+            health = await client.get("/health")
+            release.set()
+            return await first, rejected, health
+
+    first, rejected, health = asyncio.run(run())
+
+    assert first.status_code == 200
+    assert rejected.status_code == 503 and rejected.headers["retry-after"] == "3"
+    assert health.status_code == 200
+    assert controller.metrics.get("requests_rejected", reason="in_flight") == 1
+    assert controller.in_flight == 0
+
+
+def test_failures_caused_by_open_circuits_become_503_with_retry_after():
+    controller = AdmissionController(queue_depth=lambda: 0, circuit_retry_after=lambda: 12.5)
+    app, _ = make_app(controller)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/generate-review", json={"fail": True})
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+
+
+def test_functions_decorator_rejects_when_the_queue_is_full(monkeypatch):
+    controller = AdmissionController(max_queue_depth=5, queue_depth=lambda: 5)
+    monkeypatch.setattr(middleware, "get_app_context", lambda: SimpleNamespace(admission=controller))
+
+    @middleware.with_admission
+    async def handler(req):
+        return middleware.handle_response(data={"ok": True})
+
+    req = func.HttpRequest(method="POST", url="http://localhost/api/select-capabilities", body=b"{}")
+    response = asyncio.run(handler(req))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert controller.metrics.get("requests_rejected", reason="queue_depth") == 1
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.utils.deadline import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    has_budget,
+    no_deadline,
+    parse_route_deadlines,
+    remaining_seconds,
+    request_budget,
+    request_deadline,
+)
+from app.utils.metrics import MetricsRegistry
+
+from conftest import make_completion
+
+ROUTES = parse_route_deadlines("generate-review=120, improve-section=60")
+
+
+def test_request_budget_uses_route_config_shortened_by_header():
+    assert ROUTES == {"generate-review": 120.0, "improve-section": 60.0}
+    assert request_budget("/api/generate-review", None, ROUTES) == 120.0
+    assert request_budget("/api/generate-review", "30", ROUTES) == 30.0
+    # A client can only shorten the route's budget
+    assert request_budget("/api/improve-section", "600", ROUTES) == 60.0
+    assert request_budget("/api/metrics", None, ROUTES) is None
+    assert request_budget("/api/metrics", "nonsense", ROUTES, default_seconds=10) == 10.0
+
+
+def test_nested_deadlines_only_shorten_and_background_work_can_opt_out():
+    assert remaining_seconds() is None
+    with request_deadline(10):
+        with request_deadline(60):
+            assert remaining_seconds() <= 10
+        assert not has_budget(30)
+        with no_deadline():
+            assert has_budget(30)
+
+
+def test_slow_upstream_call_is_abandoned_at_the_deadline(make_service):
+    service, client = make_service(lambda kwargs: "Generated Title")
+
+    async def slow_create(**kwargs):
+        client.calls.append(kwargs)
+        await asyncio.sleep(1)
+        return make_completion("too late")
+
+    client.chat.completions.create = slow_create
+
+    async def run():
+        with request_deadline(0.05):
+            await service._create_completion("generate_review", [{"role": "user", "content": "x"}], 100, 0.5)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+
+    assert service.metrics.get("llm_cancelled", operation="generate_review", reason="deadline") == 1
+    assert service.metrics.get("llm_cancelled_max_tokens", operation="generate_review", reason="deadline") == 100
+
+
+def test_title_call_is_skipped_when_the_budget_is_nearly_spent(make_service):
+    service, client = make_service(lambda kwargs: "Generated Title", title_min_budget_seconds=5.0)
+
+    async def run():
+        with request_deadline(2):
+            return await service.generate_title("A long enough case description")
+
+    assert asyncio.run(run()) == "Case Review"
+    assert client.calls == []
+    assert service.metrics.get("optional_steps_skipped", step="generate_title") == 1
+
+
+def test_middleware_cancels_the_handler_when_the_client_disconnects():
+    metrics = MetricsRegistry()
+    observed = {}
+
+    async def app(scope, receive, send):
+        await receive()
+        observed["remaining"] = remaining_seconds()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            observed["cancelled"] = True
+            raise
+
+    messages = [{"type": "http.request", "body": b"{}", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(0.02)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        observed.setdefault("sent", []).append(message)
+
+    middleware = DeadlineMiddleware(app, ROUTES, get_metrics=lambda: metrics)
+    scope = {"type": "http", "method": "POST", "path": "/api/generate-review", "headers": [(b"x-request-timeout", b"30")]}
+
+    asyncio.run(asyncio.wait_for(middleware(scope, receive, send), 1))
+
+    assert observed["cancelled"] is True
+    assert 29 < observed["remaining"] <= 30
+    assert "sent" not in observed
+    assert metrics.get("requests_cancelled", reason="disconnect") == 1
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from app.services.experience_group_classifier import (
+    CHILDREN_GROUP,
+    ExperienceGroupClassifier,
+    apply_age_constraint,
+    extract_ages,
+    involves_children,
+    patient_age,
+)
+
+VULNERABLE_GROUP = "People with health disadvantage and vulnerabilities"
+
+
+def test_extract_ages_handles_common_trainee_shorthand():
+    assert extract_ages("I saw a 65-year-old man") == [65]
+    assert extract_ages("34F attended with her partner") == [34]
+    assert extract_ages("aged 17, attended alone") == [17]
+    assert extract_ages("18yo with family history") == [18]
+    assert extract_ages("a 6 week old baby") == [0]
+    assert extract_ages("BP 150/95, HR 102") == []
+
+
+def test_explicit_under_19_is_decided_locally():
+    classification = ExperienceGroupClassifier().classify("12 year old girl with asthma review")
+
+    assert classification.confident
+    assert CHILDREN_GROUP in classification.groups
+    assert "People with long-term conditions" in classification.groups
+
+
+def test_adults_are_never_placed_in_the_children_group():
+    classification = ExperienceGroupClassifier().classify("22-year-old student, parents worried, chlamydia")
+
+    assert CHILDREN_GROUP not in classification.groups
+    assert apply_age_constraint([CHILDREN_GROUP, "Mental health"], 45) == ["Mental health"]
+    assert apply_age_constraint([CHILDREN_GROUP], 45) == [
+        "Clinical problems not linked to a specific clinical experience group"
+    ]
+
+
+def test_durations_are_not_read_as_ages():
+    assert extract_ages("Man with type 2 diabetes for 10 years, HbA1c rising") == []
+    assert extract_ages("Symptoms for 2 years, low mood and anxiety") == []
+    assert extract_ages("Diagnosed with COPD 3 years ago, a 5 year history of cough") == []
+    assert extract_ages("Lives alone. Aged 72, diabetic for 20 years") == [72]
+
+    diabetes = ExperienceGroupClassifier().classify("Man with type 2 diabetes for 10 years, poor control")
+    low_mood = ExperienceGroupClassifier().classify("Symptoms for 2 years, low mood and anxiety")
+
+    assert CHILDREN_GROUP not in diabetes.groups
+    assert CHILDREN_GROUP not in low_mood.groups
+    assert low_mood.groups == ["Mental health"]
+
+
+def test_the_constraint_uses_the_patients_age_and_keeps_their_children():
+    text = "34 year old heroin user. Safeguarding concerns for her 4 year old son."
+    ages = extract_ages(text)
+
+    assert ages == [34, 4]
+    assert patient_age(ages) == 34
+    assert involves_children(text, ages)
+    assert apply_age_constraint([CHILDREN_GROUP, VULNERABLE_GROUP], patient_age(ages), True) == [
+        CHILDREN_GROUP, VULNERABLE_GROUP,
+    ]
+    assert not ExperienceGroupClassifier().classify(text).confident
+
+
+def test_ambiguous_log_is_not_confident():
+    classification = ExperienceGroupClassifier().classify(
+        "Telephone consult. Facial cellulitis. Switched to co-amoxiclav. Safety netted."
+    )
+
+    assert not classification.confident
+
+
+@pytest.mark.parametrize("text, group", [
+    ("Telephone review of a rash. No safeguarding concerns.", VULNERABLE_GROUP),
+    ("Viral wheeze. Advised to call 999 or attend A&E if breathing difficulty.", "Urgent and unscheduled care"),
+    ("Ongoing back pain. Denies low mood, no suicidal ideation.", "Mental health"),
+    ("Abdominal pain, not pregnant, urine dip clear.", "Gender, reproductive and sexual health"),
+])
+def test_negated_and_safety_net_terms_are_not_evidence(text, group):
+    classification = ExperienceGroupClassifier().classify(text)
+
+    assert dict(classification.scores)[group] == 0
+    assert group not in classification.groups
+
+
+def test_terms_outside_the_negated_clause_still_count():
+    classification = ExperienceGroupClassifier().classify(
+        "No chest pain. Low mood and anxiety since losing her job, but no suicidal ideation."
+    )
+
+    assert classification.groups == ["Mental health"]
+
+
+def test_rules_are_off_by_default(make_service):
+    service, client = make_service(lambda kwargs: "Urgent and unscheduled care")
+
+    selection = asyncio.run(service.classify_experience_groups("Called 999 for a blue light ambulance"))
+
+    assert service.experience_group_classifier is None
+    assert selection.selection_path == "llm"
+    assert len(client.calls) == 1
+
+
+def test_confident_log_skips_the_llm(make_service):
+    service, client = make_service(lambda kwargs: "Mental health", experience_group_rules_enabled=True)
+
+    selection = asyncio.run(service.classify_experience_groups("Called 999 for a blue light ambulance"))
+
+    assert selection.experience_groups == ["Urgent and unscheduled care"]
+    assert selection.selection_path == "local"
+    assert client.calls == []
+    assert service.metrics.get("llm_calls_avoided", operation="select_experience_groups") == 1
+
+
+def test_llm_answer_still_obeys_the_age_constraint(make_service):
+    service, client = make_service(lambda kwargs: f"{CHILDREN_GROUP}\nPeople with long-term conditions")
+
+    groups = asyncio.run(service.select_experience_groups("45 year old with a rash on his arm"))
+
+    assert len(client.calls) == 1
+    assert groups == ["People with long-term conditions"]
+    assert service.metrics.get("experience_group_selection", path="llm") == 1
+
+
+def test_llm_answer_keeps_the_children_group_for_safeguarding_a_patients_children(make_service):
+    service, client = make_service(lambda kwargs: f"{CHILDREN_GROUP}\n{VULNERABLE_GROUP}")
+
+    groups = asyncio.run(service.select_experience_groups(
+        "28 year old mum using heroin, safeguarding referral made for her children"
+    ))
+
+    assert len(client.calls) == 1
+    assert groups == [CHILDREN_GROUP, VULNERABLE_GROUP]
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from app.services.hedging import HedgePolicy
+from app.services.llm_router import ChatProvider, LLMRouter
+from app.utils.metrics import MetricsRegistry
+
+from conftest import make_completion
+
+
+def make_attempt(primary_delay, hedge_delay=0.0, fail_primary=False, queued=0.0):
+    state = {"started": [], "cancelled": []}
+
+    async def attempt(hedge, sent):
+        name = "hedge" if hedge else "primary"
+        state["started"].append(name)
+        try:
+            if not hedge:
+                # Waiting for scheduler admission
+                await asyncio.sleep(queued)
+            sent()
+            await asyncio.sleep(hedge_delay if hedge else primary_delay)
+        except asyncio.CancelledError:
+            state["cancelled"].append(name)
+            raise
+        if fail_primary and not hedge:
+            raise Exception("primary failed")
+        return name
+
+    return attempt, state
+
+
+def make_policy(**kwargs):
+    metrics = MetricsRegistry()
+    kwargs.setdefault("default_delay_seconds", 0.02)
+    return HedgePolicy(["generate_title"], metrics=metrics, **kwargs), metrics
+
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    policy, metrics = make_policy()
+    attempt, state = make_attempt(primary_delay=5)
+
+    result = asyncio.run(policy.run("generate_title", attempt, cost=50))
+
+    assert result == "hedge"
+    assert state["cancelled"] == ["primary"]
+    assert metrics.get("llm_hedges", operation="generate_title", outcome="sent") == 1
+    assert metrics.get("llm_hedges", operation="generate_title", outcome="won") == 1
+    assert metrics.get("llm_hedge_cancelled_max_tokens", operation="generate_title") == 50
+    assert policy.in_flight == 0
+
+
+def test_fast_call_is_not_hedged():
+    policy, metrics = make_policy()
+    attempt, state = make_attempt(primary_delay=0)
+
+    assert asyncio.run(policy.run("generate_title", attempt)) == "primary"
+    assert state["started"] == ["primary"]
+    assert metrics.get("llm_hedges", operation="generate_title", outcome="sent") == 0
+
+
+def test_time_queued_for_admission_does_not_trigger_a_hedge():
+    policy, metrics = make_policy()
+    attempt, state = make_attempt(primary_delay=0.005, queued=0.1)
+
+    assert asyncio.run(policy.run("generate_title", attempt)) == "primary"
+    assert state["started"] == ["primary"]
+    assert metrics.get("llm_hedges", operation="generate_title", outcome="sent") == 0
+
+
+def test_failed_primary_is_answered_by_the_hedge():
+    policy, _ = make_policy()
+    attempt, _ = make_attempt(primary_delay=0.05, hedge_delay=0.2, fail_primary=True)
+
+    assert asyncio.run(policy.run("generate_title", attempt)) == "hedge"
+
+
+def test_hedge_share_is_capped():
+    policy, metrics = make_policy(max_fraction=0.1)
+
+    async def run():
+        for _ in range(3):
+            attempt, _ = make_attempt(primary_delay=0.05)
+            await policy.run("generate_title", attempt)
+
+    asyncio.run(run())
+
+    assert metrics.get("llm_hedges", operation="generate_title", outcome="sent") == 1
+    assert metrics.get("llm_hedges", operation="generate_title", outcome="capped") == 2
+
+
+def test_threshold_follows_the_operations_latency_percentile():
+    policy, _ = make_policy(min_samples=5, percentile_fraction=0.9, min_delay_seconds=0)
+
+    async def run():
+        for delay in (0.01, 0.01, 0.01, 0.01, 0.03):
+            attempt, _ = make_attempt(primary_delay=delay)
+            await policy.run("generate_title", attempt)
+
+    asyncio.run(run())
+
+    assert policy.delay("generate_title") == pytest.approx(0.03, abs=0.02)
+    assert policy.delay("select_capabilities") == 0.02
+
+
+def test_hedges_prefer_a_provider_without_requests_in_flight():
+    class Provider(ChatProvider):
+        async def create(self, request):
+            raise NotImplementedError
+
+    first, second = Provider("east", "m"), Provider("west", "m")
+    router = LLMRouter([first, second])
+    router.in_flight["east"] = 1
+
+    assert router.order(prefer_idle=True)[0] is second
+
+
+def test_service_hedges_title_generation(make_service):
+    service, client = make_service(
+        lambda kwargs: "Chest Pain Review",
+        llm_hedging_enabled=True,
+        llm_hedging_default_delay_seconds=0.02,
+    )
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return make_completion("Chest Pain Review")
+
+    client.chat.completions.create = create
+
+    title = asyncio.run(asyncio.wait_for(service.generate_title("A long enough case description"), 2))
+
+    assert title == "Chest Pain Review"
+    assert len(calls) == 2
+    assert service.metrics.get("llm_hedges", operation="generate_title", outcome="won") == 1
@@ -0,0 +1,167 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import azure.functions as func
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import app.middleware as middleware
+from app.services.idempotency import (
+    IdempotencyConflictError,
+    IdempotencyMiddleware,
+    IdempotencyStore,
+    StoredResponse,
+    request_fingerprint,
+)
+
+
+def ok(body=b"{}", status_code=200):
+    return StoredResponse(status_code, [("content-type", "application/json")], body)
+
+
+def test_fingerprint_ignores_json_key_order_and_spacing():
+    assert request_fingerprint(b'{"a": 1, "b": 2}') == request_fingerprint(b'{"b":2,"a":1}')
+    assert request_fingerprint(b'{"a": 1}') != request_fingerprint(b'{"a": 2}')
+
+
+def test_concurrent_retry_joins_and_later_retry_replays():
+    store = IdempotencyStore()
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ok(b'{"review": 1}')
+
+    async def run():
+        first, second = await asyncio.gather(
+            store.run("/api/generate-review", "key", "fp", execute),
+            store.run("/api/generate-review", "key", "fp", execute),
+        )
+        third = await store.run("/api/generate-review", "key", "fp", execute)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert first[1] is False and second[1] is True and third[1] is True
+    assert third[0].body == b'{"review": 1}'
+    assert store.metrics.get("idempotency_requests", outcome="joined") == 1
+    assert store.metrics.get("idempotency_requests", outcome="replayed") == 1
+
+
+def test_same_key_with_different_body_is_rejected():
+    store = IdempotencyStore()
+
+    async def run():
+        await store.run("/api/improve-section", "key", "fp-1", lambda: asyncio.sleep(0, ok()))
+        # Keys are scoped per route
+        await store.run("/api/generate-review", "key", "fp-2", lambda: asyncio.sleep(0, ok()))
+        await store.run("/api/improve-section", "key", "fp-2", lambda: asyncio.sleep(0, ok()))
+
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(run())
+
+
+def test_server_errors_and_exceptions_are_not_stored():
+    store = IdempotencyStore()
+    calls = []
+
+    async def failing():
+        calls.append("raise")
+        raise Exception("upstream timeout")
+
+    async def server_error():
+        calls.append("500")
+        return ok(status_code=500)
+
+    async def run():
+        with pytest.raises(Exception, match="upstream timeout"):
+            await store.run("/r", "key", "fp", failing)
+        await store.run("/r", "key", "fp", server_error)
+        return await store.run("/r", "key", "fp", lambda: asyncio.sleep(0, ok()))
+
+    response, replayed = asyncio.run(run())
+
+    assert calls == ["raise", "500"]
+    assert replayed is False and len(store) == 1
+
+
+def test_finished_entries_expire_and_are_evicted():
+    store = IdempotencyStore(ttl_seconds=0.01, max_entries=2)
+
+    async def run():
+        for key in ["a", "b", "c"]:
+            await store.run("/r", key, "fp", lambda: asyncio.sleep(0, ok()))
+        assert len(store) == 2
+        await asyncio.sleep(0.02)
+        return await store.run("/r", "c", "fp", lambda: asyncio.sleep(0, ok(b"new")))
+
+    response, replayed = asyncio.run(run())
+
+    assert replayed is False and response.body == b"new"
+
+
+def test_asgi_middleware_replays_post_responses():
+    store = IdempotencyStore()
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, get_store=lambda: store)
+    calls = []
+
+    @app.post("/api/generate-review")
+    async def generate(payload: dict):
+        calls.append(payload)
+        return {"count": len(calls)}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"Idempotency-Key": "abc"}
+            first = await client.post("/api/generate-review", json={"case": 1}, headers=headers)
+            second = await client.post("/api/generate-review", json={"case": 1}, headers=headers)
+            conflict = await client.post("/api/generate-review", json={"case": 2}, headers=headers)
+            unkeyed = await client.post("/api/generate-review", json={"case": 1})
+            return first, second, conflict, unkeyed
+
+    first, second, conflict, unkeyed = asyncio.run(run())
+
+    assert first.json() == second.json() == {"count": 1}
+    assert "idempotent-replayed" not in first.headers
+    assert second.headers["idempotent-replayed"] == "true"
+    assert conflict.status_code == 422 and conflict.json()["error"] is True
+    assert unkeyed.json() == {"count": 2}
+
+
+def test_functions_decorator_replays_handler_response(monkeypatch):
+    store = IdempotencyStore()
+    monkeypatch.setattr(middleware, "get_app_context", lambda: SimpleNamespace(idempotency_store=store))
+    calls = []
+
+    @middleware.idempotent
+    async def handler(req):
+        calls.append(req)
+        return middleware.handle_response(data={"count": len(calls)})
+
+    def request(body):
+        return func.HttpRequest(
+            method="POST",
+            url="http://localhost/api/improve-section",
+            headers={"Idempotency-Key": "abc"},
+            body=json.dumps(body).encode(),
+        )
+
+    async def run():
+        first = await handler(request({"section": 1}))
+        second = await handler(request({"section": 1}))
+        conflict = await handler(request({"section": 2}))
+        return first, second, conflict
+
+    first, second, conflict = asyncio.run(run())
+
+    assert json.loads(second.get_body()) == {"count": 1}
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.mimetype == "application/json"
+    assert conflict.status_code == 422
+    assert len(calls) == 1
@@ -0,0 +1,96 @@
+import asyncio
+
+from app.services.improvement_planner import plan_improvement
+from app.utils.text_processing import extract_sections, locate_sections, splice_sections
+
+REVIEW = """Title: Crushing Chest Pain
+
+Brief description:
+I saw a 65 year old man with chest pain.
+
+Capability: Team working
+Justification: I handed over to the paramedics.
+
+Capability: Clinical management
+I gave aspirin and GTN.
+
+Reflection: I reflected on early ECGs.
+
+Learning needs identified from this event:
+Review ACS guidance."""
+
+CAPABILITIES = ["Team working", "Clinical management"]
+
+
+def test_locate_sections_finds_each_body():
+    spans = locate_sections(REVIEW)
+
+    assert [(span.section, span.capability) for span in spans] == [
+        ("brief_description", None),
+        ("capability", "Team working"),
+        ("capability", "Clinical management"),
+        ("reflection", None),
+        ("learning_needs", None),
+    ]
+    assert REVIEW[spans[1].body_start:spans[1].end] == "I handed over to the paramedics."
+    assert splice_sections(REVIEW, [(spans[3], "New reflection.")]) == REVIEW.replace(
+        "I reflected on early ECGs.", "New reflection."
+    )
+
+
+def test_planner_targets_named_sections_and_capabilities():
+    assert plan_improvement("Make the reflection more detailed", CAPABILITIES).targets == [("reflection", None)]
+    assert plan_improvement("Expand the team working justification", CAPABILITIES).targets == [
+        ("capability", "Team working")
+    ]
+    assert plan_improvement("Strengthen the capabilities", CAPABILITIES).targets == [
+        ("capability", "Team working"),
+        ("capability", "Clinical management"),
+    ]
+
+
+def test_planner_falls_back_to_full_rewrite_when_unclear_or_global():
+    assert plan_improvement("Make it better", CAPABILITIES).full_rewrite
+    assert plan_improvement("Change the patient to female", CAPABILITIES).full_rewrite
+    assert plan_improvement("Use British spelling throughout the reflection", CAPABILITIES).full_rewrite
+
+
+def test_targeted_improvement_only_regenerates_touched_sections(make_service):
+    service, client = make_service(lambda kwargs: "Reflection: A deeper reflection.\n\nWith a second paragraph.")
+
+    result = asyncio.run(
+        service.improve_case_review(REVIEW, "Expand the reflection", CAPABILITIES, case_title="Crushing Chest Pain")
+    )
+
+    assert len(client.calls) == 1
+    assert result.review_content == REVIEW.replace(
+        "I reflected on early ECGs.", "A deeper reflection.\n\nWith a second paragraph."
+    )
+    original = extract_sections(REVIEW, CAPABILITIES)
+    assert result.sections.brief_description == original["brief_description"]
+    assert result.sections.capabilities == original["capabilities"]
+    assert result.sections.learning_needs == original["learning_needs"]
+    assert result.sections.reflection == "A deeper reflection.\nWith a second paragraph."
+    assert service.metrics.get("improve_review_plan", mode="targeted") == 1
+
+
+def test_several_sections_are_regenerated_in_parallel(make_service):
+    service, client = make_service(lambda kwargs: "Rewritten.\n\nTwice.")
+
+    result = asyncio.run(
+        service.improve_case_review(REVIEW, "Improve the reflection and the Clinical management capability", CAPABILITIES)
+    )
+
+    assert len(client.calls) == 2
+    assert result.sections.capabilities["Clinical management"] == "Rewritten.\nTwice."
+    assert result.sections.capabilities["Team working"] == "I handed over to the paramedics."
+    assert service.metrics.get("improve_review_sections_regenerated") == 2
+
+
+def test_unclear_request_uses_full_rewrite(make_service):
+    service, client = make_service(lambda kwargs: REVIEW)
+
+    asyncio.run(service.improve_case_review(REVIEW, "Make it better", CAPABILITIES, case_title="Crushing Chest Pain"))
+
+    assert len(client.calls) == 1
+    assert client.calls[0]["messages"][1]["content"] == service.settings.IMPROVEMENT_EXAMPLE_1
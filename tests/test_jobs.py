@@ -0,0 +1,238 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.jobs import (
+    FAILED,
+    QUEUED,
+    SUCCEEDED,
+    InMemoryJobStore,
+    JobManager,
+    JobRecord,
+    SQLiteJobStore,
+)
+from app.models import CaseReviewResponse, CaseReviewSection
+
+
+def make_review(title="Chest Pain"):
+    return CaseReviewResponse(
+        case_title=title,
+        review_content="Brief description:\nB",
+        sections=CaseReviewSection(brief_description="B", capabilities={}, reflection="", learning_needs=""),
+    )
+
+
+async def wait_for(manager, job_id, statuses=(SUCCEEDED, FAILED)):
+    for _ in range(200):
+        record = await manager.get(job_id)
+        if record.status in statuses:
+            return record
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_in_the_background_and_keeps_its_result():
+    async def scenario():
+        async def generate(payload):
+            await asyncio.sleep(0.01)
+            return make_review(payload["case_description"])
+
+        manager = JobManager(InMemoryJobStore(), {"generate_review": generate}, workers=2)
+        record = await manager.submit("generate_review", {"case_description": "Title from payload"})
+        assert record.status == QUEUED
+
+        finished = await wait_for(manager, record.job_id)
+        await manager.aclose()
+        return finished
+
+    finished = asyncio.run(scenario())
+
+    assert finished.status == SUCCEEDED
+    assert finished.result["case_title"] == "Title from payload"
+    assert finished.expires_at > finished.updated_at
+
+
+def test_failed_job_records_the_error_and_expired_jobs_disappear():
+    async def scenario():
+        async def fail(payload):
+            raise RuntimeError("upstream exploded")
+
+        manager = JobManager(InMemoryJobStore(), {"generate_review": fail}, result_ttl=0.05)
+        record = await manager.submit("generate_review", {})
+        failed = await wait_for(manager, record.job_id)
+        await asyncio.sleep(0.06)
+        expired = await manager.get(record.job_id)
+        await manager.aclose()
+        return failed, expired
+
+    failed, expired = asyncio.run(scenario())
+
+    assert failed.status == FAILED
+    assert failed.error == "upstream exploded"
+    assert expired is None
+
+
+def test_sqlite_store_resumes_jobs_left_unfinished(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    async def scenario():
+        await SQLiteJobStore(path).save(JobRecord("left-over", "generate_review", {"case_description": "Resumed"}))
+
+        async def generate(payload):
+            return make_review(payload["case_description"])
+
+        manager = JobManager(SQLiteJobStore(path), {"generate_review": generate})
+        finished = await wait_for(manager, "left-over")
+        await manager.aclose()
+        return finished
+
+    assert asyncio.run(scenario()).result["case_title"] == "Resumed"
+
+
+def test_instances_sharing_a_sqlite_store_do_not_rerun_each_others_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def generate(payload):
+            calls.append(payload["case_description"])
+            await release.wait()
+            return make_review(payload["case_description"])
+
+        first = JobManager(SQLiteJobStore(path), {"generate_review": generate})
+        record = await first.submit("generate_review", {"case_description": "Once"})
+        await wait_for(first, record.job_id, statuses=("running",))
+
+        second = JobManager(SQLiteJobStore(path), {"generate_review": generate})
+        await second.submit("generate_review", {"case_description": "Other"})
+        await wait_for(second, record.job_id, statuses=("running",))
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+        skipped = second.metrics.get("jobs_skipped", kind="generate_review", reason="claimed")
+
+        release.set()
+        finished = await wait_for(first, record.job_id)
+        await first.aclose()
+        await second.aclose()
+        return finished, skipped
+
+    finished, skipped = asyncio.run(scenario())
+
+    assert finished.status == SUCCEEDED
+    assert calls.count("Once") == 1
+    assert skipped == 1
+
+
+async def public_resolver(host, port):
+    return ["93.184.216.34"]
+
+
+def test_completion_callback_is_posted():
+    received = []
+
+    def handler(request):
+        received.append(json.loads(request.content))
+        return httpx.Response(204)
+
+    async def scenario():
+        async def generate(payload):
+            return make_review()
+
+        manager = JobManager(
+            InMemoryJobStore(),
+            {"generate_review": generate},
+            callback_allowed_hosts=["hooks.example.com"],
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            resolver=public_resolver,
+        )
+        try:
+            await manager.submit("generate_review", {}, callback_url="https://evil.example.net/hook")
+        except ValueError as e:
+            rejected = str(e)
+        record = await manager.submit("generate_review", {}, callback_url="https://hooks.example.com/done")
+        await wait_for(manager, record.job_id)
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        await manager.aclose()
+        return record, rejected
+
+    record, rejected = asyncio.run(scenario())
+
+    assert "not allowed" in rejected
+    assert received[0]["job_id"] == record.job_id
+    assert received[0]["status"] == SUCCEEDED
+    assert received[0]["result"]["case_title"] == "Chest Pain"
+
+
+def test_callback_urls_are_refused_without_an_allowlist_or_for_internal_addresses():
+    addresses = {"metadata.example.com": ["169.254.169.254"], "intranet.example.com": ["10.0.0.5", "93.184.216.34"]}
+
+    async def resolver(host, port):
+        return addresses.get(host, ["127.0.0.1"])
+
+    async def scenario():
+        open_manager = JobManager(InMemoryJobStore(), {"generate_review": None}, resolver=resolver)
+        manager = JobManager(
+            InMemoryJobStore(),
+            {"generate_review": None},
+            callback_allowed_hosts=["metadata.example.com", "intranet.example.com", "localhost", "169.254.169.254"],
+            resolver=resolver,
+        )
+        errors = []
+        for current, url in [
+            (open_manager, "https://hooks.example.com/done"),
+            (manager, "http://metadata.example.com/latest/meta-data"),
+            (manager, "https://intranet.example.com/hook"),
+            (manager, "http://localhost:8080/hook"),
+            (manager, "http://169.254.169.254/latest/meta-data"),
+        ]:
+            try:
+                await current.validate_callback_url(url)
+            except ValueError as e:
+                errors.append(str(e))
+        return errors
+
+    errors = asyncio.run(scenario())
+
+    assert len(errors) == 5
+    assert "no callback hosts are configured" in errors[0]
+    assert all("non-public address" in error for error in errors[1:])
+
+
+def test_callback_is_not_sent_when_the_host_now_resolves_internally():
+    received = []
+    addresses = ["93.184.216.34"]
+
+    async def resolver(host, port):
+        return list(addresses)
+
+    async def scenario():
+        async def generate(payload):
+            addresses[:] = ["127.0.0.1"]
+            return make_review()
+
+        manager = JobManager(
+            InMemoryJobStore(),
+            {"generate_review": generate},
+            callback_allowed_hosts=["hooks.example.com"],
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(lambda request: received.append(request))),
+            resolver=resolver,
+        )
+        record = await manager.submit("generate_review", {}, callback_url="https://hooks.example.com/done")
+        await wait_for(manager, record.job_id)
+        for _ in range(100):
+            if manager.metrics.get("job_callbacks", outcome="blocked"):
+                break
+            await asyncio.sleep(0.01)
+        await manager.aclose()
+        return manager
+
+    manager = asyncio.run(scenario())
+
+    assert received == []
+    assert manager.metrics.get("job_callbacks", outcome="blocked") == 1
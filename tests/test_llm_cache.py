@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from app.services.llm_cache import LLMResponseCache, LRUCacheTier, SQLiteCacheBackend, make_cache_key
+
+
+def test_cache_key_covers_request_fields_but_not_dict_ordering():
+    base = dict(model="gpt-4.1-mini", messages=[{"role": "user", "content": "Hi"}], temperature=0.3, max_tokens=200)
+    reordered = dict(max_tokens=200, temperature=0.3, messages=[{"content": "Hi", "role": "user"}], model="gpt-4.1-mini")
+
+    assert make_cache_key(**base) == make_cache_key(**reordered)
+    assert make_cache_key(**base) != make_cache_key(**{**base, "temperature": 0.7})
+    assert make_cache_key(**base) != make_cache_key(**{**base, "model": "gpt-4o"})
+
+
+def test_lru_tier_evicts_least_recently_used_and_expired_entries(monkeypatch):
+    tier = LRUCacheTier(max_entries=2)
+    tier.set("a", "A", ttl=60)
+    tier.set("b", "B", ttl=60)
+    assert tier.get("a") == "A"
+    tier.set("c", "C", ttl=60)
+
+    assert tier.get("b") is None
+    assert tier.get("a") == "A"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert tier.get("c") is None
+
+
+def test_sqlite_tier_shares_hits_between_instances(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    first = LLMResponseCache({"generate_title": 60}, shared=SQLiteCacheBackend(path))
+    second = LLMResponseCache({"generate_title": 60}, shared=SQLiteCacheBackend(path))
+
+    async def run():
+        await first.set("generate_title", "key", '{"title": "Chest pain"}')
+        return await second.get("generate_title", "key"), await second.get("generate_title", "key")
+
+    shared_hit, local_hit = asyncio.run(run())
+
+    assert shared_hit == local_hit == '{"title": "Chest pain"}'
+    assert second.stats()["generate_title"] == {"hits": 2, "shared_hits": 1, "misses": 0}
+
+
+def test_operations_without_ttl_are_not_cached():
+    cache = LLMResponseCache({"generate_review": 0})
+
+    async def run():
+        await cache.set("generate_review", "key", "value")
+        return await cache.get("generate_review", "key")
+
+    assert asyncio.run(run()) is None
+
+
+def test_service_serves_repeated_selection_from_cache(make_service):
+    service, client = make_service(lambda kwargs: "Clinical management\nTeam working")
+
+    async def run():
+        first = await service.select_capabilities_for_case("A long enough case description")
+        second = await service.select_capabilities_for_case("A long enough case description")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second == ["Clinical management", "Team working"]
+    assert len(client.calls) == 1
+    assert service.get_metrics()["llm_cache"]["select_capabilities"]["hits"] == 1
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import random
+
+import httpx
+import openai
+import pytest
+
+from app.config import Settings
+from app.context import build_llm_router
+from app.services.anthropic_service import AnthropicProvider, to_anthropic_request
+from app.services.llm_router import LLMRouter, THROTTLED, UNAVAILABLE, classify_error
+from app.services.openai_service import AzureOpenAIProvider, OpenAIProvider
+from app.services.portfolio_service import PortfolioService
+
+from conftest import FakeOpenAIClient
+
+MESSAGES = [
+    {"role": "system", "content": "You are an assessor."},
+    {"role": "user", "content": "Example case"},
+    {"role": "assistant", "content": "Example review"},
+    {"role": "user", "content": "Real case"},
+    {"role": "user", "content": "Extra instruction"},
+]
+REQUEST = {"model": "gpt-4.1-mini", "messages": MESSAGES, "max_tokens": 50, "temperature": 1.5}
+
+
+def openai_completion(content):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4.1-mini",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    }
+
+
+def anthropic_message(content):
+    return {
+        "id": "msg_1",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-3-opus-20240229",
+        "content": [{"type": "text", "text": content}],
+        "stop_reason": "max_tokens",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 20, "output_tokens": 5},
+    }
+
+
+def stub_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def make_settings(**overrides):
+    settings = Settings()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return settings
+
+
+def azure_provider(handler, name="azure-east"):
+    return AzureOpenAIProvider.from_spec(
+        {"name": name, "endpoint": "https://east.example.com", "deployment": "gpt-4.1-mini", "api_key": "k"},
+        make_settings(),
+        http_client=stub_client(handler),
+    )
+
+
+def openai_provider(handler, name="openai"):
+    return OpenAIProvider.from_spec(
+        {"name": name, "model": "gpt-4.1-mini", "api_key": "k", "base_url": "http://stub/v1"},
+        make_settings(),
+        http_client=stub_client(handler),
+    )
+
+
+def test_anthropic_request_moves_system_and_merges_consecutive_turns():
+    arguments = to_anthropic_request({**REQUEST, "prediction": {"type": "content", "content": "x"}}, "claude")
+
+    assert arguments["system"] == "You are an assessor."
+    assert [turn["role"] for turn in arguments["messages"]] == ["user", "assistant", "user"]
+    assert arguments["messages"][-1]["content"] == "Real case\n\nExtra instruction"
+    assert arguments["temperature"] == 1.0
+    assert "prediction" not in arguments
+
+
+def test_anthropic_provider_returns_chat_completions_and_quota():
+    seen = []
+
+    def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, json=anthropic_message("Chest Pain"), headers={
+            "anthropic-ratelimit-tokens-remaining": "250",
+            "anthropic-ratelimit-tokens-limit": "1000",
+        })
+
+    provider = AnthropicProvider.from_spec({"api_key": "k", "base_url": "http://stub"}, make_settings(), stub_client(handler))
+    response = asyncio.run(provider.create(REQUEST))
+
+    assert response.result.choices[0].message.content == "Chest Pain"
+    assert response.result.choices[0].finish_reason == "length"
+    assert response.result.usage.total_tokens == 25
+    assert provider.quota(response.headers) == (250.0, 1000.0)
+    assert seen[0]["model"] == "claude-3-opus-20240229"
+
+
+def test_anthropic_stream_is_translated_to_chat_chunks():
+    events = [
+        ("message_start", {"type": "message_start", "message": {**anthropic_message(""), "content": [], "stop_reason": None}}),
+        ("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+        ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Chest "}}),
+        ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Pain"}}),
+        ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 2}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+    body = "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events)
+
+    def handler(request):
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+
+    provider = AnthropicProvider.from_spec({"api_key": "k", "base_url": "http://stub"}, make_settings(), stub_client(handler))
+
+    async def run():
+        response = await provider.create({**REQUEST, "stream": True})
+        return [chunk async for chunk in response.result]
+
+    chunks = asyncio.run(run())
+
+    assert "".join(chunk.choices[0].delta.content or "" for chunk in chunks) == "Chest Pain"
+    assert chunks[-1].choices[0].finish_reason == "stop"
+
+
+def test_router_fails_over_when_a_deployment_is_throttled():
+    calls = []
+
+    def throttled(request):
+        calls.append("azure")
+        return httpx.Response(429, json={"error": {"message": "Rate limit"}}, headers={"retry-after": "20"})
+
+    def healthy(request):
+        calls.append("openai")
+        return httpx.Response(200, json=openai_completion("Chest Pain"), headers={
+            "x-ratelimit-remaining-tokens": "900",
+            "x-ratelimit-limit-tokens": "1000",
+        })
+
+    router = LLMRouter([azure_provider(throttled), openai_provider(healthy)], rng=random.Random(0))
+    # Make the throttled deployment look best so it is tried first
+    router.stats["openai"].latencies.extend([50.0] * 10)
+
+    response = asyncio.run(router.create(REQUEST))
+
+    assert response.result.choices[0].message.content == "Chest Pain"
+    assert calls == ["azure", "openai"]
+    assert router.metrics.get("llm_router_failover", provider="openai") == 1
+    snapshot = router.snapshot()
+    assert 19 < snapshot["azure-east"]["cooling_down_seconds"] <= 20
+    assert snapshot["openai"]["quota_fraction"] == 0.9
+    # While cooling down the throttled deployment is skipped
+    asyncio.run(router.create(REQUEST))
+    assert calls == ["azure", "openai", "openai"]
+
+
+def test_router_does_not_fail_over_on_bad_requests():
+    calls = []
+
+    def bad_request(request):
+        calls.append("azure")
+        return httpx.Response(400, json={"error": {"message": "Bad prompt"}})
+
+    def healthy(request):
+        calls.append("openai")
+        return httpx.Response(200, json=openai_completion("ok"))
+
+    router = LLMRouter([azure_provider(bad_request), openai_provider(healthy)], rng=random.Random(0))
+    router.stats["openai"].latencies.extend([50.0] * 10)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(router.create(REQUEST))
+    assert calls == ["azure"]
+
+
+def test_router_prefers_fast_providers_with_quota_left():
+    def never_called(request):
+        raise AssertionError("not sent")
+
+    fast, slow, drained = azure_provider(never_called, "fast"), azure_provider(never_called, "slow"), azure_provider(never_called, "drained")
+    router = LLMRouter([fast, slow, drained], rng=random.Random(1))
+    router.stats["fast"].latencies.extend([0.5] * 20)
+    router.stats["slow"].latencies.extend([4.0] * 20)
+    router.stats["drained"].latencies.extend([0.5] * 20)
+    router.stats["drained"].observe_quota(20, 1000)
+
+    firsts = [router.order()[0].name for _ in range(1000)]
+
+    assert firsts.count("fast") > 700
+    # Failover order after the weighted pick follows the score
+    assert [provider.name for provider in router.order() if provider is not fast] == ["slow", "drained"]
+
+
+def test_error_classification():
+    request = httpx.Request("POST", "http://stub")
+    throttled = openai.RateLimitError("slow down", response=httpx.Response(429, request=request), body=None)
+    down = openai.InternalServerError("boom", response=httpx.Response(503, request=request), body=None)
+
+    assert classify_error(throttled) == THROTTLED
+    assert classify_error(down) == UNAVAILABLE
+    assert classify_error(openai.APIConnectionError(request=request)) == UNAVAILABLE
+    assert classify_error(ValueError("bug")) is None
+
+
+def test_service_sends_through_the_router(tmp_path):
+    def healthy(request):
+        return httpx.Response(200, json=openai_completion("Routed Title"))
+
+    settings = make_settings(
+        portfolio_output_audit_csv_path=str(tmp_path / "audit.csv"),
+        llm_providers=json.dumps([{"type": "openai", "name": "stub", "api_key": "k", "base_url": "http://stub/v1"}]),
+    )
+    router = build_llm_router(settings, stub_client(healthy))
+    unused = FakeOpenAIClient(lambda kwargs: "Direct Title")
+    service = PortfolioService(settings, openai_client=unused, router=router)
+
+    assert asyncio.run(service.generate_title("A long enough case description")) == "Routed Title"
+    assert unused.calls == []
+    assert "stub" in service.get_metrics()["llm_router"]
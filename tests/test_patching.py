@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.utils.patching import PATCH_INSTRUCTIONS, PatchError, apply_patch, parse_patch
+
+ORIGINAL = "I saw a 65 year old man.\nHe had chest pain.\nI gave aspirin."
+
+PATCH = """<<<<<<< SEARCH
+He had chest pain.
+=======
+He had crushing central chest pain.
+>>>>>>> REPLACE
+<<<<<<< SEARCH
+I gave aspirin.
+=======
+I gave aspirin and GTN.
+>>>>>>> REPLACE"""
+
+
+def test_apply_patch_replaces_only_the_searched_spans():
+    assert parse_patch(PATCH)[0] == ("He had chest pain.", "He had crushing central chest pain.")
+    assert apply_patch(ORIGINAL, PATCH) == (
+        "I saw a 65 year old man.\nHe had crushing central chest pain.\nI gave aspirin and GTN."
+    )
+
+
+def test_apply_patch_rejects_blocks_that_do_not_match():
+    with pytest.raises(PatchError):
+        apply_patch(ORIGINAL, PATCH.replace("He had chest pain.", "She had chest pain."))
+    with pytest.raises(PatchError):
+        apply_patch(ORIGINAL, "Here is the improved text")
+    assert apply_patch(ORIGINAL, "NO CHANGES") == ORIGINAL
+
+
+def test_improve_section_sends_the_original_as_a_prediction(make_service):
+    service, client = make_service(lambda kwargs: "Improved reflection.")
+
+    result = asyncio.run(service.improve_section("reflection", ORIGINAL, "Add more detail"))
+
+    assert result == "Improved reflection."
+    assert client.calls[0]["prediction"] == {"type": "content", "content": ORIGINAL}
+    assert service.metrics.get("llm_edit_mode", operation="improve_section", mode="prediction") == 1
+
+
+def test_rejected_prediction_switches_to_patch_mode(make_service):
+    def responder(kwargs):
+        if "prediction" in kwargs:
+            request = httpx.Request("POST", "https://example.invalid")
+            raise openai.BadRequestError(
+                "prediction is not supported with this model",
+                response=httpx.Response(400, request=request),
+                body=None,
+            )
+        return PATCH
+
+    service, client = make_service(responder)
+
+    result = asyncio.run(service.improve_section("reflection", ORIGINAL, "Add more detail"))
+
+    assert result == "I saw a 65 year old man.\nHe had crushing central chest pain.\nI gave aspirin and GTN."
+    assert not service.predictions_supported
+    assert client.calls[1]["messages"][-1]["content"] == PATCH_INSTRUCTIONS
+
+
+def test_unusable_patch_falls_back_to_a_full_rewrite(make_service):
+    service, client = make_service(
+        lambda kwargs: "Rewritten section." if len(kwargs["messages"]) == 2 else "not a patch",
+        improve_edit_mode="patch",
+    )
+
+    result = asyncio.run(service.improve_section("reflection", ORIGINAL, "Add more detail"))
+
+    assert result == "Rewritten section."
+    assert len(client.calls) == 2
+    assert service.metrics.get("llm_edit_mode", operation="improve_section", mode="patch_failed") == 1
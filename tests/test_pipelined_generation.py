@@ -0,0 +1,79 @@
+import asyncio
+
+from app.utils.text_processing import extract_sections, render_review_content
+
+from conftest import make_completion
+
+CAPABILITIES = ["Team working", "Clinical management"]
+
+
+def respond(kwargs):
+    prompt = kwargs["messages"][-1]["content"]
+    if "Write ONLY the Title and Brief description" in prompt:
+        return "Title: Crushing Chest Pain\n\nBrief description:\nA 65 year old man with chest pain."
+    if "Write ONLY the Reflection" in prompt:
+        return "Reflection:\nI reflected on early ECGs.\n\nLearning needs identified from this event:\nReview ACS guidance."
+    for capability in CAPABILITIES:
+        if f"Capability: {capability}" in prompt:
+            return f"Capability: {capability}\nJustification: Evidence for {capability.lower()}."
+    raise AssertionError(f"Unexpected prompt: {prompt}")
+
+
+def test_render_review_content_round_trips_through_extract_sections():
+    sections = {
+        "brief_description": "Brief.",
+        "capabilities": {"Team working": "First.\n\nSecond."},
+        "reflection": "Reflection.",
+        "learning_needs": "Needs.",
+    }
+
+    parsed = extract_sections(render_review_content("A Title", sections), CAPABILITIES)
+
+    assert parsed["capabilities"] == {"Team working": "First.\nSecond."}
+    assert parsed["brief_description"] == "Brief."
+    assert parsed["learning_needs"] == "Needs."
+
+
+def test_pipelined_mode_assembles_sections_from_concurrent_calls(make_service):
+    service, client = make_service(respond)
+    in_flight = []
+    peak = []
+
+    async def create(**kwargs):
+        client.calls.append(kwargs)
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return make_completion(respond(kwargs))
+
+    client.chat.completions.create = create
+
+    result = asyncio.run(
+        service.generate_case_review("A long enough case description", CAPABILITIES, generation_mode="pipelined")
+    )
+
+    assert len(client.calls) == 4
+    assert max(peak) == 3
+    assert result.generation_mode == "pipelined"
+    assert result.case_title == "Crushing Chest Pain"
+    assert result.sections.brief_description == "A 65 year old man with chest pain."
+    assert result.sections.capabilities == {
+        "Team working": "Evidence for team working.",
+        "Clinical management": "Evidence for clinical management.",
+    }
+    assert result.sections.learning_needs == "Review ACS guidance."
+    # Each capability call only carries its own descriptors
+    capability_call = [
+        call for call in client.calls if 'section for "Capability: Team working"' in call["messages"][-1]["content"]
+    ][0]
+    assert "Progression point descriptors – Clinical management" not in capability_call["messages"][0]["content"]
+
+
+def test_single_mode_remains_the_default(make_service):
+    service, client = make_service(lambda kwargs: "Title: T\n\nBrief description:\nB")
+
+    result = asyncio.run(service.generate_case_review("A long enough case description", CAPABILITIES))
+
+    assert len(client.calls) == 1
+    assert result.generation_mode == "single"
@@ -1,9 +1,12 @@
+import asyncio
 import csv
 import json
+import time
 from types import SimpleNamespace
 
 from app.models import CaseReviewResponse, CaseReviewSection
-from app.services.portfolio_audit import PortfolioOutputAuditLogger
+from app.services import portfolio_audit
+from app.services.portfolio_audit import PortfolioOutputAuditLogger, iter_audit_rows, read_audit_manifest
 from app.services.portfolio_service import PortfolioService
 
 
@@ -75,3 +78,179 @@ def test_portfolio_service_records_case_review_output():
             "output_payload": response.model_dump(),
         }
     ]
+
+
+def read_rows(path):
+    with path.open(newline="", encoding="utf-8") as handle:
+        return list(csv.DictReader(handle))
+
+
+def test_background_audit_writer_batches_rows_and_flushes_on_close(tmp_path):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    logger = PortfolioOutputAuditLogger(
+        csv_path=str(audit_path), background=True, batch_size=100, flush_interval=60
+    )
+
+    for index in range(5):
+        logger.record(
+            operation="improve_section",
+            model_deployment="gpt-4.1-mini",
+            request_payload={"index": index},
+            output_text=f"Output {index}",
+        )
+    assert not audit_path.exists() or read_rows(audit_path) == []
+
+    logger.close()
+
+    rows = read_rows(audit_path)
+    assert [json.loads(row["request_json"])["index"] for row in rows] == [0, 1, 2, 3, 4]
+
+
+def test_background_audit_writer_flush_waits_for_queued_rows(tmp_path):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    logger = PortfolioOutputAuditLogger(csv_path=str(audit_path), background=True, flush_interval=0.01)
+
+    logger.record(
+        operation="generate_review",
+        model_deployment="gpt-4.1-mini",
+        request_payload={},
+        output_text="Review",
+    )
+    logger.flush()
+
+    assert [row["output_text"] for row in read_rows(audit_path)] == ["Review"]
+    logger.close()
+
+
+def test_background_audit_writer_drops_rows_when_queue_is_full(tmp_path):
+    logger = PortfolioOutputAuditLogger(
+        csv_path=str(tmp_path / "portfolio_outputs.csv"),
+        background=True,
+        queue_size=1,
+        batch_size=1,
+        overflow_policy="drop",
+    )
+    # Hold the file lock so the writer thread blocks after at most one row
+    with logger._file_lock:
+        for _ in range(5):
+            logger.record(operation="op", model_deployment="m", request_payload={}, output_text="x")
+        assert logger.dropped >= 3
+    logger.close()
+
+
+def test_block_policy_bounds_the_handoff_on_an_event_loop(tmp_path):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    logger = PortfolioOutputAuditLogger(
+        csv_path=str(audit_path),
+        background=True,
+        queue_size=2,
+        batch_size=1,
+        overflow_policy="block",
+    )
+
+    async def record_many():
+        started = time.monotonic()
+        for index in range(10):
+            logger.record(operation="op", model_deployment="m", request_payload={}, output_text=str(index))
+        return time.monotonic() - started
+
+    # Hold the file lock so the writer thread cannot drain the queue
+    with logger._file_lock:
+        elapsed = asyncio.run(record_many())
+        assert elapsed < 0.5
+        assert 1 <= logger.handed_off <= 4
+        assert logger.dropped >= 5
+    logger.close()
+
+    assert len(read_rows(audit_path)) + logger.dropped == 10
+
+
+def test_block_policy_waits_for_room_off_the_event_loop(tmp_path):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    logger = PortfolioOutputAuditLogger(
+        csv_path=str(audit_path),
+        background=True,
+        queue_size=1,
+        batch_size=1,
+        overflow_policy="block",
+    )
+
+    for index in range(5):
+        logger.record(operation="op", model_deployment="m", request_payload={}, output_text=str(index))
+    logger.close()
+
+    assert [row["output_text"] for row in read_rows(audit_path)] == ["0", "1", "2", "3", "4"]
+    assert logger.dropped == 0 and logger.handed_off == 0
+
+
+def test_audit_log_rotates_by_size_into_compressed_segments_with_manifest(tmp_path):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    logger = PortfolioOutputAuditLogger(csv_path=str(audit_path), rotate_max_bytes=400, compression="gzip")
+
+    for index in range(6):
+        logger.record(
+            operation="generate_review",
+            model_deployment="gpt-4.1-mini",
+            request_payload={"index": index},
+            output_text="x" * 150,
+        )
+    logger.close()
+
+    segments = read_audit_manifest(str(audit_path))
+    assert len(segments) >= 2
+    assert all(segment["segment"].endswith(".csv.gz") for segment in segments)
+    assert all((tmp_path / segment["segment"]).exists() for segment in segments)
+    assert sum(segment["row_count"] for segment in segments) + len(read_rows(audit_path)) == 6
+
+    rows = list(iter_audit_rows(str(audit_path)))
+    assert [json.loads(row["request_json"])["index"] for row in rows] == list(range(6))
+
+
+def test_audit_log_rotates_when_the_day_changes(tmp_path, monkeypatch):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    logger = PortfolioOutputAuditLogger(csv_path=str(audit_path), rotate_interval="day", compression="none")
+    timestamps = iter(["2026-10-17T23:59:00+00:00", "2026-10-17T23:59:30+00:00", "2026-10-18T00:00:10+00:00"])
+
+    class FakeDatetime:
+        @staticmethod
+        def now(tz):
+            return SimpleNamespace(isoformat=lambda: next(timestamps))
+
+    monkeypatch.setattr(portfolio_audit, "datetime", FakeDatetime)
+    for _ in range(3):
+        logger.record(operation="op", model_deployment="m", request_payload={}, output_text="row")
+    logger.close()
+
+    [segment] = read_audit_manifest(str(audit_path))
+    assert segment["row_count"] == 2
+    assert segment["first_timestamp_utc"] == "2026-10-17T23:59:00+00:00"
+    assert segment["last_timestamp_utc"] == "2026-10-17T23:59:30+00:00"
+    assert [row["timestamp_utc"] for row in read_rows(audit_path)] == ["2026-10-18T00:00:10+00:00"]
+
+    assert read_audit_manifest(str(audit_path), start="2026-10-18T00:00:00+00:00") == []
+    assert len(list(iter_audit_rows(str(audit_path), start="2026-10-18T00:00:00+00:00"))) == 1
+
+
+def test_writers_sharing_a_rotating_csv_keep_every_row(tmp_path):
+    audit_path = tmp_path / "portfolio_outputs.csv"
+    # Two loggers stand in for two worker processes: separate handles and bookkeeping
+    writers = [
+        PortfolioOutputAuditLogger(csv_path=str(audit_path), rotate_max_bytes=400, compression="gzip")
+        for _ in range(2)
+    ]
+
+    for index in range(12):
+        writers[index % 2].record(
+            operation="generate_review",
+            model_deployment="gpt-4.1-mini",
+            request_payload={"index": index},
+            output_text="x" * 150,
+        )
+    for writer in writers:
+        writer.close()
+
+    segments = read_audit_manifest(str(audit_path))
+    assert len(segments) >= 2
+    assert sum(segment["row_count"] for segment in segments) + len(read_rows(audit_path)) == 12
+    rows = list(iter_audit_rows(str(audit_path)))
+    assert sorted(json.loads(row["request_json"])["index"] for row in rows) == list(range(12))
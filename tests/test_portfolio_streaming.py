@@ -0,0 +1,47 @@
+import asyncio
+
+from app.utils.streaming import encode_events, format_sse
+
+
+def collect(events):
+    async def run():
+        return [item async for item in events]
+
+    return asyncio.run(run())
+
+
+def test_stream_case_review_forwards_tokens_and_section_events(make_service):
+    pieces = ["Brief des", "cription:\n**Chest** pain.\n", "\nReflection:\nLearned", " a lot."]
+
+    def responder(kwargs):
+        return pieces if kwargs.get("stream") else "Chest Pain Review"
+
+    service, client = make_service(responder)
+    events = collect(service.stream_case_review("A long enough case description", ["Clinical management"]))
+
+    tokens = [e["data"]["text"] for e in events if e["event"] == "token"]
+    sections = [e["data"] for e in events if e["event"] == "section"]
+    complete = events[-1]
+
+    assert "".join(tokens) == "Brief description:\nChest pain.\n\nReflection:\nLearned a lot."
+    assert sections == [
+        {"section": "brief_description", "content": "Chest pain."},
+        {"section": "reflection", "content": "Learned a lot."},
+    ]
+    assert complete["event"] == "complete"
+    assert complete["data"]["case_title"] == "Chest Pain Review"
+    assert complete["data"]["sections"]["reflection"] == "Learned a lot."
+    assert client.calls[0]["stream"] is True
+
+
+def test_encode_events_turns_failures_into_error_event():
+    async def failing():
+        yield {"event": "token", "data": {"text": "Hi"}}
+        raise RuntimeError("upstream closed")
+
+    lines = collect(encode_events(failing(), format_sse))
+
+    assert lines == [
+        'event: token\ndata: {"text": "Hi"}\n\n',
+        'event: error\ndata: {"message": "upstream closed"}\n\n',
+    ]
@@ -0,0 +1,97 @@
+import asyncio
+
+from openai.types.completion_usage import PromptTokensDetails
+
+from app.config import Settings
+from app.utils.prompt_builder import SystemPromptBuilder, parse_descriptor_index
+
+from conftest import make_completion
+
+SYSTEM_PROMPT = Settings.model_fields["SYSTEM_PROMPT"].default
+
+
+def test_descriptor_index_covers_every_capability_and_round_trips():
+    index = parse_descriptor_index(SYSTEM_PROMPT)
+
+    assert len(index.descriptors) == 13
+    assert "Clinical management" in index.descriptors
+    assert index.preamble + "".join(index.descriptors.values()) + index.postamble == SYSTEM_PROMPT
+
+
+def test_scoped_prompt_keeps_shared_instructions_and_selected_descriptors_only():
+    builder = SystemPromptBuilder(SYSTEM_PROMPT)
+
+    prompt = builder.build(["team working", "Clinical management"])
+
+    assert prompt.capabilities == ["Clinical management", "Team working"]
+    assert "Progression point descriptors – Clinical management" in prompt.text
+    assert "Progression point descriptors – Team working" in prompt.text
+    assert "Progression point descriptors – Fitness to practise" not in prompt.text
+    assert "**OUTPUT STRUCTURE:**" in prompt.text
+    assert prompt.text.startswith("\nYou are an expert RCGP")
+    assert prompt.token_count < prompt.full_token_count / 2
+    assert builder.build(["Clinical management", "Team working"]).text == prompt.text
+
+
+def test_unknown_capability_falls_back_to_every_descriptor():
+    builder = SystemPromptBuilder(SYSTEM_PROMPT)
+
+    prompt = builder.build(["Clinical management", "Not a capability"])
+
+    assert len(prompt.capabilities) == 13
+    assert all(f"Progression point descriptors – {name}" in prompt.text for name in prompt.capabilities)
+    assert prompt.text.startswith(builder.static_prefix)
+
+
+def test_shared_instructions_form_a_prefix_identical_for_every_selection():
+    builder = SystemPromptBuilder(SYSTEM_PROMPT)
+
+    first = builder.build(["Clinical management"]).text
+    second = builder.build(["Team working", "Fitness to practise"]).text
+
+    assert first.startswith(builder.static_prefix)
+    assert second.startswith(builder.static_prefix)
+    assert "**OUTPUT STRUCTURE:**" in builder.static_prefix
+    assert "Progression point descriptors – " not in builder.static_prefix
+
+
+def test_prompt_cache_usage_is_recorded_per_operation(make_service):
+    service, client = make_service(lambda kwargs: "Chest Pain Review")
+
+    async def create(**kwargs):
+        completion = make_completion("Chest Pain Review", prompt_tokens=2000)
+        completion.usage.prompt_tokens_details = PromptTokensDetails(cached_tokens=1536)
+        return completion
+
+    client.chat.completions.create = create
+
+    asyncio.run(service.generate_title("A long enough case description"))
+
+    assert service.metrics.get("llm_prompt_tokens", operation="generate_title") == 2000
+    assert service.metrics.get("llm_cached_prompt_tokens", operation="generate_title") == 1536
+    summaries = service.metrics.snapshot()["summaries"]
+    assert summaries["llm_prompt_cache_hit_ratio{operation=generate_title}"]["sum"] == 0.768
+    assert "llm_upstream_seconds{operation=generate_title,prompt_cache=hit}" in summaries
+
+
+def test_generation_sends_scoped_system_prompt(make_service):
+    service, client = make_service(lambda kwargs: "Title:\nT\n\nBrief description:\nB")
+
+    asyncio.run(service.generate_case_review("A long enough case description", ["Medical complexity"]))
+
+    system_prompt = client.calls[0]["messages"][0]["content"]
+    assert "Progression point descriptors – Medical complexity" in system_prompt
+    assert "Progression point descriptors – Team working" not in system_prompt
+    assert service.metrics.get("system_prompt_tokens_saved") > 0
+
+
+def test_improvement_requests_differ_only_in_their_last_message(make_service):
+    service, client = make_service(lambda kwargs: "Brief description:\nImproved", improve_edit_mode="full")
+
+    for request in ("Make the reflection deeper", "The patient is male"):
+        asyncio.run(service._improve_full_review("Brief description:\nOriginal", request, ["Team working"]))
+
+    first, second = (call["messages"] for call in client.calls)
+    assert first[:-1] == second[:-1]
+    assert first[-1]["content"].startswith("Current case review:\nBrief description:\nOriginal")
+    assert "Make the reflection deeper" in first[-1]["content"]
@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import openai
+
+from app.services.portfolio_service import sdk_max_retries
+from app.services.rate_limiter import RateLimitScheduler, TokenBucket, parse_retry_after
+
+
+def test_queued_requests_are_admitted_in_operation_priority_order():
+    scheduler = RateLimitScheduler(tokens_per_minute=100000, requests_per_minute=1000, max_concurrency=1)
+    order = []
+
+    async def call(operation):
+        async with scheduler.slot(operation, cost=100):
+            order.append(operation)
+            await asyncio.sleep(0)
+
+    async def run():
+        blocker = await scheduler.acquire("generate_review", cost=100)
+        tasks = [
+            asyncio.create_task(call("generate_review")),
+            asyncio.create_task(call("select_capabilities")),
+            asyncio.create_task(call("improve_section")),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 3
+        scheduler.release(blocker)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["improve_section", "select_capabilities", "generate_review"]
+
+
+def test_token_bucket_waits_for_refill_and_trusts_lower_server_remaining():
+    bucket = TokenBucket(per_minute=6000)
+    bucket.consume(6000)
+    assert 0.9 < bucket.time_until(100) <= 1.0
+
+    fresh = TokenBucket(per_minute=6000)
+    fresh.observe_remaining(50)
+    assert fresh.time_until(100) > 0
+
+
+def test_rate_limited_halves_concurrency_and_pauses_for_retry_after():
+    scheduler = RateLimitScheduler(tokens_per_minute=100000, requests_per_minute=1000, max_concurrency=8)
+
+    scheduler.record_rate_limited({"retry-after": "2", "x-ratelimit-remaining-tokens": "0"})
+
+    assert scheduler.concurrency_limit == 4
+    assert scheduler.tokens.level == 0
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+
+    for _ in range(10):
+        scheduler.record_success()
+    assert scheduler.concurrency_limit == 5
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = RateLimitScheduler(tokens_per_minute=100000, requests_per_minute=1000, max_concurrency=1)
+
+    async def run():
+        blocker = await scheduler.acquire("generate_review", cost=10)
+        waiter = asyncio.create_task(scheduler.acquire("improve_section", cost=10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        scheduler.release(blocker)
+        assert scheduler.in_flight == 0
+        assert scheduler.queue_depth == 0
+
+    asyncio.run(run())
+
+
+def test_service_adapts_scheduler_from_response_headers(make_service):
+    service, client = make_service(lambda kwargs: "Clinical management")
+    client.headers = {"x-ratelimit-remaining-requests": "3"}
+
+    asyncio.run(service.select_capabilities_for_case("A long enough case description"))
+
+    assert service.scheduler.requests.level <= 3
+    assert service.scheduler.in_flight == 0
+
+
+def test_scheduler_retries_a_429_instead_of_the_sdk(make_service):
+    service, client = make_service(lambda kwargs: "Clinical management")
+    create_raw = client.chat.completions.with_raw_response.create
+    attempts = []
+
+    async def throttled_once(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) == 1:
+            request = httpx.Request("POST", "https://example.com")
+            response = httpx.Response(429, headers={"retry-after-ms": "10"}, request=request)
+            raise openai.RateLimitError("throttled", response=response, body=None)
+        return await create_raw(**kwargs)
+
+    client.chat.completions.with_raw_response.create = throttled_once
+
+    asyncio.run(service.select_capabilities_for_case("A long enough case description"))
+
+    assert len(attempts) == 2
+    assert service.metrics.get("llm_rate_limited") == 1
+    assert service.metrics.get("llm_retries", operation="select_capabilities") == 1
+    assert service.scheduler.concurrency_limit < service.scheduler.max_concurrency
+    assert sdk_max_retries(service.settings) == 0
+    assert service.scheduler.in_flight == 0
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    started = []
+
+    async def upstream():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", upstream) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(started) == 1
+    assert not flight.is_in_flight("key")
+
+
+def test_cancelling_one_waiter_keeps_shared_call_for_the_others():
+    flight = SingleFlight()
+    release = None
+
+    async def upstream():
+        await release.wait()
+        return "result"
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(flight.do("key", upstream))
+        second = asyncio.create_task(flight.do("key", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+
+
+def test_shared_call_is_cancelled_when_every_waiter_leaves():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def upstream():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        waiter = asyncio.create_task(flight.do("key", upstream))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True]
+    assert not flight.is_in_flight("key")
+
+
+def test_service_coalesces_double_submitted_generation(make_service):
+    review = "Title:\nChest Pain\n\nBrief description:\nA summary."
+
+    service, client = make_service(lambda kwargs: review)
+    original_create = client._create
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.01)
+        return await original_create(**kwargs)
+
+    client.chat.completions.create = slow_create
+
+    async def run():
+        return await asyncio.gather(
+            service.generate_case_review("A long enough case description", ["Clinical management"]),
+            service.generate_case_review("A long enough case description", ["Clinical management"]),
+        )
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert len(client.calls) == 1
+    assert service.metrics.get("llm_coalesced", operation="generate_review") == 1
@@ -0,0 +1,104 @@
+import asyncio
+
+from app.services.speculation import SpeculativeReviews
+from app.utils.metrics import MetricsRegistry
+
+
+REVIEW = "Title: Chest Pain\n\nBrief description:\nA case.\n\nCapability: Team working\nJustification: Evidence."
+
+
+def make_speculation(**kwargs):
+    calls = []
+
+    async def generate(case, capabilities, mode):
+        calls.append((case, tuple(capabilities), mode))
+        await asyncio.sleep(0.01)
+        if case == "failing case":
+            raise Exception("boom")
+        return f"review of {case}"
+
+    metrics = MetricsRegistry()
+    return SpeculativeReviews(generate, metrics=metrics, **kwargs), calls, metrics
+
+
+def test_claim_returns_the_speculative_result_for_the_same_capabilities_in_any_order():
+    async def run():
+        speculation, calls, metrics = make_speculation()
+        speculation_id = speculation.start("case", ["A", "B"], "single")
+        assert speculation.start("case", ["A", "B"], "single") == speculation_id
+        result = await speculation.claim("case", ["B", "A"], "single")
+        return result, calls, metrics
+
+    result, calls, metrics = asyncio.run(run())
+
+    assert result == "review of case"
+    assert len(calls) == 1
+    assert metrics.get("speculative_reviews", outcome="hit") == 1
+
+
+def test_changed_capabilities_discard_the_speculation_as_wasted():
+    async def run():
+        speculation, _, metrics = make_speculation()
+        speculation.start("case", ["A", "B"], "single")
+        result = await speculation.claim("case", ["A", "C"], "single")
+        return result, speculation, metrics
+
+    result, speculation, metrics = asyncio.run(run())
+
+    assert result is None
+    assert speculation.running == 0
+    assert metrics.get("speculative_reviews_wasted", reason="mismatch") == 1
+
+
+def test_capacity_and_expiry():
+    async def run():
+        speculation, calls, metrics = make_speculation(max_jobs=1, ttl_seconds=0.02)
+        assert speculation.start("first", ["A"], "single") is not None
+        assert speculation.start("second", ["A"], "single") is None
+        await asyncio.sleep(0.03)
+        assert await speculation.claim("first", ["A"], "single") is None
+        return calls, metrics
+
+    calls, metrics = asyncio.run(run())
+
+    assert [call[0] for call in calls] == ["first"]
+    assert metrics.get("speculative_reviews", outcome="rejected") == 1
+    assert metrics.get("speculative_reviews_wasted", reason="expired") == 1
+
+
+def test_failed_speculation_falls_back_to_normal_generation():
+    async def run():
+        speculation, _, metrics = make_speculation()
+        speculation.start("failing case", ["A"], "single")
+        return await speculation.claim("failing case", ["A"], "single"), metrics
+
+    result, metrics = asyncio.run(run())
+
+    assert result is None
+    assert metrics.get("speculative_reviews", outcome="failed") == 1
+
+
+def test_generate_request_is_served_from_the_speculation(make_service):
+    service, client = make_service(lambda kwargs: REVIEW, speculative_generation_enabled=True)
+
+    async def run():
+        speculation_id = service.speculate_case_review("A long enough case description", ["Team working"])
+        first = await service.generate_case_review("A long enough case description", ["Team working"])
+        second = await service.generate_case_review("A long enough case description", ["Team working"])
+        await service.aclose()
+        return speculation_id, first, second
+
+    speculation_id, first, second = asyncio.run(run())
+
+    assert speculation_id is not None
+    assert first.case_title == second.case_title == "Chest Pain"
+    # The speculation served the first request; the second generated normally
+    assert len(client.calls) == 2
+    assert service.metrics.get("speculative_reviews", outcome="hit") == 1
+
+
+def test_speculation_is_off_by_default(make_service):
+    service, client = make_service(lambda kwargs: REVIEW)
+
+    assert service.speculate_case_review("A long enough case description", ["Team working"]) is None
+    assert client.calls == []
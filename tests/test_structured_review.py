@@ -0,0 +1,229 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from app import context as app_context
+from app.main import app
+from app.services.anthropic_service import AnthropicProvider
+from app.services.llm_router import ChatProvider, LLMRouter, ProviderResponse
+from app.utils.partial_json import PartialJSONDecoder
+from app.utils.structured_review import (
+    StructuredOutputError,
+    StructuredReviewStreamParser,
+    parse_structured_review,
+    review_response_format,
+)
+from app.utils.text_processing import extract_sections
+
+from conftest import make_completion
+
+CAPABILITIES = ["Team working", "Clinical management"]
+
+REVIEW = {
+    "title": "Crushing Chest Pain",
+    "brief_description": "A 65 year old man with **chest** pain.",
+    "capabilities": [
+        {"name": "Team working", "justification": "Worked with the nurse on \"early\" ECGs."},
+        {"name": "Clinical management", "justification": "Started the ACS pathway 🚑."},
+    ],
+    "reflection": "I reflected on early ECGs.",
+    "learning_needs": "Review ACS guidance.",
+}
+
+
+def collect(events):
+    async def run():
+        return [item async for item in events]
+
+    return asyncio.run(run())
+
+
+def chunked(text, seed):
+    rng = random.Random(seed)
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 7)
+        yield text[position:position + size]
+        position += size
+
+
+def test_partial_decoder_matches_json_loads_for_any_chunking():
+    document = json.dumps({**REVIEW, "score": -1.5e2, "flags": [True, None, {}]}, ensure_ascii=True)
+
+    for seed in range(20):
+        decoder = PartialJSONDecoder()
+        for piece in chunked(document, seed):
+            decoder.feed(piece)
+        decoder.finish()
+        assert decoder.done
+        assert decoder.value == json.loads(document)
+
+
+def test_partial_decoder_exposes_open_strings_and_reports_completed_paths():
+    decoder = PartialJSONDecoder()
+
+    assert decoder.feed('{"title": "Chest') == []
+    assert decoder.value == {"title": "Chest"}
+    assert decoder.feed(' Pain", "capabilities": [{"name": "A"}') == [("title",), ("capabilities", 0, "name"), ("capabilities", 0)]
+    with pytest.raises(ValueError):
+        decoder.feed("}}")
+
+
+def test_response_format_is_strict_and_limited_to_the_selected_capabilities():
+    response_format = review_response_format(CAPABILITIES)
+
+    schema = response_format["json_schema"]["schema"]
+    assert response_format["json_schema"]["strict"] is True
+    assert list(schema["properties"]) == schema["required"]
+    assert schema["properties"]["capabilities"]["items"]["properties"]["name"]["enum"] == CAPABILITIES
+
+
+def test_parse_structured_review_returns_sections_in_selection_order():
+    review = {**REVIEW, "capabilities": list(reversed(REVIEW["capabilities"]))}
+
+    title, sections = parse_structured_review(json.dumps(review), CAPABILITIES)
+
+    assert title == "Crushing Chest Pain"
+    assert list(sections["capabilities"]) == CAPABILITIES
+    assert sections["brief_description"] == "A 65 year old man with chest pain."
+
+
+@pytest.mark.parametrize("content", [
+    "Title: Not JSON",
+    json.dumps({**REVIEW, "reflection": ""}),
+    json.dumps({**REVIEW, "capabilities": REVIEW["capabilities"][:1]}),
+])
+def test_parse_structured_review_rejects_unusable_reviews(content):
+    with pytest.raises(StructuredOutputError):
+        parse_structured_review(content, CAPABILITIES)
+
+
+def test_stream_parser_renders_append_only_text_and_section_events():
+    parser = StructuredReviewStreamParser(CAPABILITIES)
+    text, events = "", []
+    for piece in chunked(json.dumps(REVIEW), seed=3):
+        new_text, new_events = parser.feed(piece)
+        text += new_text
+        events += new_events
+
+    title, sections = parser.finish()
+    assert title == "Crushing Chest Pain"
+    assert text.startswith("Title: Crushing Chest Pain\n\nBrief description:\nA 65 year old man with chest pain.")
+    assert extract_sections(text, CAPABILITIES) == sections
+    assert [event["section"] for event in events] == [
+        "brief_description", "capability", "capability", "reflection", "learning_needs",
+    ]
+    assert events[2] == {"section": "capability", "capability": "Clinical management", "content": "Started the ACS pathway 🚑."}
+
+
+def test_structured_mode_renders_the_review_from_validated_json(make_service):
+    service, client = make_service(lambda kwargs: json.dumps(REVIEW), generation_mode="structured")
+
+    response = asyncio.run(service.generate_case_review("A long enough case description", CAPABILITIES))
+
+    assert client.calls[0]["response_format"]["type"] == "json_schema"
+    assert response.generation_mode == "structured"
+    assert response.case_title == "Crushing Chest Pain"
+    assert response.sections.capabilities["Team working"] == 'Worked with the nurse on "early" ECGs.'
+    assert response.review_content.startswith("Title: Crushing Chest Pain\n\nBrief description:")
+    assert service.metrics.get("structured_output", outcome="valid") == 1
+
+
+def test_structured_mode_falls_back_to_the_text_format_on_invalid_json(make_service):
+    def responder(kwargs):
+        if "response_format" in kwargs:
+            return '{"title": "Cut'
+        return "Title: Chest Pain\n\nBrief description:\nChest pain.\n\nReflection:\nLearned a lot."
+
+    service, client = make_service(responder, generation_mode="structured")
+
+    response = asyncio.run(service.generate_case_review("A long enough case description", ["Clinical management"]))
+
+    assert len([call for call in client.calls if "response_format" in call]) == 1
+    assert response.generation_mode == "single"
+    assert response.sections.reflection == "Learned a lot."
+    assert service.metrics.get("structured_output", outcome="invalid") == 1
+
+
+def test_structured_stream_emits_rendered_tokens_and_a_complete_review(make_service):
+    pieces = list(chunked(json.dumps(REVIEW), seed=7))
+    service, client = make_service(lambda kwargs: pieces, generation_mode="structured")
+
+    events = collect(service.stream_case_review("A long enough case description", CAPABILITIES))
+
+    tokens = "".join(event["data"]["text"] for event in events if event["event"] == "token")
+    complete = events[-1]
+    assert client.calls[0]["stream"] is True and "response_format" in client.calls[0]
+    assert complete["event"] == "complete"
+    assert complete["data"]["review_content"] == tokens
+    assert complete["data"]["sections"]["learning_needs"] == "Review ACS guidance."
+    assert [event["data"]["section"] for event in events if event["event"] == "section"][-1] == "learning_needs"
+
+
+def test_stream_route_passes_the_requested_generation_mode(make_service):
+    service, client = make_service(lambda kwargs: list(chunked(json.dumps(REVIEW), seed=5)))
+    context = app_context.get_app_context()
+    context.portfolio_service = service
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post("/api/generate-review/stream", json={
+                "case_description": "A long enough case description",
+                "selected_capabilities": CAPABILITIES,
+                "generation_mode": "structured",
+            })
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        asyncio.run(app_context.close_app_context())
+
+    assert service.settings.generation_mode == "single"
+    assert response.status_code == 200
+    assert "response_format" in client.calls[0]
+    assert '"generation_mode": "structured"' in response.text
+
+
+class SchemaProvider(ChatProvider):
+    def __init__(self, name):
+        super().__init__(name, "m")
+        self.requests = []
+
+    async def create(self, request):
+        self.requests.append(request)
+        if "response_format" in request:
+            return ProviderResponse(make_completion(json.dumps(REVIEW)))
+        return ProviderResponse(make_completion("Title: Chest Pain\n\nBrief description:\nChest pain."))
+
+
+class IgnoringProvider(SchemaProvider):
+    supports_response_format = AnthropicProvider.supports_response_format
+
+
+def test_structured_requests_skip_providers_that_cannot_enforce_the_schema(make_service):
+    service, _ = make_service(lambda kwargs: "unused", generation_mode="structured")
+    anthropic, azure = IgnoringProvider("anthropic"), SchemaProvider("azure")
+    service.router = LLMRouter([anthropic, azure])
+    service.router.order = lambda prefer_idle=False: [anthropic, azure]
+
+    response = asyncio.run(service.generate_case_review("A long enough case description", CAPABILITIES))
+
+    assert response.generation_mode == "structured"
+    assert anthropic.requests == []
+    assert "response_format" in azure.requests[0]
+
+
+def test_structured_mode_is_skipped_when_no_provider_enforces_the_schema(make_service):
+    service, _ = make_service(lambda kwargs: "unused", generation_mode="structured")
+    anthropic = IgnoringProvider("anthropic")
+    service.router = LLMRouter([anthropic])
+
+    response = asyncio.run(service.generate_case_review("A long enough case description", ["Clinical management"]))
+
+    assert response.generation_mode == "single"
+    assert len(anthropic.requests) == 1
+    assert "response_format" not in anthropic.requests[0]
@@ -0,0 +1,68 @@
+from app.utils.text_processing import IncrementalSectionParser, extract_sections
+
+REVIEW = """Title:
+Chest Pain Managed in Practice
+
+Brief description:
+I saw a 65 year old man with crushing chest pain.
+
+He was sweaty and anxious.
+
+Capability: Clinical management
+Justification: I gave aspirin and called 999.
+
+Capability: Team working
+I handed over to the paramedics.
+
+Reflection:
+This case reinforced early ECGs.
+
+Learning needs identified from this event:
+I will revisit the ACS guidance."""
+
+
+def feed_in_chunks(parser, text, size):
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    events.extend(parser.finish())
+    return events
+
+
+def test_incremental_parser_matches_extract_sections_for_any_chunking():
+    expected = extract_sections(REVIEW, ["Clinical management", "Team working"])
+
+    for size in (1, 3, 17, len(REVIEW)):
+        parser = IncrementalSectionParser()
+        feed_in_chunks(parser, REVIEW, size)
+        assert parser.sections == expected
+
+    assert expected["brief_description"] == (
+        "I saw a 65 year old man with crushing chest pain.\nHe was sweaty and anxious."
+    )
+    assert expected["capabilities"]["Team working"] == "I handed over to the paramedics."
+
+
+def test_incremental_parser_emits_each_section_once_in_order():
+    events = feed_in_chunks(IncrementalSectionParser(), REVIEW, 5)
+
+    assert [(e["section"], e.get("capability")) for e in events] == [
+        ("brief_description", None),
+        ("capability", "Clinical management"),
+        ("capability", "Team working"),
+        ("reflection", None),
+        ("learning_needs", None),
+    ]
+    assert events[0]["content"].endswith("He was sweaty and anxious.")
+
+
+def test_incremental_parser_closes_section_when_next_header_arrives():
+    parser = IncrementalSectionParser()
+
+    assert parser.feed("Brief description:\nA short summary.\n\n") == []
+    events = parser.feed("Capability: Clinical management\nJustification: Safe plan.\n\nRefl")
+
+    assert events == [
+        {"section": "brief_description", "content": "A short summary."},
+        {"section": "capability", "capability": "Clinical management", "content": "Safe plan."},
+    ]
@@ -0,0 +1,63 @@
+import asyncio
+
+REVIEW = """Title:
+Crushing Chest Pain in Practice
+
+Brief description:
+I saw a 65 year old man with chest pain.
+
+Reflection:
+I reflected on early ECGs."""
+
+
+def is_title_call(kwargs):
+    return kwargs["max_tokens"] == 50
+
+
+def test_inline_strategy_parses_title_without_second_call(make_service):
+    service, client = make_service(lambda kwargs: REVIEW, title_strategy="inline")
+
+    result = asyncio.run(service.generate_case_review("A long enough case description", ["Clinical management"]))
+
+    assert result.case_title == "Crushing Chest Pain in Practice"
+    assert len(client.calls) == 1
+
+
+def test_concurrent_strategy_titles_raw_notes_alongside_generation(make_service):
+    service, client = make_service(
+        lambda kwargs: "Generated Title" if is_title_call(kwargs) else REVIEW,
+        title_strategy="concurrent",
+    )
+
+    result = asyncio.run(service.generate_case_review("Raw chest pain notes here", ["Clinical management"]))
+
+    assert result.case_title == "Generated Title"
+    title_calls = [call for call in client.calls if is_title_call(call)]
+    assert title_calls[0]["messages"][1]["content"] == "Create a title for: Raw chest pain notes here"
+
+
+def test_improve_reuses_previous_title_when_brief_description_unchanged(make_service):
+    # Targeted improvement: only the reflection body is regenerated
+    improved = "I reflected on early ECGs and handover."
+    service, client = make_service(lambda kwargs: "New Title" if is_title_call(kwargs) else improved)
+
+    result = asyncio.run(
+        service.improve_case_review(REVIEW, "Expand the reflection", ["Clinical management"], case_title="Kept Title")
+    )
+
+    assert result.case_title == "Kept Title"
+    assert not any(is_title_call(call) for call in client.calls)
+
+
+def test_improve_regenerates_title_when_brief_description_changed(make_service):
+    improved = REVIEW.replace("65 year old man", "72 year old woman")
+    service, client = make_service(lambda kwargs: "New Title" if is_title_call(kwargs) else improved)
+
+    result = asyncio.run(
+        service.improve_case_review(REVIEW, "Change the age to 72", ["Clinical management"], case_title="Kept Title")
+    )
+
+    assert result.case_title == "New Title"
+    assert [call for call in client.calls if is_title_call(call)][0]["messages"][1]["content"].endswith(
+        "72 year old woman with chest pain."
+    )